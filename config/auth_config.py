@@ -3,6 +3,7 @@ from spotipy.oauth2 import SpotifyOAuth
 from urllib.parse import urlencode
 from utils.file_handling import File
 from config.base import ConfigRelatedMeta
+from config.config_main import config
 
 class SpotifyAuthConfig(metaclass=ConfigRelatedMeta):
   def __init__(self):
@@ -25,6 +26,13 @@ class SpotifyAuthConfig(metaclass=ConfigRelatedMeta):
     self.SP: spotipy.Spotify = self.get_spotify_client()
 
   def get_spotify_client(self) -> spotipy.Spotify:
+    # A local stand-in of the Web API (tools/spotify_stub.py) doesn't check the token, so there's no OAuth flow
+    api_prefix: str = config.get_pr("spotify_api_prefix")
+    if api_prefix:
+      client: spotipy.Spotify = spotipy.Spotify(auth="local-stub")
+      client.prefix = api_prefix
+      return client
+
     return spotipy.Spotify(
       auth_manager=SpotifyOAuth(
         client_id=self.PARAMS["CLIENT_ID"],
@@ -59,12 +59,19 @@ class Config(metaclass=ConfigRelatedMeta):
     preference: PrimitiveTypes = self.USER_PREFS.get(key, self.DEF_PREFS.get(key))
     return preference
 
+  def get_screens(self) -> list["ScreenConfig"]:
+    # One card per entry of 'screens', or a single one with the global preferences
+    return [ScreenConfig(self, overrides) for overrides in self.get_pr("screens") or [{ }]]
+
   @staticmethod
   def get_nowplaying_txt_path(path: str = "") -> str:
     if path.startswith("C:\\"):
       return path
 
-    username: str = os.getlogin()
+    try:
+      username: str = os.getlogin()
+    except OSError:  # No controlling terminal (e.g. headless runs)
+      username = ''
     if not username:
       username = os.environ.get('USERNAME')
 
@@ -74,5 +81,17 @@ class Config(metaclass=ConfigRelatedMeta):
     return f"C:\\Users\\{username}\\AppData\\Roaming\\{path}"
 
 
+class ScreenConfig:
+  """
+  Preferences of one card: its entry in 'screens' (e.g. its screen_index, positions and animations), then the global ones
+  """
+  def __init__(self, config: Config, overrides: PreferenceType) -> None:
+    self.config: Config = config
+    self.overrides: PreferenceType = overrides
+
+  def get_pr(self, key: str) -> PrimitiveTypes:
+    return self.overrides[key] if key in self.overrides else self.config.get_pr(key)
+
+
 # Singleton instance
 config: Config = Config()
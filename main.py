@@ -1,11 +1,58 @@
+import os, time
+started_at: float = time.perf_counter()  # the first paint is measured from here, before the heavy imports
+
 from PyQt5.QtWidgets import QApplication
+from config.config_main import config, ScreenConfig
 from ui.music_card.window import MusicCardWindow
+from ui.music_card.snapshot import FirstPaintProbe
+from ui.music_card.overlay import OverlayRenderer, start_overlay_renderer
+from utils.metrics import MetricsExporter, start_metrics_export
+from utils.now_playing import NowPlayingPublisher, start_now_playing_api
+from utils.play_history import PlayHistory, start_play_history
+from utils.watchdog import StallWatchdog, start_watchdog
+from utils.profiler import profiler
+from utils.async_engine import engine
+from utils.logger import setup_logging
 
 
 def init_app():
+  setup_logging()
+
+  # Headless: nothing on the screen, the card is only rendered by the overlay renderer
+  if config.get_pr("headless"):
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
   app: QApplication = QApplication([])
-  card_window: MusicCardWindow = MusicCardWindow(app)
-  card_window.show()
+  metrics_exporter: MetricsExporter = start_metrics_export()
+  app.aboutToQuit.connect(metrics_exporter.stop)
+  app.aboutToQuit.connect(profiler.dump_all)
+
+  now_playing: NowPlayingPublisher = start_now_playing_api()
+  app.aboutToQuit.connect(now_playing.stop)
+
+  play_history: PlayHistory | None = start_play_history()
+  if play_history:
+    app.aboutToQuit.connect(play_history.stop)
+
+  watchdog: StallWatchdog | None = start_watchdog()
+  if watchdog:
+    app.aboutToQuit.connect(watchdog.stop)
+
+  # One card per screen, all of them fed by the first one's metadata pipeline
+  screens: list[ScreenConfig] = config.get_screens()
+  card_window: MusicCardWindow = MusicCardWindow(app, screens[0])
+  card_windows: list[MusicCardWindow] = [card_window, *(MusicCardWindow(app, prefs, card_window.card.updater) for prefs in screens[1:])]
+  FirstPaintProbe(card_window.card, started_at, config.get_pr("first_paint_budget_ms"))
+  app.aboutToQuit.connect(card_window.card.updater.save_snapshot)
+  app.aboutToQuit.connect(card_window.card.updater.stop)
+  app.aboutToQuit.connect(engine.stop)
+  for window in card_windows:
+    window.show()
+  card_window.card.updater.start()  # the last card (if saved) is painted before the event loop starts
+
+  overlay: OverlayRenderer | None = start_overlay_renderer(card_window)
+  if overlay:
+    app.aboutToQuit.connect(overlay.stop)
   app.exec_()
 
 # Run the app
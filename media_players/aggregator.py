@@ -0,0 +1,190 @@
+import asyncio, logging, time
+from dataclasses import replace
+from keyboard import add_hotkey
+from typing import TYPE_CHECKING, Callable
+
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
+from config.config_main import config
+from utils.async_engine import engine
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.card import MusicCard
+  from ui.music_card.handlers import UpdateHandler
+
+logger: logging.Logger = get_logger(__name__)
+
+
+class Source:
+  """
+  A backend polled by the aggregator, with its last record and when it has to be polled again
+  """
+  def __init__(self, name: str, worker: IMetadataWorker) -> None:
+    self.name: str = name
+    self.worker: IMetadataWorker = worker
+    self.record: MetadataRecord | None = None
+    self.due: float = 0.0
+    self.min_interval: int = (config.get_pr("source_min_intervals") or { }).get(name) or 0  # rate limit (ms)
+
+  @property
+  def is_playing(self) -> bool:
+    return self.record is not None and self.record.kind == "track" and self.record.is_playing
+
+
+class AggregatorMetadataWorker(IMetadataWorker):
+  """
+  Polls several backends under one schedule and reports the one that is actually playing.
+  The source on the card and the playing ones are polled every 'poll_interval', the idle ones back off
+  to 'idle_poll_interval'. A source's 'source_min_intervals' entry is a floor for both
+  """
+  def __init__(self, workers: dict[str, IMetadataWorker]):
+    super().__init__()
+    self.sources: list[Source] = [Source(name, worker) for name, worker in workers.items()]
+    self.active: Source = self.sources[0]  # the first one in 'media_player' until another one plays
+    metrics.set_gauge("active_source", self.active.name)
+
+  def get_metadata(self) -> MetadataRecord | None:
+    # The sources are fetched by fetch_metadata, this only reports the last record of the one on the card
+    return self.active.record
+
+  def get_next_image(self, record: MetadataRecord) -> str | bytes | None:
+    return self.active.worker.get_next_image(record)
+
+  def poll_now(self) -> None:
+    engine.call_soon(self.reset_schedule)
+    super().poll_now()
+
+  def stop(self) -> None:
+    super().stop()
+    for source in self.sources:
+      source.worker.stop()
+
+  def reset_schedule(self) -> None:
+    for source in self.sources:
+      source.due = 0.0
+
+  # Scheduling (in the engine's loop)
+  async def poll(self) -> None:
+    while self.is_polling:
+      await self.fetch()
+      await asyncio.sleep(self.get_next_delay())
+
+      metrics.record_wakeup(metrics.get_gauge("card_idle", False))
+
+  def get_next_delay(self) -> float:
+    return max(min(source.due for source in self.sources) - time.monotonic(), 0)
+
+  def get_interval(self, source: Source) -> int:
+    if source is self.active or source.is_playing:
+      return max(config.get_pr("poll_interval"), source.min_interval)
+
+    return max(config.get_pr("idle_poll_interval"), source.min_interval)
+
+  def get_fetch_timeout(self) -> float | None:
+    return None  # every source has its own, in fetch_source
+
+  async def fetch_metadata(self) -> MetadataRecord | None:
+    now: float = time.monotonic()
+    due_sources: list[Source] = [source for source in self.sources if source.due <= now]
+    await asyncio.gather(*(self.fetch_source(source) for source in due_sources))
+
+    self.select_active()
+    for source in due_sources:
+      source.due = now + self.get_interval(source) / 1000  # after the selection, so a new active source keeps up
+
+    return self.active.record
+
+  async def fetch_source(self, source: Source) -> None:
+    # A source's own retries (try_again) end in its 'finished' signal, which nothing listens to:
+    # the schedule polls it again once they are over
+    if source.worker.is_retrying():
+      return
+
+    metrics.increment(f"source_polls.{source.name}")
+    timeout: float | None = source.worker.get_fetch_timeout()
+    try:
+      record: MetadataRecord | None = await asyncio.wait_for(source.worker.fetch_metadata(), timeout)
+
+    except asyncio.CancelledError:
+      raise
+    except asyncio.TimeoutError:  # a slow backend (e.g. Spotify's retries) only misses its own poll
+      metrics.increment(f"source_timeouts.{source.name}")
+      logger.warning("Source %s timed out after %dms", source.name, timeout * 1000)
+      return
+    except Exception as e:  # one failing backend doesn't stop the others
+      logger.warning("Source %s failed (%r)", source.name, e)
+      return
+
+    if record is not None:
+      source.record = replace(record, source=source.name)
+
+  def select_active(self) -> None:
+    # The source on the card stays while it plays, otherwise the first playing one takes its place
+    if self.active.is_playing:
+      return
+
+    playing: Source | None = next((source for source in self.sources if source.is_playing), None)
+    if playing is None:
+      return
+
+    logger.info("Switched source", extra={ "from": self.active.name, "to": playing.name })
+    metrics.increment("source_switches")
+    metrics.set_gauge("active_source", playing.name)
+    self.active = playing
+
+
+class AggregatorMetadataHandler(IMetadataHandler):
+  """
+  Hands every record to the handler of the backend that reported it
+  """
+  def __init__(self, card: "MusicCard", updater: "UpdateHandler", handlers: dict[str, IMetadataHandler]) -> None:
+    super().__init__(card, updater)
+    self.handlers: dict[str, IMetadataHandler] = handlers
+
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    self.handlers[record.source].handle_metadata(record)
+
+
+class AggregatorPlaybackWorker(IPlaybackWorker):
+  """
+  Registers the playback shortcuts once and forwards the commands to the worker of the source on the card
+  (the backends' workers don't register theirs)
+  """
+  def __init__(self, card: "MusicCard", workers: dict[str, IPlaybackWorker]):
+    super().__init__(card)
+    self.workers: dict[str, IPlaybackWorker] = workers
+
+  def register_shortcuts(self) -> None:
+    is_string: Callable[[str], bool] = lambda sc: config.get_pr(f"{sc}_shortcut") and isinstance(config.get_pr(f"{sc}_shortcut"), str)
+
+    for shortcut in self.shortcut_functions.keys():
+      if is_string(shortcut):
+        add_hotkey(config.get_pr(f"{shortcut}_shortcut"), lambda key=shortcut: self.on_playback_shortcut.emit(key))
+
+  def get_worker(self) -> IPlaybackWorker | None:
+    return self.workers.get(self.card.playback_state.source)
+
+  def play_pause(self) -> None:
+    if worker := self.get_worker():
+      worker.play_pause()
+
+  def next_track(self) -> None:
+    if worker := self.get_worker():
+      worker.next_track()
+
+  def previous_track(self) -> None:
+    if worker := self.get_worker():
+      worker.previous_track()
+
+  def change_order(self) -> None:
+    if worker := self.get_worker():
+      worker.change_order()
+
+  def toggle_repeat(self) -> None:
+    if worker := self.get_worker():
+      worker.toggle_repeat()
+
+  def change_volume(self, increase: bool) -> None:
+    if worker := self.get_worker():
+      worker.change_volume(increase)
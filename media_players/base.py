@@ -1,16 +1,26 @@
-import darkdetect
+import asyncio, darkdetect, logging, time
 from PyQt5.QtCore import pyqtSignal, QObject, pyqtSlot
 from abc import ABC, ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, TypedDict, Callable
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Callable
 from config.config_main import config
-from utils.helpers import set_timer
+from utils.async_engine import engine
+from utils.constants import WARNING_IMG_PATH
+from utils.image_handling import prepare_card_image
+from utils.metrics import metrics
+from utils.now_playing import now_playing
+from utils.play_history import play_history
+from utils.profiler import profiler
+from utils.logger import get_logger
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
-  from PyQt5.QtCore import QTimer
+  from concurrent.futures import Future
   from ui.music_card.card import MusicCard
   from ui.music_card.animations import MusicCardAnimations
   from ui.music_card.handlers import UpdateHandler
 
+logger: logging.Logger = get_logger(__name__)
+
 QObjectMeta = type(QObject)
 
 
@@ -21,37 +31,202 @@ class MetaQObjectABC(QObjectMeta, ABCMeta):
   pass
 
 
+@dataclass(frozen=True, slots=True)
+class MetadataRecord:
+  """
+  What the card needs from a poll. 'kind' is "track" or the alert/error the handler has to show
+  """
+  kind: str
+  track_id: str = ''
+  title: str = ''
+  artist: str = ''
+  image: str | bytes | None = None
+  is_playing: bool = False
+  shuffle_state: bool = False
+  repeat_state: str = "off"
+  volume_percent: int = 0
+  message: str = ''
+  is_os_dark: bool = False
+  source: str = ''  # backend that reported it, when several are polled
+
+  @property
+  def fingerprint(self) -> tuple:
+    # The image is left out: it belongs to the track, and comparing it would mean comparing raw bytes
+    return (self.kind, self.track_id, self.title, self.artist, self.is_playing, self.shuffle_state,
+            self.repeat_state, self.volume_percent, self.message, self.is_os_dark, self.source)
+
+
 class IMetadataWorker(QObject, ABC, metaclass=MetaQObjectABC):
   """
-  Gets the metadata from the current playback
+  Gets the metadata from the current playback. The worker polls in the async engine while the updater allows it,
+  and only emits a record when it differs from the last one, so unchanged polls never reach the GUI thread
   """
-  getting: pyqtSignal = pyqtSignal()
-  finished: pyqtSignal = pyqtSignal(object)
+  finished: pyqtSignal = pyqtSignal(object)  # MetadataRecord, queued to the GUI thread
 
   def __init__(self):
     super().__init__()
-    self.getting.connect(self.get_metadata)
-    self.try_again_timer: "QTimer" = set_timer(self.get_metadata)
     self.tries: int = 0
+    self.is_polling: bool = False
+    self.poll_task: asyncio.Task | None = None
+    self.retry: "Future | None" = None  # a fetch_later waiting, the polls leave the fetching to it
+    self.retry_key: str = f"metadata-retry-{id(self)}"  # per worker, the aggregator's backends retry on their own
+    self.fetch_lock: asyncio.Lock = asyncio.Lock()  # one fetch at a time (polls, retries and requested ones)
+    self.last_fingerprint: tuple | None = None
+    self.prefetched: tuple[str, str | bytes | None] = ('', None)  # (track, artwork of the one expected next)
+
+    # Latency instrumentation (read by the updater once the record is delivered)
+    self.fetch_started: float = 0.0
+    self.emitted_fetch_started: float = 0.0  # of the last emitted record, the worker may be polling again by then
+    self.emitted_at: float = 0.0
+
+  # Called from the GUI thread
+  def poll_now(self) -> None:
+    engine.submit(self.fetch())
+
+  def set_polling(self, is_polling: bool) -> None:
+    engine.call_soon(self.update_polling, is_polling)
+
+  def stop(self) -> None:
+    self.set_polling(False)
+    engine.cancel(self.retry_key)
+
+  # Polling (in the engine's loop)
+  def update_polling(self, is_polling: bool) -> None:
+    self.is_polling = is_polling
+
+    # A poll in progress ends by itself once polling is off, so its record isn't lost
+    if is_polling and (not self.poll_task or self.poll_task.done()):
+      self.poll_task = asyncio.create_task(self.poll())
+
+  async def poll(self) -> None:
+    while self.is_polling:
+      if not self.is_retrying():
+        await self.fetch()
+      await asyncio.sleep(config.get_pr("poll_interval") / 1000)
+
+      metrics.record_wakeup(metrics.get_gauge("card_idle", False))
+
+  async def fetch(self) -> None:
+    async with self.fetch_lock:
+      self.fetch_started = time.perf_counter()
+      try:
+        record: MetadataRecord | None = await asyncio.wait_for(self.fetch_metadata(), self.get_fetch_timeout())
+
+        if record is not None:  # None: trying again later
+          await self.deliver(record)
+
+      except asyncio.TimeoutError:
+        metrics.increment("metadata_timeouts")
+        logger.warning("Metadata fetch timed out after %dms", config.get_pr("metadata_timeout_ms"))
+      except Exception:  # a failed fetch (missing file, bad response...) only loses this poll, the next one tries again
+        metrics.increment("metadata_errors")
+        logger.exception("Metadata fetch failed")
+
+  async def deliver(self, record: MetadataRecord) -> None:
+    # The artwork of a new record is ready in the image cache before the GUI thread gets it
+    if record.fingerprint != self.last_fingerprint and record.image:
+      if record.image == self.prefetched[1]:
+        metrics.increment("prefetch_hits")  # already prepared while the previous track played
+      await self.prepare_artwork(record.image)
+
+    self.publish(record)
+
+    # Once per track, after its own card: the next one's artwork is prepared while this one plays
+    if record.kind == "track" and record.track_id != self.prefetched[0] and config.get_pr("prefetch_next"):
+      self.prefetched = (record.track_id, None)
+      engine.submit(self.prefetch_next(record), key="metadata-prefetch")
+
+  def get_fetch_timeout(self) -> float | None:
+    return config.get_pr("metadata_timeout_ms") / 1000
+
+  async def fetch_metadata(self) -> MetadataRecord | None:
+    # Backends with non-blocking I/O override this one, the others implement the blocking get_metadata
+    return await engine.run_blocking(profiler.profile(self.get_metadata))
+
+  async def prepare_artwork(self, image: str | bytes) -> None:
+    # Downloads and processes the artwork here, so the GUI thread finds it in the image cache
+    try:
+      await engine.run_blocking(prepare_card_image, image, timeout=config.get_pr("artwork_timeout_ms"))
+    except asyncio.TimeoutError:
+      logger.warning("Artwork not ready after %dms, the card will load it", config.get_pr("artwork_timeout_ms"))
+
+  async def prefetch_next(self, record: MetadataRecord) -> None:
+    try:
+      image: str | bytes | None = await engine.run_blocking(self.get_next_image, record)
+    except asyncio.CancelledError:
+      raise
+    except Exception as e:  # a failed prefetch only means the next card loads its artwork itself
+      logger.debug("Next track not prefetched (%r)", e)
+      return
+
+    if not image:
+      return
+
+    self.prefetched = (record.track_id, image)
+    await self.prepare_artwork(image)
+    metrics.increment("prefetches")
+
+  def get_next_image(self, record: MetadataRecord) -> str | bytes | None:
+    # Blocking, runs in the engine's executor: the artwork of the track expected after 'record',
+    # for the backends that can see the player's queue or playlist
+    return None
+
+  def publish(self, record: MetadataRecord) -> None:
+    # The fetch time gets measured and the record is only emitted if something the card depends on changed
+    metrics.observe("stage.worker_fetch", (time.perf_counter() - self.fetch_started) * 1000)
+
+    if record.fingerprint == self.last_fingerprint:
+      metrics.increment("unchanged_polls")
+      return
+
+    self.last_fingerprint = record.fingerprint
+    self.emitted_fetch_started = self.fetch_started
+    self.emitted_at = time.perf_counter()
+    self.finished.emit(record)
+
+  @staticmethod
+  def get_is_os_dark() -> bool:
+    # Only the adaptive theme follows the OS, and darkdetect can be slow (it spawns a process on Linux)
+    return darkdetect.isDark() if "adaptive" in config.current_theme_name else config.is_os_dark
 
   @abstractmethod
-  def get_metadata(self) -> dict[str, Any]:
+  def get_metadata(self) -> MetadataRecord | None:
+    # Blocking, runs in the engine's executor. None when the worker is trying again later
     pass
 
   def try_again(self, time: int) -> None:
     self.tries += 1
-    self.try_again_timer.start(time)
+    self.retry = engine.submit(self.fetch_later(time), key=self.retry_key)
 
+  def is_retrying(self) -> bool:
+    return self.retry is not None and not self.retry.done()
 
-class PlaybackInfoDict(TypedDict):
-  current_track_id: str
-  current_track: dict[str, Any]
-  is_playing: bool
-  previous_track_id: str
-  previous_state_is_playing: bool
-  shuffle_state: bool
-  repeat_state: str
-  volume_percent: int
+  async def fetch_later(self, delay: int) -> None:
+    await asyncio.sleep(delay / 1000)
+    await self.fetch()
+
+
+@dataclass(frozen=True, slots=True)
+class PlaybackState:
+  """
+  What the card and the playback workers know about the playback. It is never changed in place:
+  the GUI thread swaps 'card.playback_state' for an evolved copy, so any thread can keep and read
+  a state without copying it. 'version' grows with every change (0 means nothing was received yet)
+  """
+  version: int = 0
+  track_id: str = ''
+  title: str = ''
+  artist: str = ''
+  is_playing: bool = False
+  shuffle_state: bool = False
+  repeat_state: str = "off"
+  volume_percent: int = 0
+  source: str = ''
+  previous_track_id: str = ''
+  previous_state_is_playing: bool = False
+
+  def evolve(self, **changes: Any) -> "PlaybackState":
+    return replace(self, version=self.version + 1, **changes)
 
 
 class IMetadataHandler(ABC):
@@ -71,28 +246,52 @@ class IMetadataHandler(ABC):
     self.was_error_card_shown: bool = False
 
   @abstractmethod
-  def handle_metadata(self, metadata: dict[str, Any]) -> None:
-    pass
-
-  @abstractmethod
-  def show_info(self, metadata: dict[str, Any]) -> None:
+  def handle_metadata(self, record: MetadataRecord) -> None:
     pass
 
-  def show_theme_changed(self) -> None:
+  def show_info(self, record: MetadataRecord) -> None:
+    self.updater.update_card_content(record.title, record.artist, record.image)
+    self.was_alert_card_shown = False
+    self.was_error_card_shown = False
+
+  def update_playback_state(self, record: MetadataRecord) -> None:
+    requires_update: bool = self.requires_update(record)
+    is_new_track: bool = self.card.playback_state.previous_track_id != record.track_id
+
+    # The previous info is really the same as the current one, but for comparison purposes
+    self.card.playback_state = self.card.playback_state.evolve(
+      track_id=record.track_id,
+      title=record.title,
+      artist=record.artist,
+      is_playing=record.is_playing,
+      shuffle_state=record.shuffle_state,
+      repeat_state=record.repeat_state,
+      volume_percent=record.volume_percent,
+      source=record.source,
+      previous_track_id=record.track_id,
+      previous_state_is_playing=record.is_playing,
+    )
+
+    if requires_update:
+      self.show_info(record)
+    now_playing.publish_playback(self.card.playback_state)
+
+    if is_new_track:
+      play_history.record(record.source, record.track_id, record.title, record.artist, self.updater.accent_color)
+
+  def show_theme_changed(self, is_os_dark: bool) -> None:
     if "adaptive" in config.current_theme_name:
-      if config.is_os_dark != darkdetect.isDark():  # another 'if' because this would be called even if the theme is not adaptive
+      if config.is_os_dark != is_os_dark:  # another 'if' because this would be called even if the theme is not adaptive
         config.switch_adaptive_theme()
-        self.card.set_theme()
-        self.animations.show_card()
+        self.updater.show_theme()
 
     if config.is_changing_theme:
-      self.card.set_theme()
-      self.animations.show_card()
+      self.updater.show_theme()
       config.is_changing_theme = False
 
   # Generic "show invalid info"
   def show_invalid_song_info(self, title: str, description: str, img_path: str = '', error: bool = False) -> None:
-    img_path: str = r"resources\img\warning.png" if img_path == '' else img_path
+    img_path: str = WARNING_IMG_PATH if img_path == '' else img_path
 
     self.updater.update_card_content(title, description, img_path)
 
@@ -100,15 +299,18 @@ class IMetadataHandler(ABC):
       self.was_error_card_shown = True
     else:
       self.was_alert_card_shown = True
-    self.card.playback_info["current_track_id"] = ''
+    self.card.playback_state = self.card.playback_state.evolve(track_id='')
+    now_playing.publish_playback(self.card.playback_state)
+
+  def requires_update(self, record: MetadataRecord) -> bool:
+    state: PlaybackState = self.card.playback_state
 
-  def requires_update(self) -> bool:
     # True if the song has changed
-    if self.card.playback_info["previous_track_id"] != self.card.playback_info["current_track_id"]:
+    if state.previous_track_id != record.track_id:
       return True
 
     # True if the song was paused and is now playing
-    if not self.card.playback_info["previous_state_is_playing"] and self.card.playback_info["is_playing"]:
+    if not state.previous_state_is_playing and record.is_playing:
       return True
 
     return False
@@ -117,7 +319,7 @@ class IMetadataHandler(ABC):
 class IPlaybackWorker(QObject, ABC, metaclass=MetaQObjectABC):
   """
   Handles the events triggered by the shortcuts.
-  These events can control the playback
+  These events can control the playback, the commands run one after another in the async engine
   """
   on_playback_shortcut: pyqtSignal = pyqtSignal(str)
 
@@ -128,6 +330,7 @@ class IPlaybackWorker(QObject, ABC, metaclass=MetaQObjectABC):
     self.volume: int = 0
     self.setting_volume: bool = False
     self.last_playback_order: int = 0
+    self.command_lock: asyncio.Lock = asyncio.Lock()  # keeps the commands in order, as a single thread did
 
     self.shortcut_functions: dict[str, Callable] = {
       "play_pause": self.play_pause,
@@ -139,7 +342,6 @@ class IPlaybackWorker(QObject, ABC, metaclass=MetaQObjectABC):
       "volume_down": lambda: self.change_volume(False)
     }
 
-    self.register_shortcuts()
     self.on_playback_shortcut.connect(self.execute_shortcut)
 
   @pyqtSlot(str)
@@ -147,10 +349,18 @@ class IPlaybackWorker(QObject, ABC, metaclass=MetaQObjectABC):
     if self.card.is_snoozing:
       return
 
-    self.shortcut_functions[shortcut]()
+    engine.submit(self.run_command(shortcut))
+
+  async def run_command(self, shortcut: str) -> None:
+    async with self.command_lock:
+      try:
+        await engine.run_blocking(profiler.profile(self.shortcut_functions[shortcut]), timeout=config.get_pr("command_timeout_ms"))
+      except asyncio.TimeoutError:
+        logger.warning("Playback command timed out", extra={ "shortcut": shortcut, "timeout_ms": config.get_pr("command_timeout_ms") })
 
   @abstractmethod
   def register_shortcuts(self) -> None:
+    # Called once by the ShortcutHandler, not for the backends wrapped by an aggregator
     pass
 
   @abstractmethod
@@ -0,0 +1,278 @@
+import asyncio, hashlib, json, logging, requests, time
+from keyboard import add_hotkey
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import urlencode, urlsplit, SplitResult
+
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.async_engine import engine
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.card import MusicCard
+
+logger: logging.Logger = get_logger(__name__)
+
+COLUMNS: tuple[str, ...] = ("%path%", "%title%", "%artist%")
+REPEAT_MODES: dict[str, str] = { "Repeat (playlist)": "context", "Repeat (track)": "track" }
+SHUFFLE_MODES: tuple[str, ...] = ("Random", "Shuffle (tracks)", "Shuffle (albums)", "Shuffle (folders)")
+DEFAULT_MODE: str = "Default"
+REQUEST_TIMEOUT: int = 5  # seconds
+DEFAULT_PORTS: dict[str, int] = { "http": 80, "https": 443 }
+
+
+class BeefwebClient(metaclass=ConfigRelatedMeta):
+  """
+  Blocking calls to the REST API of beefweb (foobar2000's web interface component)
+  """
+  def __init__(self) -> None:
+    self.base_url: str = (config.get_pr("beefweb_url") or '').rstrip("/")
+
+  def get_player(self) -> dict[str, Any]:
+    response: requests.Response = requests.get(f"{self.base_url}/api/player", params={ "columns": ",".join(COLUMNS) }, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["player"]
+
+  def get_playlist_item(self, playlist_id: str, index: int) -> dict[str, Any] | None:
+    response: requests.Response = requests.get(
+      f"{self.base_url}/api/playlists/{playlist_id}/items/{index}:1", params={ "columns": COLUMNS[0] }, timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    items: list[dict[str, Any]] = response.json()["playlistItems"]["items"]
+    return { "playlistId": playlist_id, "index": index, **items[0] } if items else None
+
+  def post(self, path: str, payload: dict[str, Any] | None = None) -> None:
+    response: requests.Response = requests.post(f"{self.base_url}/api/player{path}", json=payload, timeout=REQUEST_TIMEOUT)
+
+    if response.status_code >= 300:
+      logger.warning("Failed to send command", extra={ "path": path, "status": response.status_code })
+      return
+
+    logger.debug("Command sent", extra={ "path": path, "payload": payload })
+
+  def get_artwork_url(self, item: dict[str, Any], path: str) -> str:
+    # The playlist position can hold another track later, the digest of the path keeps the image cache right
+    digest: str = hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{self.base_url}/api/artwork/{item.get('playlistId')}/{item.get('index')}?track={digest}"
+
+  def get_updates_request(self) -> tuple[SplitResult, bytes]:
+    # HTTP/1.0, so the event stream comes without chunked encoding
+    url: SplitResult = urlsplit(self.base_url)
+    if url.scheme not in DEFAULT_PORTS:
+      raise ValueError(f"'beefweb_url' must be an http:// or https:// URL, not {self.base_url!r}")
+
+    query: str = urlencode({ "player": "true", "trcolumns": ",".join(COLUMNS) })
+    request: str = f"GET {url.path}/api/query/updates?{query} HTTP/1.0\r\nHost: {url.netloc}\r\nAccept: text/event-stream\r\n\r\n"
+    return url, request.encode("ascii")
+
+  # Player state
+  @staticmethod
+  def get_mode(player: dict[str, Any]) -> str:
+    modes: list[str] = player.get("playbackModes") or []
+    index: int = player.get("playbackMode", -1)
+    return modes[index] if 0 <= index < len(modes) else DEFAULT_MODE
+
+  @staticmethod
+  def get_volume_percent(volume: dict[str, Any]) -> int:
+    # The range is in dB or linear depending on the output, the card shows it as a percentage of it
+    low, high = volume.get("min", -100), volume.get("max", 0)
+    if volume.get("isMuted") or high <= low:
+      return 0
+
+    return round((volume.get("value", low) - low) / (high - low) * 100)
+
+
+class BeefwebMetadataWorker(IMetadataWorker):
+  """
+  Subscribes to beefweb's player updates (server-sent events from /api/query/updates) instead of polling:
+  track, state, volume, shuffle and repeat changes arrive as they happen. The subscription is closed while
+  the updater doesn't want records, and reopened with the full state when it does again
+  """
+  def __init__(self):
+    super().__init__()
+    self.client: BeefwebClient = BeefwebClient()
+    self.player: dict[str, Any] = { }  # the events only carry what changed
+
+  def get_metadata(self) -> MetadataRecord:
+    # One-off read of the state (requested polls)
+    try:
+      return self.to_record(self.client.get_player())
+
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+      logger.warning("beefweb not reachable (%s)", e)
+      return MetadataRecord("not_found", is_os_dark=self.get_is_os_dark())
+
+  def update_polling(self, is_polling: bool) -> None:
+    if not is_polling and self.poll_task:
+      self.poll_task.cancel()  # nothing waits for the next event with the subscription open
+      self.poll_task = None
+
+    super().update_polling(is_polling)
+
+  async def poll(self) -> None:
+    while self.is_polling:
+      try:
+        await self.subscribe()
+
+      except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+        delay: int = config.get_pr("beefweb_reconnect_delay")
+        logger.warning("beefweb subscription lost (%r), reconnecting in %dms", e, delay)
+        metrics.increment("beefweb_reconnects")
+
+        self.player = { }
+        await self.fetch()  # the 'not found' card, if it is really gone
+        await asyncio.sleep(delay / 1000)
+
+  async def subscribe(self) -> None:
+    url, request = self.client.get_updates_request()
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or DEFAULT_PORTS[url.scheme], ssl=url.scheme == "https")
+
+    try:
+      writer.write(request)
+      await writer.drain()
+
+      status: bytes = await reader.readline()
+      if b" 200 " not in status:
+        raise ValueError(f"unexpected response {status.strip()!r}")
+      while (await reader.readline()).strip():
+        pass  # headers
+
+      metrics.increment("beefweb_subscriptions")
+      data: list[str] = []
+      while True:
+        line: bytes = await reader.readline()
+        if not line:
+          raise ConnectionResetError("the event stream was closed")
+
+        text: str = line.decode("utf-8").rstrip("\r\n")
+        if text.startswith("data:"):
+          data.append(text[5:].lstrip())
+        elif not text and data:
+          event: dict[str, Any] = json.loads("\n".join(data))
+          data = []
+          if "player" in event:
+            await self.on_player(event["player"])
+
+    finally:
+      writer.close()
+
+  async def on_player(self, player: dict[str, Any]) -> None:
+    started: float = time.perf_counter()
+    self.player = { **self.player, **player }
+    metrics.increment("beefweb_events")
+
+    record: MetadataRecord = await engine.run_blocking(self.to_record, self.player)  # darkdetect may block
+    async with self.fetch_lock:
+      self.fetch_started = started
+      await self.deliver(record)
+
+  def to_record(self, player: dict[str, Any]) -> MetadataRecord:
+    is_os_dark: bool = self.get_is_os_dark()
+    item: dict[str, Any] = player.get("activeItem") or { }
+    columns: list[str] = item.get("columns") or []
+
+    if player.get("playbackState", "stopped") == "stopped" or len(columns) < len(COLUMNS):
+      return MetadataRecord("stopped", is_os_dark=is_os_dark)
+
+    path, title, artist = columns[:len(COLUMNS)]
+    mode: str = self.client.get_mode(player)
+    return MetadataRecord(
+      "track",
+      track_id=path,
+      title=title or "<unknown>",
+      artist=artist or "<unknown>",
+      image=self.client.get_artwork_url(item, path),
+      is_playing=player.get("playbackState") == "playing",
+      shuffle_state=mode in SHUFFLE_MODES,
+      repeat_state=REPEAT_MODES.get(mode, "off"),
+      volume_percent=self.client.get_volume_percent(player.get("volume") or { }),
+      is_os_dark=is_os_dark,
+    )
+
+  def get_next_image(self, record: MetadataRecord) -> str | None:
+    # The next entry of the active playlist (the first one again when repeating it). Unknown when shuffling
+    player: dict[str, Any] = self.player
+    item: dict[str, Any] = player.get("activeItem") or { }
+    mode: str = self.client.get_mode(player)
+    if mode not in (DEFAULT_MODE, "Repeat (playlist)") or item.get("index", -1) < 0:
+      return None
+
+    next_item: dict[str, Any] | None = self.client.get_playlist_item(item["playlistId"], item["index"] + 1)
+    if next_item is None and mode == "Repeat (playlist)":
+      next_item = self.client.get_playlist_item(item["playlistId"], 0)
+
+    columns: list[str] = (next_item or { }).get("columns") or []
+    return self.client.get_artwork_url(next_item, columns[0]) if columns else None
+
+
+class BeefwebMetadataHandler(IMetadataHandler):
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    if record.kind == "not_found" and not self.was_error_card_shown:
+      title: str = "foobar2000 not reachable"
+      description: str = "Check if foobar2000 is running with the beefweb component and the 'beefweb_url' preference"
+
+      self.show_invalid_song_info(title, description, error=True)
+      return
+
+    if record.kind == "stopped" and not self.was_alert_card_shown:
+      self.show_invalid_song_info("Not playing", "Turn on foobar2000 and play a great playlist")
+      return
+
+    if record.kind != "track":
+      return
+
+    self.update_playback_state(record)
+
+
+class BeefwebPlaybackWorker(IPlaybackWorker):
+  def __init__(self, card: "MusicCard"):
+    super().__init__(card)
+    self.client: BeefwebClient = BeefwebClient()
+
+  def register_shortcuts(self) -> None:
+    is_string: Callable[[str], bool] = lambda sc: config.get_pr(f"{sc}_shortcut") and isinstance(config.get_pr(f"{sc}_shortcut"), str)
+
+    for shortcut in self.shortcut_functions.keys():
+      if is_string(shortcut):
+        add_hotkey(config.get_pr(f"{shortcut}_shortcut"), lambda key=shortcut: self.on_playback_shortcut.emit(key))
+
+  def play_pause(self) -> None:
+    self.client.post("/pause/toggle")
+
+  def next_track(self) -> None:
+    self.client.post("/next")
+
+  def previous_track(self) -> None:
+    self.client.post("/previous")
+
+  def set_mode(self, modes: list[str], mode: str) -> None:
+    if mode not in modes:
+      logger.warning("Playback mode not available", extra={ "mode": mode, "modes": modes })
+      return
+
+    self.client.post('', { "playbackMode": modes.index(mode) })
+    logger.info("Playback mode set to: %s", mode)
+
+  def change_order(self) -> None:
+    # The modes are read right before, their indexes depend on the foobar2000 version
+    player: dict[str, Any] = self.client.get_player()
+    is_shuffled: bool = self.client.get_mode(player) in SHUFFLE_MODES
+    self.set_mode(player.get("playbackModes") or [], DEFAULT_MODE if is_shuffled else "Shuffle (tracks)")
+
+  def toggle_repeat(self) -> None:
+    player: dict[str, Any] = self.client.get_player()
+    cycle: list[str] = [DEFAULT_MODE, *REPEAT_MODES]
+    mode: str = self.client.get_mode(player)
+    next_mode: str = cycle[(cycle.index(mode) + 1) % len(cycle)] if mode in cycle else cycle[1]
+    self.set_mode(player.get("playbackModes") or [], next_mode)
+
+  def change_volume(self, increase: bool) -> None:
+    volume: dict[str, Any] = self.client.get_player().get("volume") or { }
+    low, high = volume.get("min", -100), volume.get("max", 0)
+    step: float = (high - low) * 0.05
+
+    value: float = volume.get("value", low) + (step if increase else -step)
+    self.client.post('', { "volume": min(max(value, low), high) })
+    logger.debug("Volume: %d", self.client.get_volume_percent({ **volume, "value": value }))
@@ -1,6 +1,4 @@
 from abc import ABC, abstractmethod
-from media_players.spotify import SpotifyMetadataWorker, SpotifyMetadataHandler, SpotifyPlaybackWorker
-from media_players.fb2k import FB2KMetadataWorker, FB2KMetadataHandler, FB2KPlaybackWorker
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
@@ -9,6 +7,10 @@ if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runti
   from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker
 
 class IMediaPlayerFactory(ABC):
+  """
+  The backends are only imported when they are used: the unused ones (e.g. spotipy and its dependencies)
+  don't slow down the startup, and the ones a platform can't import (QtDBus on Windows) don't break it
+  """
   @abstractmethod
   def create_metadata_worker(self) -> "IMetadataWorker":
     pass
@@ -24,30 +26,108 @@ class IMediaPlayerFactory(ABC):
 
 class SpotifyFactory(IMediaPlayerFactory):
   def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.spotify import SpotifyMetadataWorker
     return SpotifyMetadataWorker()
 
   def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    from media_players.spotify import SpotifyMetadataHandler
     return SpotifyMetadataHandler(card, updater)
 
   def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.spotify import SpotifyPlaybackWorker
     return SpotifyPlaybackWorker(card)
 
 
 class FB2KFactory(IMediaPlayerFactory):
   def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.fb2k import FB2KMetadataWorker
     return FB2KMetadataWorker()
 
   def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    from media_players.fb2k import FB2KMetadataHandler
     return FB2KMetadataHandler(card, updater)
 
   def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.fb2k import FB2KPlaybackWorker
     return FB2KPlaybackWorker(card)
 
 
-def get_factory(media_player: str) -> IMediaPlayerFactory:
+class BeefwebFactory(IMediaPlayerFactory):
+  def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.beefweb import BeefwebMetadataWorker
+    return BeefwebMetadataWorker()
+
+  def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    from media_players.beefweb import BeefwebMetadataHandler
+    return BeefwebMetadataHandler(card, updater)
+
+  def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.beefweb import BeefwebPlaybackWorker
+    return BeefwebPlaybackWorker(card)
+
+
+class ReplayFactory(IMediaPlayerFactory):
+  def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.replay import ReplayMetadataWorker
+    return ReplayMetadataWorker()
+
+  def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    from media_players.replay import ReplayMetadataHandler
+    return ReplayMetadataHandler(card, updater)
+
+  def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.replay import ReplayPlaybackWorker
+    return ReplayPlaybackWorker(card)
+
+
+class MprisFactory(IMediaPlayerFactory):
+  def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.mpris import MprisMetadataWorker
+    return MprisMetadataWorker()
+
+  def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    from media_players.mpris import MprisMetadataHandler
+    return MprisMetadataHandler(card, updater)
+
+  def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.mpris import MprisPlaybackWorker
+    return MprisPlaybackWorker(card)
+
+
+class AggregatorFactory(IMediaPlayerFactory):
+  """
+  Several backends at once ('media_player' is a list), the card follows the one that is playing
+  """
+  def __init__(self, media_players: list[str]) -> None:
+    self.factories: dict[str, IMediaPlayerFactory] = { name: get_factory(name) for name in media_players }
+
+  def create_metadata_worker(self) -> "IMetadataWorker":
+    from media_players.aggregator import AggregatorMetadataWorker
+    return AggregatorMetadataWorker({ name: factory.create_metadata_worker() for name, factory in self.factories.items() })
+
+  def create_metadata_handler(self, card: "MusicCard", updater: "UpdateHandler") -> "IMetadataHandler":
+    handlers: dict[str, "IMetadataHandler"] = { name: factory.create_metadata_handler(card, updater) for name, factory in self.factories.items() }
+    from media_players.aggregator import AggregatorMetadataHandler
+    return AggregatorMetadataHandler(card, updater, handlers)
+
+  def create_playback_worker(self, card: "MusicCard") -> "IPlaybackWorker":
+    from media_players.aggregator import AggregatorPlaybackWorker
+    return AggregatorPlaybackWorker(card, { name: factory.create_playback_worker(card) for name, factory in self.factories.items() })
+
+
+def get_factory(media_player: str | list[str]) -> IMediaPlayerFactory:
+  if isinstance(media_player, list):
+    return AggregatorFactory(media_player) if len(media_player) > 1 else get_factory(media_player[0])
+
   if media_player == "spotify":
     return SpotifyFactory()
   elif media_player == "fb2k":
     return FB2KFactory()
+  elif media_player == "beefweb":
+    return BeefwebFactory()
+  elif media_player == "mpris":
+    return MprisFactory()
+  elif media_player == "replay":
+    return ReplayFactory()
   else:
     raise ValueError(f"Unknown media player: {media_player}")
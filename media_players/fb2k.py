@@ -1,26 +1,31 @@
-import os, requests
+import logging, os, requests
 from keyboard import add_hotkey
-from typing import TypedDict, Any, Callable
+from typing import TypedDict, Callable
 
-from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
 from media_players.helpers.image_extractor import extract_embedded_image
 from config.config_main import config
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
 
 
 class MetadataDict(TypedDict):
   filepath: str
   title: str
   artist: str
-  image: bytes | None
   is_playing: bool
 
 class FB2KMetadataWorker(IMetadataWorker):
-  def get_metadata(self) -> None:
-    print(f"Fetching metadata...")
+  def __init__(self):
+    super().__init__()
+    self.last_image: tuple[str, bytes | None] = ('', None)  # (filepath, embedded image)
+
+  def get_metadata(self) -> MetadataRecord | None:
+    logger.debug("Fetching metadata")
 
     if not os.path.exists(config.NOWPLAYING_TXT_PATH) and not config.NOWPLAYING_TXT_PATH.endswith(".txt"):
-      self.finished.emit({ })
-      return
+      return MetadataRecord("not_found", is_os_dark=self.get_is_os_dark())
 
     with open(config.NOWPLAYING_TXT_PATH, "r", encoding="utf-8") as file:
       lines = file.read().strip().split("\\n")
@@ -28,27 +33,26 @@ class FB2KMetadataWorker(IMetadataWorker):
     # Sometimes the nowplaying text file can be empty (likely due to a bug from nowplaying fb2k component)
     if len(lines) == 1 and lines[0] == '' and config.is_nowplaying_txt_valid:
       if self.tries >= 5:
-        self.finished.emit({ "case_error": "invalid_data" })
-        return
+        return MetadataRecord("invalid_data", is_os_dark=self.get_is_os_dark())
 
       self.try_again(1000)
-      return
+      return None
 
     if len(lines) <= 3:
-      self.finished.emit({ "case_error": "invalid_data" })
-      return
+      return MetadataRecord("invalid_data", is_os_dark=self.get_is_os_dark())
 
     metadata: MetadataDict = {
       "filepath": lines[0],
       "title": lines[1],
       "artist": lines[2],
-      "image": extract_embedded_image(filepath=lines[0]),
       "is_playing": True if lines[3] != '1' else False
     }
 
     if metadata["filepath"] == "":
-      self.finished.emit({ "case_error": "invalid_data" })
-      return
+      return MetadataRecord("invalid_data", is_os_dark=self.get_is_os_dark())
+
+    if self.is_fb2k_standby(metadata):
+      return MetadataRecord("standby", is_os_dark=self.get_is_os_dark())
 
     # Fallback
     if not metadata["title"]:
@@ -59,60 +63,52 @@ class FB2KMetadataWorker(IMetadataWorker):
     config.is_nowplaying_txt_valid = True  # The nowplaying text file is valid
     self.tries = 0
 
-    self.finished.emit(metadata)
+    return MetadataRecord(
+      "track",
+      track_id=metadata["filepath"],
+      title=metadata["title"],
+      artist=metadata["artist"],
+      image=self.get_image(metadata["filepath"]),
+      is_playing=metadata["is_playing"],
+      is_os_dark=self.get_is_os_dark(),
+    )
 
+  def get_image(self, filepath: str) -> bytes | None:
+    # The artwork is only read from the audio file when the track changes, not on every poll
+    if self.last_image[0] != filepath:
+      self.last_image = (filepath, extract_embedded_image(filepath=filepath))
+
+    return self.last_image[1]
 
-class FB2KMetadataHandler(IMetadataHandler):
   @staticmethod
-  def is_fb2k_standby(metadata: dict[str, Any]) -> bool:
+  def is_fb2k_standby(metadata: MetadataDict) -> bool:
     return metadata.get("title") == "?" and metadata.get("artist") == "?" and metadata.get("filepath") == "?"
 
-  def handle_metadata(self, metadata: dict[str, Any]) -> None:
-    if not isinstance(metadata, dict) and self.was_alert_card_shown:
-      return
 
-    if self.is_fb2k_standby(metadata) and not self.was_alert_card_shown:
+class FB2KMetadataHandler(IMetadataHandler):
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    if record.kind == "standby" and not self.was_alert_card_shown:
       self.show_invalid_song_info("Not playing", "Turn on foobar2000 and play a great playlist")
       return
 
-    if not metadata and not self.was_alert_card_shown:
+    if record.kind == "not_found" and not self.was_alert_card_shown:
       title: str = "Nowplaying text file not found"
       description: str = "Check if the file path is correct and if you have the corresponding foobar2000 component installed"
 
       self.show_invalid_song_info(title, description)
       return
 
-    if metadata.get("case_error") == "invalid_data" and not self.was_error_card_shown:
+    if record.kind == "invalid_data" and not self.was_error_card_shown:
       title: str = "Nowplaying text file is invalid"
       description: str = "Check if the components' params are correct. More info in the readme file"
 
       self.show_invalid_song_info(title, description, error=True)
       return
 
-    if self.is_fb2k_standby(metadata) or not metadata or metadata.get("case_error"):
+    if record.kind != "track":
       return  # Not show the card until all is ok
 
-    self.card.playback_info["current_track_id"] = metadata["filepath"]
-    self.card.playback_info["current_track"] = metadata
-    self.card.playback_info["is_playing"] = metadata["is_playing"]
-    self.card.playback_info["shuffle_state"] = False
-    self.card.playback_info["repeat_state"] = "off"
-    self.card.playback_info["volume_percent"] = 0
-
-    if self.requires_update():
-      self.show_info(metadata)
-
-    self.card.playback_info["previous_track_id"] = self.card.playback_info["current_track_id"]
-    self.card.playback_info["previous_state_is_playing"] = self.card.playback_info["is_playing"]
-
-  def show_info(self, metadata: dict[str, str | bytes | None]) -> None:
-    title: str = metadata["title"]
-    artist: str = metadata["artist"]
-    image: str | bytes | None = metadata["image"]
-
-    self.updater.update_card_content(title, artist, image)
-    self.was_alert_card_shown = False
-    self.was_error_card_shown = False
+    self.update_playback_state(record)
 
 
 class FB2KPlaybackWorker(IPlaybackWorker):
@@ -155,10 +151,10 @@ class FB2KPlaybackWorker(IPlaybackWorker):
     }
 
     if not cmd in COMMANDS:
-      print("Command not found")
+      logger.warning("Command not found", extra={ "command": cmd })
       return
     if not param in PARAMS:
-      print("Parameter not found")
+      logger.warning("Parameter not found", extra={ "param": param })
       return
 
     cmd = f"?cmd={COMMANDS[cmd]}"
@@ -169,16 +165,16 @@ class FB2KPlaybackWorker(IPlaybackWorker):
 
     endpoint: str = "http://127.0.0.1:8888/default/"
     url: str = endpoint + cmd + param
-    request: requests.Response = requests.get(url)
+    request: requests.Response = requests.get(url, timeout=config.get_pr("command_timeout_ms") / 1000)
 
     if request.status_code != 200:
-      print("Failed to send command.")
+      logger.warning("Failed to send command", extra={ "url": url, "status": request.status_code })
       return
 
     if cmd == "?cmd=PlaybackOrder" and param != "&param1=":
       self.last_playback_order = PARAMS[param] # save the last playback order
 
-    print("Command sent successfully.")
+    logger.debug("Command sent", extra={ "url": url })
 
   def play_pause(self) -> None:
     self.send_command("play_pause")
@@ -0,0 +1,238 @@
+import logging
+from keyboard import add_hotkey
+from PyQt5.QtCore import pyqtSlot
+from PyQt5.QtDBus import QDBus, QDBusConnection, QDBusMessage, QDBusVariant
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import unquote, urlsplit
+
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.async_engine import engine
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.card import MusicCard
+
+logger: logging.Logger = get_logger(__name__)
+
+MPRIS_PREFIX: str = "org.mpris.MediaPlayer2."
+OBJECT_PATH: str = "/org/mpris/MediaPlayer2"
+PLAYER_INTERFACE: str = "org.mpris.MediaPlayer2.Player"
+PROPERTIES_INTERFACE: str = "org.freedesktop.DBus.Properties"
+LOOP_STATUSES: dict[str, str] = { "None": "off", "Playlist": "context", "Track": "track" }
+CALL_TIMEOUT: int = 2000  # ms
+
+
+class MprisClient(metaclass=ConfigRelatedMeta):
+  """
+  Blocking D-Bus calls to the MPRIS players of the session bus (the connection can be used from any thread).
+  'mpris_player' narrows them down to one player (e.g. "vlc"), otherwise the playing one is used
+  """
+  def __init__(self) -> None:
+    self.bus: QDBusConnection = QDBusConnection.sessionBus()
+    self.player_name: str = config.get_pr("mpris_player") or ''
+
+  def call(self, service: str, path: str, interface: str, method: str, *args: Any) -> list[Any]:
+    message: QDBusMessage = QDBusMessage.createMethodCall(service, path, interface, method)
+    message.setArguments(list(args))
+
+    reply: QDBusMessage = self.bus.call(message, QDBus.Block, CALL_TIMEOUT)
+    if reply.type() == QDBusMessage.ErrorMessage:
+      raise ConnectionError(f"{reply.errorName()}: {reply.errorMessage()}")
+
+    return reply.arguments()
+
+  def get_players(self) -> list[str]:
+    names: list[str] = self.call("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "ListNames")[0]
+    players: list[str] = sorted(name for name in names if name.startswith(MPRIS_PREFIX))
+
+    if self.player_name:  # also matches the instances, e.g. org.mpris.MediaPlayer2.vlc.instance1234
+      players = [name for name in players if name[len(MPRIS_PREFIX):].split(".")[0] == self.player_name]
+    return players
+
+  def get_properties(self, service: str) -> dict[str, Any]:
+    return self.call(service, OBJECT_PATH, PROPERTIES_INTERFACE, "GetAll", PLAYER_INTERFACE)[0]
+
+  def get_active_player(self) -> tuple[str, dict[str, Any]] | None:
+    # The playing one, otherwise the first one that answers
+    found: tuple[str, dict[str, Any]] | None = None
+
+    for service in self.get_players():
+      try:
+        properties: dict[str, Any] = self.get_properties(service)
+      except ConnectionError:
+        continue
+
+      if properties.get("PlaybackStatus") == "Playing":
+        return service, properties
+      found = found or (service, properties)
+
+    return found
+
+  def send(self, service: str, method: str) -> None:
+    self.call(service, OBJECT_PATH, PLAYER_INTERFACE, method)
+    logger.debug("Command sent", extra={ "service": service, "method": method })
+
+  def set_property(self, service: str, name: str, value: Any) -> None:
+    self.call(service, OBJECT_PATH, PROPERTIES_INTERFACE, "Set", PLAYER_INTERFACE, name, QDBusVariant(value))
+    logger.debug("Property set", extra={ "service": service, "property": name, "value": value })
+
+
+class MprisMetadataWorker(IMetadataWorker):
+  """
+  Listens for PropertiesChanged from the MPRIS players instead of polling. A change is read right away
+  while the updater wants records, and the state is read once more when it starts wanting them again
+  """
+  def __init__(self):
+    super().__init__()
+    self.client: MprisClient = MprisClient()
+
+    # Delivered by the GUI thread's event loop, the reads happen in the engine
+    bus: QDBusConnection = self.client.bus
+    bus.connect('', OBJECT_PATH, PROPERTIES_INTERFACE, "PropertiesChanged", self.on_properties_changed)
+    bus.connect("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "NameOwnerChanged", self.on_name_owner_changed)
+
+  @pyqtSlot(QDBusMessage)
+  def on_properties_changed(self, message: QDBusMessage) -> None:
+    arguments: list[Any] = message.arguments()
+    if arguments and arguments[0] == PLAYER_INTERFACE:
+      metrics.increment("mpris_signals")
+      self.read_changes()
+
+  @pyqtSlot(QDBusMessage)
+  def on_name_owner_changed(self, message: QDBusMessage) -> None:
+    # A player started or quit
+    arguments: list[Any] = message.arguments()
+    if arguments and str(arguments[0]).startswith(MPRIS_PREFIX):
+      self.read_changes()
+
+  def read_changes(self) -> None:
+    # Players send several signals for one change (e.g. Metadata, then PlaybackStatus), the last read wins
+    if self.is_polling:
+      engine.submit(self.fetch(), key="mpris-read")
+
+  async def poll(self) -> None:
+    # No polling, the signals do the rest
+    await self.fetch()
+
+  def get_metadata(self) -> MetadataRecord:
+    is_os_dark: bool = self.get_is_os_dark()
+    try:
+      player: tuple[str, dict[str, Any]] | None = self.client.get_active_player()
+    except ConnectionError as e:
+      logger.warning("D-Bus session bus not reachable (%s)", e)
+      return MetadataRecord("not_found", is_os_dark=is_os_dark)
+
+    if not player:
+      return MetadataRecord("no_player", is_os_dark=is_os_dark)
+
+    service, properties = player
+    metadata: dict[str, Any] = properties.get("Metadata") or { }
+    status: str = properties.get("PlaybackStatus") or "Stopped"
+    if status == "Stopped" or not metadata:
+      return MetadataRecord("stopped", is_os_dark=is_os_dark)
+
+    artists: list[str] | str = metadata.get("xesam:artist") or []
+    return MetadataRecord(
+      "track",
+      track_id=str(metadata.get("mpris:trackid") or metadata.get("xesam:url") or metadata.get("xesam:title") or ''),
+      title=metadata.get("xesam:title") or "<unknown>",
+      artist=(artists if isinstance(artists, str) else ", ".join(artists)) or "<unknown>",
+      image=self.get_image(metadata.get("mpris:artUrl")),
+      is_playing=status == "Playing",
+      shuffle_state=bool(properties.get("Shuffle")),
+      repeat_state=LOOP_STATUSES.get(properties.get("LoopStatus"), "off"),
+      volume_percent=round((properties.get("Volume") or 0) * 100),
+      is_os_dark=is_os_dark,
+    )
+
+  @staticmethod
+  def get_image(art_url: str | None) -> str | None:
+    # Players point to a local file (file://) or to an URL
+    if not art_url:
+      return None
+
+    url = urlsplit(art_url)
+    if url.scheme == "file":
+      return unquote(url.path)
+
+    return art_url if url.scheme in ("http", "https") else None
+
+
+class MprisMetadataHandler(IMetadataHandler):
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    if record.kind == "not_found" and not self.was_error_card_shown:
+      self.show_invalid_song_info("D-Bus not reachable", "The MPRIS backend needs a D-Bus session bus", error=True)
+      return
+
+    if record.kind == "no_player" and not self.was_alert_card_shown:
+      description: str = f"Start {config.get_pr('mpris_player')}" if config.get_pr("mpris_player") else "Start a player with MPRIS support"
+      self.show_invalid_song_info("No player found", description)
+      return
+
+    if record.kind == "stopped" and not self.was_alert_card_shown:
+      self.show_invalid_song_info("Not playing", "The player is stopped")
+      return
+
+    if record.kind != "track":
+      return
+
+    self.update_playback_state(record)
+
+
+class MprisPlaybackWorker(IPlaybackWorker):
+  def __init__(self, card: "MusicCard"):
+    super().__init__(card)
+    self.client: MprisClient = MprisClient()
+
+  def register_shortcuts(self) -> None:
+    is_string: Callable[[str], bool] = lambda sc: config.get_pr(f"{sc}_shortcut") and isinstance(config.get_pr(f"{sc}_shortcut"), str)
+
+    for shortcut in self.shortcut_functions.keys():
+      if is_string(shortcut):
+        add_hotkey(config.get_pr(f"{shortcut}_shortcut"), lambda key=shortcut: self.on_playback_shortcut.emit(key))
+
+  def get_player(self) -> tuple[str, dict[str, Any]] | None:
+    # The player is looked up for every command, the one playing can change at any time
+    try:
+      player: tuple[str, dict[str, Any]] | None = self.client.get_active_player()
+    except ConnectionError as e:
+      logger.warning("D-Bus session bus not reachable (%s)", e)
+      return None
+
+    if not player:
+      logger.info("No MPRIS player to control")
+    return player
+
+  def play_pause(self) -> None:
+    if player := self.get_player():
+      self.client.send(player[0], "PlayPause")
+
+  def next_track(self) -> None:
+    if player := self.get_player():
+      self.client.send(player[0], "Next")
+
+  def previous_track(self) -> None:
+    if player := self.get_player():
+      self.client.send(player[0], "Previous")
+
+  def change_order(self) -> None:
+    if player := self.get_player():
+      service, properties = player
+      self.client.set_property(service, "Shuffle", not properties.get("Shuffle"))
+
+  def toggle_repeat(self) -> None:
+    if player := self.get_player():
+      service, properties = player
+      statuses: list[str] = list(LOOP_STATUSES)
+      status: str = properties.get("LoopStatus") or statuses[0]
+      index: int = statuses.index(status) if status in statuses else 0
+      self.client.set_property(service, "LoopStatus", statuses[(index + 1) % len(statuses)])
+
+  def change_volume(self, increase: bool) -> None:
+    if player := self.get_player():
+      service, properties = player
+      volume: float = (properties.get("Volume") or 0) + (0.05 if increase else -0.05)
+      self.client.set_property(service, "Volume", round(min(max(volume, 0.0), 1.0), 2))
@@ -0,0 +1,276 @@
+import bisect, json, logging, os, threading, time
+from keyboard import add_hotkey
+from typing import TYPE_CHECKING, Any, Callable
+
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
+from media_players.helpers.image_extractor import extract_embedded_image
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.file_handling import File
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.card import MusicCard
+
+logger: logging.Logger = get_logger(__name__)
+
+SNAPSHOT_TYPES: tuple[str, ...] = ("track", "ad", "none", "error")
+RECORD_KINDS: dict[str, str] = { "track": "track", "ad": "ad", "none": "not_playing", "error": "error" }
+DEFAULT_GAP_MS: int = 1000  # Time between snapshots without 'at', and how long the last one lasts
+REPEAT_MODES: list[str] = ["off", "context", "track"]
+
+
+class ReplayTrace(metaclass=ConfigRelatedMeta):
+  """
+  Playback snapshots read from a JSONL trace, one per line:
+    {"at": 0, "type": "track", "id": "1", "title": "...", "artist": "...", "image": "cover.jpg", "is_playing": true}
+  'at' is the time (ms) at which the snapshot starts, 'type' is one of track/ad/none/error and 'image'
+  is a path (relative to the trace) or an URL ('filepath' extracts the artwork embedded in an audio file instead).
+  The position moves with the clock times 'replay_speed'. With a speed of 0 every poll gets the next snapshot,
+  so the trace goes as fast as the pipeline can accept it
+  """
+  def __init__(self) -> None:
+    self.path: str = File.get_relative_path(config.get_pr("replay_trace_path") or "")
+    self.speed: float = float(config.get_pr("replay_speed") or 0)
+    self.loop: bool = bool(config.get_pr("replay_loop"))
+
+    self.lock: threading.Lock = threading.Lock()
+    self.snapshots: list[dict[str, Any]] = self.load(self.path)
+    self.starts: list[int] = [snapshot["at"] for snapshot in self.snapshots]
+    self.period: int = self.starts[-1] + DEFAULT_GAP_MS if self.snapshots else 0
+
+    # Replay position
+    self.index: int = 0
+    self.offset: float = 0.0
+    self.started_at: float = time.perf_counter()
+    self.is_paused: bool = False
+
+    # Changed by the playback shortcuts, they override the values of the trace
+    self.overrides: dict[str, Any] = { }
+
+  # Loading
+  @classmethod
+  def load(cls, path: str) -> list[dict[str, Any]]:
+    if not os.path.isfile(path):
+      logger.warning("Replay trace not found", extra={ "path": path })
+      return []
+
+    snapshots: list[dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as file:
+      for line_number, line in enumerate(file, 1):
+        if not line.strip():
+          continue
+
+        try:
+          snapshot: dict[str, Any] = cls.normalize(json.loads(line), os.path.dirname(path))
+        except (ValueError, TypeError) as e:
+          logger.warning("Skipping replay trace line %d (%s)", line_number, e)
+          continue
+
+        if "at" not in snapshot:
+          snapshot["at"] = snapshots[-1]["at"] + DEFAULT_GAP_MS if snapshots else 0
+        snapshots.append(snapshot)
+
+    snapshots.sort(key=lambda snapshot: snapshot["at"])  # stable, so snapshots at the same time keep their order
+    logger.info("Replay trace loaded", extra={ "path": path, "snapshots": len(snapshots) })
+    return snapshots
+
+  @staticmethod
+  def normalize(entry: dict[str, Any], trace_dir: str) -> dict[str, Any]:
+    if entry.get("type", "track") not in SNAPSHOT_TYPES:
+      raise ValueError(f"unknown snapshot type {entry.get('type')!r}")
+
+    snapshot: dict[str, Any] = {
+      "type": entry.get("type", "track"),
+      "id": str(entry.get("id") or entry.get("filepath") or entry.get("title") or ''),
+      "title": entry.get("title") or "<unknown>",
+      "artist": entry.get("artist") or "<unknown>",
+      "image": entry.get("image"),
+      "filepath": entry.get("filepath"),
+      "is_playing": entry.get("is_playing", True),
+      "shuffle_state": entry.get("shuffle", False),
+      "repeat_state": entry.get("repeat", "off"),
+      "volume_percent": entry.get("volume", 0),
+      "error": entry.get("error", ''),
+    }
+
+    # Local artwork is relative to the trace, so traces can be moved along with their images
+    image: str | None = snapshot["image"]
+    if image and not image.startswith("http") and not os.path.isabs(image):
+      snapshot["image"] = os.path.join(trace_dir, image)
+
+    if "at" in entry:
+      snapshot["at"] = int(entry["at"])
+    return snapshot
+
+  # Position
+  def get_snapshot(self) -> dict[str, Any]:
+    with self.lock:
+      if not self.snapshots:
+        return { }
+
+      index: int = self.get_index()
+      snapshot: dict[str, Any] = { **self.snapshots[index], **self.overrides }
+
+    metrics.increment("replay_snapshots")
+    metrics.set_gauge("replay_position", index)
+    return snapshot
+
+  def get_index(self) -> int:
+    # As fast as possible: one snapshot per poll
+    if self.speed <= 0:
+      index: int = self.index
+      if not self.is_paused:
+        self.advance(1)
+      return index
+
+    position: float = self.get_position()
+    if position >= self.period:
+      if not self.loop:
+        return len(self.snapshots) - 1
+
+      metrics.increment("replay_loops", int(position // self.period))
+      self.offset, self.started_at = position % self.period, time.perf_counter()
+      position = self.offset
+
+    return max(bisect.bisect_right(self.starts, position) - 1, 0)
+
+  def get_position(self) -> float:
+    if self.is_paused:
+      return self.offset
+
+    return self.offset + (time.perf_counter() - self.started_at) * 1000 * self.speed
+
+  def advance(self, step: int) -> None:
+    index: int = self.index + step
+    if self.loop:
+      if index >= len(self.snapshots):
+        metrics.increment("replay_loops")
+      index %= len(self.snapshots)
+
+    self.index = min(max(index, 0), len(self.snapshots) - 1)
+
+  # Playback controls
+  def skip(self, step: int) -> None:
+    with self.lock:
+      if not self.snapshots:
+        return
+
+      if self.speed <= 0:
+        self.advance(step)
+        return
+
+      index: int = min(max(bisect.bisect_right(self.starts, self.get_position()) - 1 + step, 0), len(self.snapshots) - 1)
+      self.offset, self.started_at = self.starts[index], time.perf_counter()
+
+  def toggle_pause(self) -> None:
+    with self.lock:
+      self.offset, self.started_at = self.get_position(), time.perf_counter()
+      self.is_paused = not self.is_paused
+      self.overrides["is_playing"] = not self.is_paused
+
+  def set_override(self, key: str, value: Any) -> None:
+    with self.lock:
+      self.overrides[key] = value
+
+
+class ReplayMetadataWorker(IMetadataWorker):
+  def __init__(self):
+    super().__init__()
+    self.trace: ReplayTrace = ReplayTrace()
+    self.last_image: tuple[str, bytes | None] = ('', None)  # (filepath, embedded image)
+
+  def get_metadata(self) -> MetadataRecord | None:
+    logger.debug("Fetching metadata")
+    snapshot: dict[str, Any] = self.trace.get_snapshot()
+
+    if not snapshot:
+      return MetadataRecord("not_found", is_os_dark=self.get_is_os_dark())
+
+    return MetadataRecord(
+      RECORD_KINDS[snapshot["type"]],
+      track_id=snapshot["id"],
+      title=snapshot["title"],
+      artist=snapshot["artist"],
+      image=snapshot["image"] or self.get_image(snapshot["filepath"]),
+      is_playing=snapshot["is_playing"],
+      shuffle_state=snapshot["shuffle_state"],
+      repeat_state=snapshot["repeat_state"],
+      volume_percent=snapshot["volume_percent"],
+      message=snapshot["error"],
+      is_os_dark=self.get_is_os_dark(),
+    )
+
+  def get_image(self, filepath: str | None) -> bytes | None:
+    # Embedded artwork is read here, as the fb2k worker does, and only when the file changes
+    if not filepath:
+      return None
+
+    if self.last_image[0] != filepath:
+      self.last_image = (filepath, extract_embedded_image(filepath=filepath))
+
+    return self.last_image[1]
+
+
+class ReplayMetadataHandler(IMetadataHandler):
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    if record.kind == "not_found" and not self.was_alert_card_shown:
+      self.show_invalid_song_info("Replay trace not found", "Check the 'replay_trace_path' preference")
+      return
+
+    if record.kind == "not_playing" and not self.was_alert_card_shown:
+      self.show_invalid_song_info("Not playing", "The replayed player is stopped")
+      return
+
+    if record.kind == "ad" and not self.was_alert_card_shown:
+      self.show_invalid_song_info("Ad", "Please wait until the ad is over")
+      return
+
+    if record.kind == "error" and not self.was_error_card_shown:
+      self.show_invalid_song_info("Replayed error", record.message or "The trace recorded an error", error=True)
+      return
+
+    if record.kind != "track":
+      return  # Not show the card until a track is playing again
+
+    self.update_playback_state(record)
+
+
+class ReplayPlaybackWorker(IPlaybackWorker):
+  """
+  The shortcuts control the replay: play/pause stops its clock and next/previous skip snapshots
+  """
+  def __init__(self, card: "MusicCard"):
+    super().__init__(card)
+    self.trace: ReplayTrace = ReplayTrace()
+
+  def register_shortcuts(self) -> None:
+    is_string: Callable[[str], bool] = lambda sc: config.get_pr(f"{sc}_shortcut") and isinstance(config.get_pr(f"{sc}_shortcut"), str)
+
+    for shortcut in self.shortcut_functions.keys():
+      if is_string(shortcut):
+        add_hotkey(config.get_pr(f"{shortcut}_shortcut"), lambda key=shortcut: self.on_playback_shortcut.emit(key))
+
+  def play_pause(self) -> None:
+    self.trace.toggle_pause()
+    logger.debug("Replay paused" if self.trace.is_paused else "Replay resumed")
+
+  def next_track(self) -> None:
+    self.trace.skip(1)
+
+  def previous_track(self) -> None:
+    self.trace.skip(-1)
+
+  def change_order(self) -> None:
+    self.trace.set_override("shuffle_state", not self.card.playback_state.shuffle_state)
+
+  def toggle_repeat(self) -> None:
+    repeat_state: str = self.card.playback_state.repeat_state
+    index: int = REPEAT_MODES.index(repeat_state) if repeat_state in REPEAT_MODES else 0
+    self.trace.set_override("repeat_state", REPEAT_MODES[(index + 1) % len(REPEAT_MODES)])
+
+  def change_volume(self, increase: bool) -> None:
+    self.volume = self.card.playback_state.volume_percent
+    self.volume = min(self.volume + 5, 100) if increase else max(self.volume - 5, 0)
+    self.trace.set_override("volume_percent", self.volume)
@@ -1,85 +1,105 @@
-import requests, time
+import asyncio, logging, requests
 from typing import Any, TYPE_CHECKING, Callable
 from keyboard import add_hotkey
+from spotipy.exceptions import SpotifyException
 
 from config.config_main import config
-from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker
+from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
 from config.auth_config import sp_auth
+from utils.async_engine import engine
 from utils.helpers import debounce
+from utils.logger import get_logger
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
-  from media_players.base import PlaybackInfoDict
+  from media_players.base import PlaybackState
+
+logger: logging.Logger = get_logger(__name__)
 
 class SpotifyMetadataWorker(IMetadataWorker):
-  def get_metadata(self) -> None:
-    print(f"Fetching metadata...")
-    current_playback: dict[str, Any] = { }
+  def get_metadata(self) -> MetadataRecord:
+    logger.debug("Fetching metadata")
+    return self.to_record(sp_auth.SP.current_playback())
+
+  async def fetch_metadata(self) -> MetadataRecord:
+    # The retries wait in the engine's loop instead of sleeping in a thread
     retries: int = 3
     delay: int = 5
 
     for attempt in range(retries):
       try:
-        current_playback = sp_auth.SP.current_playback()
+        return await super().fetch_metadata()
 
       except requests.exceptions.ReadTimeout:
-        print(f"ReadTimeout error. Retry {attempt + 1} of {retries} in {delay} seconds...")
-        time.sleep(delay)
+        logger.warning("ReadTimeout error. Retry %d of %d in %d seconds", attempt + 1, retries, delay)
+        await asyncio.sleep(delay)
 
       except requests.exceptions.RequestException as e:
-        print(f"Other request error: {e}")
+        logger.error("Other request error: %s", e)
 
-    self.finished.emit(current_playback)
+      except SpotifyException as e:  # e.g. still rate limited (429) after spotipy's own retries
+        logger.warning("Spotify API error %d. Retry %d of %d", e.http_status, attempt + 1, retries)
 
+    return await engine.run_blocking(self.to_record, { })  # darkdetect may block too
 
-class SpotifyMetadataHandler(IMetadataHandler):
-  def handle_metadata(self, metadata: dict[str, Any]) -> None:
-    if not isinstance(metadata, dict) and self.was_alert_card_shown:
-      return
+  def to_record(self, current_playback: dict[str, Any]) -> MetadataRecord:
+    # Keeps only what the card uses from the (big) playback payload
+    is_os_dark: bool = self.get_is_os_dark()
 
-    if not metadata and not self.was_alert_card_shown:
+    if not current_playback:
+      return MetadataRecord("not_playing", is_os_dark=is_os_dark)
+    if current_playback.get("currently_playing_type") == "ad":
+      return MetadataRecord("ad", is_os_dark=is_os_dark)
+
+    playback_item: dict[str, Any] | None = current_playback.get("item")
+    if not playback_item:
+      return MetadataRecord("no_item", is_os_dark=is_os_dark)
+
+    return MetadataRecord(
+      "track",
+      track_id=playback_item.get("id") or '',
+      title=playback_item.get("name") or '',
+      artist=(playback_item.get("artists") or [{ }])[0].get("name") or '',
+      image=self.get_image_url(playback_item),
+      is_playing=bool(current_playback.get("is_playing")),
+      shuffle_state=bool(current_playback.get("shuffle_state")),
+      repeat_state=current_playback.get("repeat_state") or "off",
+      volume_percent=(current_playback.get("device") or { }).get("volume_percent") or 0,
+      is_os_dark=is_os_dark,
+    )
+
+  def get_next_image(self, record: MetadataRecord) -> str | None:
+    # The first item of the user's queue, which already follows the shuffle and repeat modes
+    if record.repeat_state == "track":
+      return None
+
+    queue: list[dict[str, Any]] = (sp_auth.SP.queue() or { }).get("queue") or []
+    return self.get_image_url(queue[0]) if queue else None
+
+  @staticmethod
+  def get_image_url(item: dict[str, Any]) -> str | None:
+    # Tracks have the album's images, episodes their own
+    images: list[dict[str, Any]] = (item.get("album") or { }).get("images") or item.get("images") or [{ }]
+    return images[0].get("url")
+
+
+class SpotifyMetadataHandler(IMetadataHandler):
+  def handle_metadata(self, record: MetadataRecord) -> None:
+    if record.kind == "not_playing" and not self.was_alert_card_shown:
       self.show_invalid_song_info("Not playing", "Turn on Spotify or check your internet connection")
       return
 
-    elif metadata.get("currently_playing_type") == "ad" and not self.was_alert_card_shown:
+    elif record.kind == "ad" and not self.was_alert_card_shown:
       self.show_invalid_song_info("Spotify ad", "Please wait until the ad is over")
       return
 
-    elif not metadata.get("item") and not self.was_alert_card_shown:
+    elif record.kind == "no_item" and not self.was_alert_card_shown:
       self.show_invalid_song_info("No Title", "No Artist")
       return
 
-    playback_item: dict[str, Any] = metadata.get("item")
-
-    # Update current info
-    self.card.playback_info["current_track_id"] = playback_item.get("id")
-    self.card.playback_info["current_track"] = playback_item
-    self.card.playback_info["is_playing"] = metadata.get("is_playing")
-    self.card.playback_info["shuffle_state"] = metadata.get("shuffle_state")
-    self.card.playback_info["repeat_state"] = metadata.get("repeat_state")
-    self.card.playback_info["volume_percent"] = metadata.get("device").get("volume_percent")
-
-    if self.requires_update():
-      self.show_info(metadata)
-
-    # Update previous info (really the same as the current one, but for comparison purposes)
-    self.card.playback_info["previous_track_id"] = self.card.playback_info["current_track_id"]
-    self.card.playback_info["previous_state_is_playing"] = self.card.playback_info["is_playing"]
-
-
-  def show_info(self, metadata: dict[str, Any]) -> None:
-    current_playback: dict[str, Any] = metadata.get("item", { })
-
-    # If the method was called without handling the metadata first
-    if not current_playback:
-      self.handle_metadata(metadata)
+    if record.kind != "track":
       return
 
-    title: str = current_playback.get("name")
-    artist: str = current_playback.get("artists")[0].get("name")
-    img_url: str = current_playback.get("album").get("images")[0].get("url")
-
-    self.updater.update_card_content(title, artist, img_url)
-    self.was_alert_card_shown = False
+    self.update_playback_state(record)
 
 
 class SpotifyPlaybackWorker(IPlaybackWorker):
@@ -92,13 +112,13 @@ class SpotifyPlaybackWorker(IPlaybackWorker):
         add_hotkey(config.get_pr(f"{shortcut}_shortcut"), lambda key=shortcut: self.on_playback_shortcut.emit(key))
 
   def play_pause(self) -> None:
-    current_playback: "PlaybackInfoDict" = self.card.playback_info
-    if not current_playback:
+    current_playback: "PlaybackState" = self.card.playback_state
+    if not current_playback.version:
       return
 
-    if current_playback.get("is_playing"):
+    if current_playback.is_playing:
       sp_auth.SP.pause_playback()
-    elif not current_playback.get("is_playing"):
+    else:
       sp_auth.SP.start_playback()
 
   def next_track(self) -> None:
@@ -108,39 +128,39 @@ class SpotifyPlaybackWorker(IPlaybackWorker):
     sp_auth.SP.previous_track()
 
   def change_order(self) -> None:
-    current_playback: "PlaybackInfoDict" = self.card.playback_info
+    current_playback: "PlaybackState" = self.card.playback_state
 
-    if current_playback.get("shuffle_state"):
+    if current_playback.shuffle_state:
       sp_auth.SP.shuffle(False)
-      print("shuffle turned off")
+      logger.info("Shuffle turned off")
     else:
       sp_auth.SP.shuffle(True)
-      print("shuffle turned on")
+      logger.info("Shuffle turned on")
 
   def toggle_repeat(self) -> None:
     REPEAT_MODES: list[str] = ['off', 'context', 'track']
-    current_playback: "PlaybackInfoDict" = self.card.playback_info
+    current_playback: "PlaybackState" = self.card.playback_state
 
-    index = REPEAT_MODES.index(current_playback.get('repeat_state', REPEAT_MODES[0]))
+    index = REPEAT_MODES.index(current_playback.repeat_state)
     for mode in REPEAT_MODES:
       if mode != REPEAT_MODES[index]:
         continue
 
       next_mode = REPEAT_MODES[(index + 1) % len(REPEAT_MODES)]
       sp_auth.SP.repeat(next_mode)
-      print(f"Set repeat mode to: {next_mode}")
+      logger.info("Set repeat mode to: %s", next_mode)
 
   @debounce(1000)
   def set_volume(self) -> None:
     sp_auth.SP.volume(self.volume)
-    print(f"Volume set to: {self.volume}%")
+    logger.info("Volume set to: %d%%", self.volume)
 
     self.volume = 0
     self.setting_volume = False
 
   def change_volume(self, increase: bool) -> None:
-    current_playback: "PlaybackInfoDict" = self.card.playback_info
-    current_volume: int = current_playback['volume_percent']
+    current_playback: "PlaybackState" = self.card.playback_state
+    current_volume: int = current_playback.volume_percent
 
     if not self.setting_volume:
       self.setting_volume = True
@@ -148,17 +168,17 @@ class SpotifyPlaybackWorker(IPlaybackWorker):
 
     if increase:
       if self.volume == 100:
-        print("Volume is already at 100%")
+        logger.debug("Volume is already at 100%")
         return
 
       self.volume = round(min(100, self.volume + 10), -1)
-      print(self.volume)
+      logger.debug("Volume: %d", self.volume)
     else:
       if self.volume == 0:
-        print("Volume is already at 0%")
+        logger.debug("Volume is already at 0%")
         return
 
       self.volume = round(max(0, self.volume - 10), -1)
-      print(self.volume)
+      logger.debug("Volume: %d", self.volume)
 
     self.set_volume()
@@ -0,0 +1,143 @@
+"""
+The beefweb backend against tools/beefweb_stub.py, served on an ephemeral port for each test
+
+  python -m pytest tests
+"""
+import os, queue, sys, threading, unittest
+from PyQt5.QtCore import Qt
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "tools")]
+
+from beefweb_stub import PLAYBACK_MODES, PlayerState, StubServer
+from config.config_main import config
+from media_players.base import MetadataRecord
+from media_players.beefweb import BeefwebClient, BeefwebMetadataWorker, BeefwebPlaybackWorker
+from utils.async_engine import engine
+
+RECORD_TIMEOUT: float = 5  # seconds
+
+
+class BeefwebTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    # The preferences and the client are process-wide, the next tests get them back as they were
+    prefs: dict = dict(config.USER_PREFS)
+    self.addCleanup(lambda: (config.USER_PREFS.clear(), config.USER_PREFS.update(prefs)))
+    config.USER_PREFS.update({ "prefetch_next": False, "only_custom_color": True })
+
+    self.player: PlayerState = PlayerState(tracks=5, track_duration=0)  # no tick thread, the tests move it on
+    self.server: StubServer = StubServer(0, self.player, image_size=16)
+    threading.Thread(target=self.server.serve_forever, name="beefweb-stub", daemon=True).start()
+
+    # The client is a singleton, shared by the workers
+    client: BeefwebClient = BeefwebClient()
+    self.addCleanup(setattr, client, "base_url", client.base_url)
+    client.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    self.worker: BeefwebMetadataWorker = BeefwebMetadataWorker()
+    self.playback: BeefwebPlaybackWorker = BeefwebPlaybackWorker(None)
+
+  def tearDown(self) -> None:
+    self.server.shutdown()
+    self.server.server_close()
+
+  # Metadata
+  def test_playing(self) -> None:
+    record: MetadataRecord = self.worker.get_metadata()
+
+    self.assertEqual(record.kind, "track")
+    self.assertEqual(record.title, "Stub Track 1")
+    self.assertEqual(record.artist, "Stub Artist 1")
+    self.assertEqual(record.track_id, "C:\\Music\\Stub Album 1\\01.flac")
+    self.assertTrue(record.is_playing)
+    self.assertFalse(record.shuffle_state)
+    self.assertEqual(record.repeat_state, "off")
+    self.assertEqual(record.volume_percent, 90)  # -10dB of -100..0
+    self.assertTrue(record.image.startswith(f"{BeefwebClient().base_url}/api/artwork/p1/0?track="))
+
+  def test_paused(self) -> None:
+    self.player.set_state("paused")
+    record: MetadataRecord = self.worker.get_metadata()
+
+    self.assertEqual(record.kind, "track")
+    self.assertFalse(record.is_playing)
+
+  def test_stopped(self) -> None:
+    self.player.set_state("stopped")
+    self.assertEqual(self.worker.get_metadata().kind, "stopped")
+
+  def test_to_record_modes(self) -> None:
+    player: dict = self.worker.client.get_player()
+
+    shuffled: MetadataRecord = self.worker.to_record({ **player, "playbackMode": PLAYBACK_MODES.index("Shuffle (tracks)") })
+    self.assertTrue(shuffled.shuffle_state)
+    repeating: MetadataRecord = self.worker.to_record({ **player, "playbackMode": PLAYBACK_MODES.index("Repeat (track)") })
+    self.assertEqual(repeating.repeat_state, "track")
+    muted: MetadataRecord = self.worker.to_record({ **player, "volume": { **player["volume"], "isMuted": True } })
+    self.assertEqual(muted.volume_percent, 0)
+
+  def test_subscribe(self) -> None:
+    records: queue.Queue = queue.Queue()
+    self.worker.finished.connect(records.put, Qt.DirectConnection)  # no Qt loop here, emitted in the engine's thread
+    subscription = engine.submit(self.worker.subscribe(), key="test-beefweb-subscription")
+
+    try:
+      first: MetadataRecord = records.get(timeout=RECORD_TIMEOUT)  # the whole state, right after connecting
+      self.assertEqual(first.title, "Stub Track 1")
+
+      self.player.skip(1)
+      record: MetadataRecord = records.get(timeout=RECORD_TIMEOUT)
+      self.assertEqual(record.kind, "track")
+      self.assertEqual(record.title, "Stub Track 2")
+
+    finally:
+      subscription.cancel()
+
+  def test_subscribe_unsupported_scheme(self) -> None:
+    self.worker.client.base_url = "ws://127.0.0.1:8880"
+    with self.assertRaisesRegex(ValueError, "beefweb_url"):
+      engine.submit(self.worker.subscribe()).result(RECORD_TIMEOUT)
+
+  def test_next_image(self) -> None:
+    self.worker.player = self.worker.client.get_player()
+    record: MetadataRecord = self.worker.to_record(self.worker.player)
+
+    next_image: str | None = self.worker.get_next_image(record)
+    self.assertIsNotNone(next_image)
+    self.assertTrue(next_image.startswith(f"{BeefwebClient().base_url}/api/artwork/p1/1?track="))
+    self.assertNotEqual(next_image, record.image)
+
+  def test_next_image_shuffled(self) -> None:
+    self.player.set_options({ "playbackMode": PLAYBACK_MODES.index("Shuffle (tracks)") })
+    self.worker.player = self.worker.client.get_player()
+    self.assertIsNone(self.worker.get_next_image(self.worker.to_record(self.worker.player)))
+
+  # Playback
+  def test_change_order(self) -> None:
+    self.playback.change_order()
+    self.assertEqual(PLAYBACK_MODES[self.player.playback_mode], "Shuffle (tracks)")
+
+    self.playback.change_order()
+    self.assertEqual(PLAYBACK_MODES[self.player.playback_mode], "Default")
+
+  def test_toggle_repeat(self) -> None:
+    modes: list[str] = []
+    for _ in range(3):
+      self.playback.toggle_repeat()
+      modes.append(PLAYBACK_MODES[self.player.playback_mode])
+
+    self.assertEqual(modes, ["Repeat (playlist)", "Repeat (track)", "Default"])
+
+  def test_change_volume(self) -> None:
+    self.playback.change_volume(True)
+    self.assertAlmostEqual(self.player.volume, -5.0)
+
+    self.playback.change_volume(True)
+    self.playback.change_volume(True)
+    self.assertAlmostEqual(self.player.volume, 0.0)  # kept in the range
+
+    self.playback.change_volume(False)
+    self.assertAlmostEqual(self.player.volume, -5.0)
+
+
+if __name__ == "__main__":
+  unittest.main()
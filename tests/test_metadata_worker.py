@@ -0,0 +1,64 @@
+"""
+The polling of IMetadataWorker, with a worker whose fetches are scripted
+
+  python -m pytest tests
+"""
+import os, queue, sys, unittest
+from PyQt5.QtCore import Qt
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.config_main import config
+from media_players.base import IMetadataWorker, MetadataRecord
+from utils.async_engine import engine
+from utils.metrics import metrics
+
+RECORD_TIMEOUT: float = 5  # seconds
+
+
+class ScriptedWorker(IMetadataWorker):
+  def __init__(self, results: list[MetadataRecord | Exception]) -> None:
+    super().__init__()
+    self.results: list[MetadataRecord | Exception] = results
+
+  def get_metadata(self) -> MetadataRecord | None:
+    result: MetadataRecord | Exception = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+    if isinstance(result, Exception):
+      raise result
+    return result
+
+
+class MetadataWorkerTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    prefs: dict = dict(config.USER_PREFS)
+    self.addCleanup(lambda: (config.USER_PREFS.clear(), config.USER_PREFS.update(prefs)))
+    config.USER_PREFS.update({ "poll_interval": 50, "prefetch_next": False })
+
+  def test_poll_survives_a_failed_fetch(self) -> None:
+    errors: int = metrics.snapshot()["counters"].get("metadata_errors", 0)
+    worker: ScriptedWorker = ScriptedWorker([FileNotFoundError("nowplaying.txt"), MetadataRecord("stopped")])
+    records: queue.Queue = queue.Queue()
+    worker.finished.connect(records.put, Qt.DirectConnection)  # no Qt loop here, emitted in the engine's thread
+
+    self.addCleanup(worker.set_polling, False)
+    with self.assertLogs("spoticard.media_players.base", "ERROR"):
+      worker.set_polling(True)
+      self.assertEqual(records.get(timeout=RECORD_TIMEOUT).kind, "stopped")
+    self.assertEqual(metrics.snapshot()["counters"].get("metadata_errors"), errors + 1)
+
+  def test_fetch_after_a_failed_one(self) -> None:
+    worker: ScriptedWorker = ScriptedWorker([RuntimeError("bad response"), MetadataRecord("stopped")])
+    records: queue.Queue = queue.Queue()
+    worker.finished.connect(records.put, Qt.DirectConnection)
+
+    with self.assertLogs("spoticard.media_players.base", "ERROR"):
+      engine.submit(worker.fetch()).result(RECORD_TIMEOUT)  # doesn't raise
+    self.assertTrue(records.empty())
+
+    engine.submit(worker.fetch()).result(RECORD_TIMEOUT)
+    self.assertEqual(records.get(timeout=RECORD_TIMEOUT).kind, "stopped")
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,113 @@
+"""
+The mpris backend against tools/mpris_fake_player.py, on a private D-Bus session bus (skipped without dbus-daemon or QtDBus)
+
+  python -m pytest tests
+"""
+import os, shutil, subprocess, sys, tempfile, unittest
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.config_main import config
+from media_players.base import MetadataRecord
+
+try:
+  from PyQt5.QtCore import QCoreApplication
+  from media_players.mpris import MprisMetadataWorker, MprisPlaybackWorker
+except ImportError:  # no QtDBus
+  QCoreApplication = None
+
+DBUS_DAEMON: str | None = shutil.which("dbus-daemon")
+PLAYER_NAME: str = "fake"
+START_TIMEOUT: float = 10  # seconds
+
+bus_daemon: subprocess.Popen | None = None
+bus_address: str | None = os.environ.get("DBUS_SESSION_BUS_ADDRESS")  # given back after the tests
+app: "QCoreApplication | None" = None
+
+
+def setUpModule() -> None:
+  global bus_daemon, app
+  if not DBUS_DAEMON or QCoreApplication is None:
+    raise unittest.SkipTest("dbus-daemon or QtDBus not available")
+
+  # Before the first use of the session bus, which reads the address once
+  bus_daemon = subprocess.Popen([DBUS_DAEMON, "--session", "--print-address", "--nofork"], stdout=subprocess.PIPE, text=True)
+  os.environ["DBUS_SESSION_BUS_ADDRESS"] = bus_daemon.stdout.readline().strip()
+  app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+
+def tearDownModule() -> None:
+  if bus_daemon:
+    bus_daemon.terminate()
+    bus_daemon.wait()
+
+  if bus_address is None:
+    os.environ.pop("DBUS_SESSION_BUS_ADDRESS", None)
+  else:
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = bus_address
+
+
+class MprisTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    prefs: dict = dict(config.USER_PREFS)
+    self.addCleanup(lambda: (config.USER_PREFS.clear(), config.USER_PREFS.update(prefs)))
+    config.USER_PREFS.update({ "mpris_player": PLAYER_NAME })
+
+    # A new player for every test, so the commands of one don't change the state read by another
+    self.art_dir: str = tempfile.mkdtemp(prefix="mpris-test-")
+    self.player: subprocess.Popen = subprocess.Popen(
+      [sys.executable, os.path.join(ROOT, "tools", "mpris_fake_player.py"), "--name", PLAYER_NAME, "--track-duration", "0", "--art-dir", self.art_dir],
+      stdout=subprocess.PIPE, text=True
+    )
+    if "running" not in self.player.stdout.readline():
+      self.fail("the fake player didn't start")
+
+    self.worker: MprisMetadataWorker = MprisMetadataWorker()
+    self.playback: MprisPlaybackWorker = MprisPlaybackWorker(None)
+
+  def tearDown(self) -> None:
+    self.player.terminate()
+    self.player.wait(START_TIMEOUT)
+    shutil.rmtree(self.art_dir, ignore_errors=True)
+
+  def test_metadata(self) -> None:
+    record: MetadataRecord = self.worker.get_metadata()
+
+    self.assertEqual(record.kind, "track")
+    self.assertEqual(record.title, "Fake Track 1")
+    self.assertEqual(record.artist, "Fake Artist 1")
+    self.assertEqual(record.image, os.path.join(self.art_dir, "0.png"))  # file:// URL to a path
+    self.assertTrue(os.path.exists(record.image))
+    self.assertTrue(record.is_playing)
+    self.assertFalse(record.shuffle_state)
+    self.assertEqual(record.repeat_state, "off")  # LoopStatus "None"
+    self.assertEqual(record.volume_percent, 50)  # Volume 0.5
+
+  def test_play_pause(self) -> None:
+    self.playback.play_pause()
+    self.assertFalse(self.worker.get_metadata().is_playing)
+
+    self.playback.play_pause()
+    self.assertTrue(self.worker.get_metadata().is_playing)
+
+  def test_toggle_repeat(self) -> None:
+    # Set(LoopStatus) through org.freedesktop.DBus.Properties
+    repeat_states: list[str] = []
+    for _ in range(3):
+      self.playback.toggle_repeat()
+      repeat_states.append(self.worker.get_metadata().repeat_state)
+
+    self.assertEqual(repeat_states, ["context", "track", "off"])
+
+  def test_shuffle_and_volume(self) -> None:
+    self.playback.change_order()
+    self.playback.change_volume(True)
+
+    record: MetadataRecord = self.worker.get_metadata()
+    self.assertTrue(record.shuffle_state)
+    self.assertEqual(record.volume_percent, 55)
+
+
+if __name__ == "__main__":
+  unittest.main()
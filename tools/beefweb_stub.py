@@ -0,0 +1,329 @@
+"""
+Local stand-in of beefweb (foobar2000's web interface component), to run the beefweb backend without foobar2000.
+
+  python tools/beefweb_stub.py --port 8880 --track-duration 20
+
+Then set "media_player": "beefweb" and "beefweb_url": "http://127.0.0.1:8880" in the user preferences.
+It serves the player state (/api/player), its server-sent events (/api/query/updates?player=true), the playlist's
+items (/api/playlists/p1/items/<offset>:<count>), the playback controls and the artwork. GET /stats returns the request counts and the events sent (?reset=1 clears them)
+"""
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+from PIL import Image, ImageDraw
+
+PLAYBACK_MODES: list[str] = ["Default", "Repeat (playlist)", "Repeat (track)", "Random", "Shuffle (tracks)", "Shuffle (albums)", "Shuffle (folders)"]
+PLAYLIST_ID: str = "p1"
+KEEP_ALIVE: float = 15  # seconds between comments on an idle event stream
+
+
+class PlayerState:
+  """
+  Fake foobar2000 player: a playlist of generated tracks that moves on by itself every 'track_duration' seconds.
+  Every change bumps 'version' and wakes the event streams up
+  """
+  def __init__(self, tracks: int, track_duration: float) -> None:
+    self.tracks: int = tracks
+    self.track_duration: float = track_duration
+
+    self.changed: threading.Condition = threading.Condition()
+    self.version: int = 0
+    self.index: int = 0
+    self.track_started: float = time.monotonic()
+    self.playback_state: str = "playing"
+    self.playback_mode: int = 0
+    self.volume: float = -10.0
+    self.is_muted: bool = False
+
+  def get_columns(self, index: int, columns: list[str]) -> list[str]:
+    values: dict[str, str] = {
+      "%path%": f"C:\\Music\\Stub Album {index // 10 + 1}\\{index + 1:02d}.flac",
+      "%title%": f"Stub Track {index + 1}",
+      "%artist%": f"Stub Artist {index % 10 + 1}",
+      "%album%": f"Stub Album {index // 10 + 1}",
+    }
+    return [values.get(column, '') for column in columns]
+
+  def get_player(self, columns: list[str]) -> dict[str, Any]:
+    with self.changed:
+      active_item: dict[str, Any] = { "playlistId": '', "playlistIndex": -1, "index": -1, "position": 0, "duration": 0, "columns": [] }
+      if self.playback_state != "stopped":
+        active_item = {
+          "playlistId": PLAYLIST_ID,
+          "playlistIndex": 0,
+          "index": self.index,
+          "position": round(time.monotonic() - self.track_started, 2),
+          "duration": self.track_duration,
+          "columns": self.get_columns(self.index, columns),
+        }
+
+      return {
+        "info": { "name": "foobar2000", "title": "foobar2000 (stub)", "version": "2.1", "pluginVersion": "0.8" },
+        "activeItem": active_item,
+        "playbackState": self.playback_state,
+        "playbackMode": self.playback_mode,
+        "playbackModes": PLAYBACK_MODES,
+        "volume": { "type": "db", "min": -100.0, "max": 0.0, "value": self.volume, "isMuted": self.is_muted },
+      }
+
+  def get_items(self, offset: int, count: int, columns: list[str]) -> dict[str, Any]:
+    items: list[dict[str, Any]] = [{ "columns": self.get_columns(index, columns) } for index in range(offset, min(offset + count, self.tracks))]
+    return { "offset": offset, "totalCount": self.tracks, "items": items }
+
+  def change(self, fn: Callable[[], None]) -> None:
+    with self.changed:
+      fn()
+      self.version += 1
+      self.changed.notify_all()
+
+  def tick(self) -> None:
+    # Moves to the next track when the current one is over
+    while True:
+      time.sleep(0.1)
+      if self.track_duration <= 0 or self.playback_state != "playing":
+        continue
+
+      if time.monotonic() - self.track_started >= self.track_duration:
+        self.skip(1)
+
+  # Controls
+  def skip(self, step: int) -> None:
+    def skip() -> None:
+      self.index = (self.index + step) % self.tracks
+      self.track_started = time.monotonic()
+      if self.playback_state == "stopped":
+        self.playback_state = "playing"
+
+    self.change(skip)
+
+  def set_state(self, state: str) -> None:
+    def set_state() -> None:
+      if state == "toggle":
+        self.playback_state = "paused" if self.playback_state == "playing" else "playing"
+      else:
+        self.playback_state = state
+
+    self.change(set_state)
+
+  def set_options(self, options: dict[str, Any]) -> None:
+    def set_options() -> None:
+      if "volume" in options:
+        self.volume = min(max(float(options["volume"]), -100.0), 0.0)
+      if "isMuted" in options:
+        self.is_muted = bool(options["isMuted"])
+      if "playbackMode" in options and 0 <= int(options["playbackMode"]) < len(PLAYBACK_MODES):
+        self.playback_mode = int(options["playbackMode"])
+
+    self.change(set_options)
+
+
+class RequestStats:
+  """
+  Request counts per route and status, plus the open event streams and the events sent
+  """
+  def __init__(self) -> None:
+    self.lock: threading.Lock = threading.Lock()
+    self.reset()
+
+  def reset(self) -> None:
+    self.started: float = time.monotonic()
+    self.routes: dict[str, int] = { }
+    self.statuses: dict[str, int] = { }
+    self.streams: int = 0
+    self.events: int = 0
+
+  def record(self, route: str, status: int) -> None:
+    with self.lock:
+      self.routes[route] = self.routes.get(route, 0) + 1
+      self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+  def count_stream(self, opened: int) -> None:
+    with self.lock:
+      self.streams += opened
+
+  def count_event(self) -> None:
+    with self.lock:
+      self.events += 1
+
+  def snapshot(self) -> dict[str, Any]:
+    with self.lock:
+      return {
+        "elapsed_s": round(time.monotonic() - self.started, 2),
+        "requests": sum(self.routes.values()),
+        "routes": dict(self.routes),
+        "statuses": dict(self.statuses),
+        "open_streams": self.streams,
+        "events": self.events,
+      }
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+  server: "StubServer"
+
+  def do_GET(self) -> None:
+    self.dispatch("GET")
+
+  def do_POST(self) -> None:
+    self.dispatch("POST")
+
+  def dispatch(self, method: str) -> None:
+    url = urlsplit(self.path)
+    query: dict[str, str] = { key: values[0] for key, values in parse_qs(url.query).items() }
+    body: bytes = self.read_body()
+
+    if url.path == "/stats":
+      if query.get("reset") == "1":
+        self.server.stats.reset()
+      self.send_json(200, self.server.stats.snapshot())
+      return
+
+    route: str = f"{method} {url.path}"
+    if url.path.startswith("/api/artwork/"):
+      route = f"{method} /api/artwork/*"
+    elif url.path.startswith("/api/playlists/"):
+      route = f"{method} /api/playlists/*"
+    if method == "GET" and url.path == "/api/query/updates":
+      self.server.stats.record(route, 200)
+      self.stream_updates(query)
+      return
+
+    status: int = self.server.handle(method, url.path, query, body, self)
+    self.server.stats.record(route, status)
+
+  def stream_updates(self, query: dict[str, str]) -> None:
+    # Server-sent events: the whole player state first, then again on every change
+    columns: list[str] = query.get("trcolumns", '').split(",")
+    player: PlayerState = self.server.player
+
+    self.send_response(200)
+    self.send_header("Content-Type", "text/event-stream")
+    self.send_header("Cache-Control", "no-cache")
+    self.end_headers()
+
+    self.server.stats.count_stream(1)
+    try:
+      version: int = -1
+      while True:
+        with player.changed:
+          player.changed.wait_for(lambda: player.version != version, KEEP_ALIVE)
+          is_changed: bool = player.version != version
+          version = player.version
+
+        if not is_changed:
+          self.wfile.write(b": keep-alive\n\n")
+        elif query.get("player") == "true":
+          self.wfile.write(f"data: {json.dumps({ 'player': player.get_player(columns) })}\n\n".encode("utf-8"))
+          self.server.stats.count_event()
+        self.wfile.flush()
+
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+    finally:
+      self.server.stats.count_stream(-1)
+
+  def read_body(self) -> bytes:
+    length: int = int(self.headers.get("Content-Length") or 0)
+    return self.rfile.read(length) if length else b''
+
+  def send_body(self, status: int, body: bytes, content_type: str) -> None:
+    self.send_response(status)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def send_json(self, status: int, data: Any) -> None:
+    self.send_body(status, json.dumps(data).encode("utf-8"), "application/json")
+
+  def log_message(self, format: str, *args: Any) -> None:
+    pass
+
+
+class StubServer(ThreadingHTTPServer):
+  daemon_threads: bool = True
+
+  def __init__(self, port: int, player: PlayerState, image_size: int) -> None:
+    super().__init__(("127.0.0.1", port), StubRequestHandler)
+    self.player: PlayerState = player
+    self.stats: RequestStats = RequestStats()
+    self.image_size: int = image_size
+    self.images: dict[str, bytes] = { }
+
+    self.controls: dict[str, Callable[[dict[str, Any]], None]] = {
+      "/api/player": self.player.set_options,
+      "/api/player/play": lambda options: self.player.set_state("playing"),
+      "/api/player/pause": lambda options: self.player.set_state("paused"),
+      "/api/player/pause/toggle": lambda options: self.player.set_state("toggle"),
+      "/api/player/stop": lambda options: self.player.set_state("stopped"),
+      "/api/player/next": lambda options: self.player.skip(1),
+      "/api/player/previous": lambda options: self.player.skip(-1),
+    }
+
+  def handle(self, method: str, path: str, query: dict[str, str], body: bytes, handler: StubRequestHandler) -> int:
+    if method == "GET" and path == "/api/player":
+      handler.send_json(200, { "player": self.player.get_player(query.get("columns", '').split(",")) })
+      return 200
+
+    if method == "GET" and path.startswith(f"/api/playlists/{PLAYLIST_ID}/items/"):
+      offset, _, count = path.rsplit("/", 1)[-1].partition(":")
+      items: dict[str, Any] = self.player.get_items(int(offset), int(count or 1), query.get("columns", '').split(","))
+      handler.send_json(200, { "playlistItems": items })
+      return 200
+
+    if method == "GET" and path.startswith("/api/artwork/"):
+      handler.send_body(200, self.get_image(path), "image/png")
+      return 200
+
+    control: Callable[[dict[str, Any]], None] | None = self.controls.get(path) if method == "POST" else None
+    if not control:
+      handler.send_json(404, { "error": { "message": "Not found" } })
+      return 404
+
+    try:
+      control(json.loads(body) if body else { })
+    except (ValueError, TypeError) as e:
+      handler.send_json(400, { "error": { "message": str(e) } })
+      return 400
+
+    handler.send_body(204, b'', "application/json")
+    return 204
+
+  def get_image(self, path: str) -> bytes:
+    # One artwork per playlist item with its own color, so the accent color changes too
+    if path not in self.images:
+      color: tuple[int, ...] = tuple(random.Random(path).randrange(40, 256) for _ in range(3))
+      image: Image.Image = Image.new("RGB", (self.image_size, self.image_size), color)
+      ImageDraw.Draw(image).rectangle((self.image_size // 4, self.image_size // 4, self.image_size * 3 // 4, self.image_size * 3 // 4), fill=(20, 20, 20))
+
+      output: BytesIO = BytesIO()
+      image.save(output, "PNG")
+      self.images[path] = output.getvalue()
+
+    return self.images[path]
+
+
+def main() -> None:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Local stand-in of beefweb")
+  parser.add_argument("--port", type=int, default=8880)
+  parser.add_argument("--image-size", type=int, default=300, help="artwork size (px)")
+  parser.add_argument("--tracks", type=int, default=50)
+  parser.add_argument("--track-duration", type=float, default=30, help="seconds until the next track (0 = never)")
+  args: argparse.Namespace = parser.parse_args()
+
+  player: PlayerState = PlayerState(args.tracks, args.track_duration)
+  server: StubServer = StubServer(args.port, player, args.image_size)
+  threading.Thread(target=player.tick, name="tracks", daemon=True).start()
+
+  print(f"beefweb stub running at http://127.0.0.1:{args.port}/api/ (stats at /stats)")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,269 @@
+"""
+Benchmark of the image pipeline: ConvertImageToPixmap.convert, ExtractImageColor.extract, apply_rounded_corners
+and extract_embedded_image, over a synthetic corpus (JPEG/PNG/WebP from 64px to 3000px, and JPEG artwork embedded
+in MP3/FLAC/M4A/Ogg files). Runs headless (Qt offscreen platform).
+
+  python tools/bench_images.py --output bench.json
+  python tools/bench_images.py --baseline bench.json --max-regression 15
+
+The image cache is cleared before every call unless --warm is given, so the numbers are the cold path.
+The color extraction of the biggest images takes seconds per call, --sizes and --filter narrow the run
+"""
+import argparse, base64, gc, json, os, platform, statistics, struct, sys, tempfile, time, tracemalloc
+from typing import Any, Callable
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # project root
+
+from PIL import Image
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import ID3, APIC
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.ogg import OggPage
+from mutagen.oggvorbis import OggVorbis
+
+from media_players.helpers.image_extractor import extract_embedded_image
+from utils.helpers import apply_rounded_corners
+from utils.image_handling import ConvertImageToPixmap, ExtractImageColor, image_cache
+
+try:
+  import resource  # Unix only
+except ImportError:
+  resource = None
+
+SIZES: tuple[int, ...] = (64, 300, 640, 1200, 3000)
+IMAGE_FORMATS: dict[str, str] = { "jpeg": "JPEG", "png": "PNG", "webp": "WEBP" }
+AUDIO_FORMATS: tuple[str, ...] = ("mp3", "flac", "m4a", "ogg")
+CARD_COLOR: str = "#1e1e1e"
+IMAGE_SIZE: int = 64
+IMAGE_RADIUS: int = 5
+
+
+# Corpus
+def make_image(size: int) -> Image.Image:
+  # Deterministic and with some detail, so it compresses like real artwork rather than a flat color
+  red: Image.Image = Image.linear_gradient("L").resize((size, size))
+  green: Image.Image = Image.effect_mandelbrot((size, size), (-2.0, -1.25, 0.75, 1.25), 64)
+  blue: Image.Image = Image.radial_gradient("L").resize((size, size))
+  return Image.merge("RGB", (red, green, blue))
+
+
+def write_mp3(path: str, artwork: bytes) -> None:
+  with open(path, "wb") as file:
+    file.write((b"\xff\xfb\x90\x64" + bytes(413)) * 40)  # silent MPEG-1 Layer III frames (128kbps, 44.1kHz)
+
+  tags: ID3 = ID3()
+  tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=artwork))
+  tags.save(path)
+
+
+def write_flac(path: str, artwork: bytes) -> None:
+  stream_info: bytes = struct.pack(">HH", 4096, 4096) + bytes(6)
+  stream_info += ((44100 << 44) | (1 << 41) | (15 << 36)).to_bytes(8, "big") + bytes(16)  # 44.1kHz, stereo, 16 bits
+  with open(path, "wb") as file:
+    file.write(b"fLaC" + bytes([0x80]) + len(stream_info).to_bytes(3, "big") + stream_info)
+
+  audio: FLAC = FLAC(path)
+  picture: Picture = Picture()
+  picture.type, picture.mime, picture.data = 3, "image/jpeg", artwork
+  audio.add_picture(picture)
+  audio.save()
+
+
+def write_m4a(path: str, artwork: bytes) -> None:
+  atom: Callable[[bytes, bytes], bytes] = lambda name, data: struct.pack(">I4s", 8 + len(data), name) + data
+  movie_header: bytes = bytes(4) + struct.pack(">IIII", 0, 0, 1000, 0) + struct.pack(">IH", 0x00010000, 0x0100) + bytes(70) + struct.pack(">I", 2)
+  with open(path, "wb") as file:
+    file.write(atom(b"ftyp", b"M4A \x00\x00\x02\x00M4A mp42isom") + atom(b"moov", atom(b"mvhd", movie_header)))
+
+  audio: MP4 = MP4(path)
+  audio.add_tags()
+  audio.tags["covr"] = [MP4Cover(artwork, MP4Cover.FORMAT_JPEG)]
+  audio.save()
+
+
+def write_ogg(path: str, artwork: bytes) -> None:
+  identification: bytes = b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, 44100, 0, 128000, 0) + b"\xb8\x01"
+  comment: bytes = b"\x03vorbis" + struct.pack("<I", 5) + b"bench" + struct.pack("<I", 0) + b"\x01"
+  setup: bytes = b"\x05vorbis" + bytes(16)
+
+  pages: list[OggPage] = []
+  for sequence, (packets, position) in enumerate((([identification], 0), ([comment, setup], 0), ([bytes(10)], 44100))):
+    page: OggPage = OggPage()
+    page.packets, page.serial, page.sequence, page.position = packets, 1, sequence, position
+    page.first, page.last = sequence == 0, sequence == 2
+    pages.append(page)
+
+  with open(path, "wb") as file:
+    file.write(b"".join(page.write() for page in pages))
+
+  # The extractor reads base64 data URIs from this field
+  audio: OggVorbis = OggVorbis(path)
+  audio["metadata_block_picture"] = [f"data:image/jpeg;base64,{base64.b64encode(artwork).decode()}"]
+  audio.save()
+
+
+AUDIO_WRITERS: dict[str, Callable[[str, bytes], None]] = { "mp3": write_mp3, "flac": write_flac, "m4a": write_m4a, "ogg": write_ogg }
+
+
+def build_corpus(directory: str, sizes: tuple[int, ...]) -> dict[str, dict[int, str]]:
+  corpus: dict[str, dict[int, str]] = { name: { } for name in (*IMAGE_FORMATS, *AUDIO_FORMATS) }
+
+  for size in sizes:
+    image: Image.Image = make_image(size)
+    for name, image_format in IMAGE_FORMATS.items():
+      path: str = os.path.join(directory, f"{size}.{name}")
+      image.save(path, image_format, quality=90)
+      corpus[name][size] = path
+
+    with open(corpus["jpeg"][size], "rb") as file:
+      artwork: bytes = file.read()
+    for name, write in AUDIO_WRITERS.items():
+      path: str = os.path.join(directory, f"{size}.{name}")
+      write(path, artwork)
+      corpus[name][size] = path
+
+  return corpus
+
+
+def get_cases(corpus: dict[str, dict[int, str]]) -> dict[str, Callable[[], Any]]:
+  cases: dict[str, Callable[[], Any]] = { }
+
+  for name in IMAGE_FORMATS:
+    for size, path in corpus[name].items():
+      cases[f"convert/{name}/{size}"] = lambda path=path: ConvertImageToPixmap().convert(path, IMAGE_SIZE, IMAGE_RADIUS)
+      cases[f"extract_color/{name}/{size}"] = lambda path=path: ExtractImageColor().extract(path, CARD_COLOR)
+
+  for size, path in corpus["png"].items():
+    q_image: QImage = QImage(path)
+    cases[f"rounded_corners/{size}"] = lambda q_image=q_image: apply_rounded_corners(q_image, IMAGE_RADIUS)
+
+  for name in AUDIO_FORMATS:
+    for size, path in corpus[name].items():
+      cases[f"embedded/{name}/{size}"] = lambda path=path: extract_embedded_image(path)
+
+  return cases
+
+
+# Measuring
+def percentile(values: list[float], p: float) -> float:
+  ordered: list[float] = sorted(values)
+  return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def run_case(fn: Callable[[], Any], iterations: int, warmup: int, warm: bool) -> dict[str, float]:
+  for _ in range(warmup):
+    fn()
+
+  timings: list[float] = []
+  for _ in range(iterations):
+    if not warm:
+      image_cache.clear()
+    start: float = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+
+  # Memory on its own pass, tracemalloc slows down the timed calls
+  if not warm:
+    image_cache.clear()
+  gc.collect()
+  tracemalloc.start()
+  fn()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return {
+    "p50_ms": round(percentile(timings, 50), 3),
+    "p99_ms": round(percentile(timings, 99), 3),
+    "mean_ms": round(statistics.fmean(timings), 3),
+    "ops_per_s": round(1000 / statistics.fmean(timings), 2) if statistics.fmean(timings) else 0,
+    "peak_kb": round(peak / 1024, 1),
+  }
+
+
+def get_max_rss_kb() -> int | None:
+  if not resource:
+    return None
+
+  max_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return max_rss // 1024 if sys.platform == "darwin" else max_rss  # bytes on macOS, KB on Linux
+
+
+# Reporting
+def compare(results: dict[str, Any], baseline: dict[str, Any], max_regression: float | None) -> list[str]:
+  regressions: list[str] = []
+  print(f"\n{'case':<28}{'p50 ms':>10}{'baseline':>10}{'change':>9}")
+
+  for name, case in results["cases"].items():
+    previous: dict[str, float] | None = baseline.get("cases", { }).get(name)
+    if not previous or not previous["p50_ms"]:
+      continue
+
+    change: float = (case["p50_ms"] / previous["p50_ms"] - 1) * 100
+    is_regression: bool = max_regression is not None and change > max_regression
+    if is_regression:
+      regressions.append(name)
+    print(f"{name:<28}{case['p50_ms']:>10.3f}{previous['p50_ms']:>10.3f}{change:>+8.1f}%{'  <-' if is_regression else ''}")
+
+  return regressions
+
+
+def main() -> int:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Image pipeline benchmark")
+  parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+  parser.add_argument("--iterations", type=int, default=20)
+  parser.add_argument("--warmup", type=int, default=2)
+  parser.add_argument("--filter", default="", help="only the cases containing this text, e.g. 'convert/' or '/3000'")
+  parser.add_argument("--warm", action="store_true", help="keep the image cache between calls")
+  parser.add_argument("--corpus-dir", help="keep the generated corpus in this directory")
+  parser.add_argument("--output", help="write the results (JSON), they can be used as a baseline later")
+  parser.add_argument("--baseline", help="compare the p50 latencies against these results")
+  parser.add_argument("--max-regression", type=float, help="exit with 1 if a p50 is worse than the baseline by more than this (%%)")
+  args: argparse.Namespace = parser.parse_args()
+
+  app: QApplication = QApplication(sys.argv[:1])  # QPixmap needs a GUI application
+
+  corpus_dir: str = args.corpus_dir or tempfile.mkdtemp(prefix="spoticard-bench-")
+  os.makedirs(corpus_dir, exist_ok=True)
+  cases: dict[str, Callable[[], Any]] = get_cases(build_corpus(corpus_dir, tuple(args.sizes)))
+
+  results: dict[str, Any] = {
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "iterations": args.iterations,
+    "warm": args.warm,
+    "cases": { },
+  }
+
+  print(f"{'case':<28}{'p50 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'peak KB':>10}")
+  for name, fn in cases.items():
+    if args.filter not in name:
+      continue
+
+    case: dict[str, float] = run_case(fn, args.iterations, args.warmup, args.warm)
+    results["cases"][name] = case
+    print(f"{name:<28}{case['p50_ms']:>10.3f}{case['p99_ms']:>10.3f}{case['ops_per_s']:>10.1f}{case['peak_kb']:>10.1f}")
+
+  results["max_rss_kb"] = get_max_rss_kb()
+  print(f"\nmax RSS: {results['max_rss_kb']} KB, corpus: {corpus_dir}")
+
+  if args.output:
+    with open(args.output, "w", encoding="utf-8") as file:
+      json.dump(results, file, indent=2)
+
+  if args.baseline:
+    with open(args.baseline, "r", encoding="utf-8") as file:
+      regressions: list[str] = compare(results, json.load(file), args.max_regression)
+
+    if regressions:
+      print(f"\n{len(regressions)} case(s) regressed more than {args.max_regression}%")
+      return 1
+
+  app.quit()
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
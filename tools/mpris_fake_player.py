@@ -0,0 +1,225 @@
+"""
+Fake MPRIS player on the D-Bus session bus, to run the mpris backend without a real player. A private bus keeps
+it away from the desktop's players:
+
+  dbus-daemon --session --print-address --fork   # prints the address to export as DBUS_SESSION_BUS_ADDRESS
+  DBUS_SESSION_BUS_ADDRESS=<address> python tools/mpris_fake_player.py --name fake --track-duration 20
+
+Then start the card with the same DBUS_SESSION_BUS_ADDRESS and "media_player": "mpris". The player owns
+org.mpris.MediaPlayer2.<name>, moves on to the next generated track every --track-duration seconds and emits
+PropertiesChanged for every change, including the ones made by the card's playback commands
+"""
+import argparse, os, random, sys
+from typing import Any
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PIL import Image
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer, Q_CLASSINFO, pyqtProperty, pyqtSlot
+from PyQt5.QtDBus import QDBusAbstractAdaptor, QDBusConnection, QDBusMessage, QDBusObjectPath
+
+OBJECT_PATH: str = "/org/mpris/MediaPlayer2"
+PLAYER_INTERFACE: str = "org.mpris.MediaPlayer2.Player"
+LOOP_STATUSES: tuple[str, ...] = ("None", "Playlist", "Track")
+
+
+class FakePlayer(QObject):
+  """
+  Playback state of the fake player: generated tracks with their own artwork files
+  """
+  def __init__(self, tracks: int, track_duration: float, art_dir: str) -> None:
+    super().__init__()
+    self.tracks: int = tracks
+    self.art_dir: str = art_dir
+    self.index: int = 0
+    self.playback_status: str = "Playing"
+    self.loop_status: str = "None"
+    self.shuffle: bool = False
+    self.volume: float = 0.5
+
+    self.track_timer: QTimer = QTimer(self)
+    self.track_timer.timeout.connect(lambda: self.skip(1))
+    if track_duration > 0:
+      self.track_timer.start(int(track_duration * 1000))
+
+  def get_metadata(self) -> dict[str, Any]:
+    art_path: str = os.path.join(self.art_dir, f"{self.index}.png")
+    if not os.path.exists(art_path):
+      color: tuple[int, ...] = tuple(random.Random(self.index).randrange(40, 256) for _ in range(3))
+      Image.new("RGB", (300, 300), color).save(art_path)
+
+    return {
+      "mpris:trackid": QDBusObjectPath(f"/org/mpris/MediaPlayer2/Track/{self.index}"),
+      "mpris:length": 180_000_000,
+      "mpris:artUrl": f"file://{art_path}",
+      "xesam:title": f"Fake Track {self.index + 1}",
+      "xesam:artist": [f"Fake Artist {self.index % 10 + 1}"],
+      "xesam:album": f"Fake Album {self.index // 10 + 1}",
+    }
+
+  def skip(self, step: int) -> None:
+    self.index = (self.index + step) % self.tracks
+    self.changed("Metadata", "PlaybackStatus")
+
+  def changed(self, *names: str) -> None:
+    # What real players do: the changed properties, with their new values, on org.freedesktop.DBus.Properties
+    values: dict[str, Any] = {
+      "Metadata": self.get_metadata(),
+      "PlaybackStatus": self.playback_status,
+      "LoopStatus": self.loop_status,
+      "Shuffle": self.shuffle,
+      "Volume": self.volume,
+    }
+    signal: QDBusMessage = QDBusMessage.createSignal(OBJECT_PATH, "org.freedesktop.DBus.Properties", "PropertiesChanged")
+    signal.setArguments([PLAYER_INTERFACE, { name: values[name] for name in names }, []])
+    QDBusConnection.sessionBus().send(signal)
+
+
+class RootAdaptor(QDBusAbstractAdaptor):
+  Q_CLASSINFO("D-Bus Interface", "org.mpris.MediaPlayer2")
+
+  def __init__(self, parent: FakePlayer) -> None:
+    super().__init__(parent)
+    self.setAutoRelaySignals(True)
+
+  @pyqtProperty(str)
+  def Identity(self) -> str:
+    return "Fake player"
+
+  @pyqtProperty(bool)
+  def CanQuit(self) -> bool:
+    return False
+
+  @pyqtProperty(bool)
+  def CanRaise(self) -> bool:
+    return False
+
+  @pyqtProperty(bool)
+  def HasTrackList(self) -> bool:
+    return False
+
+
+class PlayerAdaptor(QDBusAbstractAdaptor):
+  Q_CLASSINFO("D-Bus Interface", PLAYER_INTERFACE)
+
+  def __init__(self, parent: FakePlayer) -> None:
+    super().__init__(parent)
+    self.player: FakePlayer = parent
+
+  # Properties
+  @pyqtProperty(str)
+  def PlaybackStatus(self) -> str:
+    return self.player.playback_status
+
+  @pyqtProperty(str)
+  def LoopStatus(self) -> str:
+    return self.player.loop_status
+
+  @LoopStatus.setter
+  def LoopStatus(self, value: str) -> None:
+    self.player.loop_status = value if value in LOOP_STATUSES else self.player.loop_status
+    self.player.changed("LoopStatus")
+
+  @pyqtProperty(bool)
+  def Shuffle(self) -> bool:
+    return self.player.shuffle
+
+  @Shuffle.setter
+  def Shuffle(self, value: bool) -> None:
+    self.player.shuffle = value
+    self.player.changed("Shuffle")
+
+  @pyqtProperty(float)
+  def Volume(self) -> float:
+    return self.player.volume
+
+  @Volume.setter
+  def Volume(self, value: float) -> None:
+    self.player.volume = min(max(value, 0.0), 1.0)
+    self.player.changed("Volume")
+
+  @pyqtProperty("QVariantMap")
+  def Metadata(self) -> dict[str, Any]:
+    return self.player.get_metadata()
+
+  @pyqtProperty(bool)
+  def CanGoNext(self) -> bool:
+    return True
+
+  @pyqtProperty(bool)
+  def CanGoPrevious(self) -> bool:
+    return True
+
+  @pyqtProperty(bool)
+  def CanPlay(self) -> bool:
+    return True
+
+  @pyqtProperty(bool)
+  def CanPause(self) -> bool:
+    return True
+
+  @pyqtProperty(bool)
+  def CanControl(self) -> bool:
+    return True
+
+  # Methods
+  @pyqtSlot()
+  def PlayPause(self) -> None:
+    self.player.playback_status = "Paused" if self.player.playback_status == "Playing" else "Playing"
+    self.player.changed("PlaybackStatus")
+
+  @pyqtSlot()
+  def Play(self) -> None:
+    self.player.playback_status = "Playing"
+    self.player.changed("PlaybackStatus")
+
+  @pyqtSlot()
+  def Pause(self) -> None:
+    self.player.playback_status = "Paused"
+    self.player.changed("PlaybackStatus")
+
+  @pyqtSlot()
+  def Stop(self) -> None:
+    self.player.playback_status = "Stopped"
+    self.player.changed("PlaybackStatus")
+
+  @pyqtSlot()
+  def Next(self) -> None:
+    self.player.skip(1)
+
+  @pyqtSlot()
+  def Previous(self) -> None:
+    self.player.skip(-1)
+
+
+def main() -> int:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Fake MPRIS player")
+  parser.add_argument("--name", default="fake", help="the bus name is org.mpris.MediaPlayer2.<name>")
+  parser.add_argument("--tracks", type=int, default=50)
+  parser.add_argument("--track-duration", type=float, default=30, help="seconds until the next track (0 = never)")
+  parser.add_argument("--art-dir", default="/tmp/mpris-fake-player", help="where the artwork files are written")
+  args: argparse.Namespace = parser.parse_args()
+
+  app: QCoreApplication = QCoreApplication(sys.argv[:1])
+  os.makedirs(args.art_dir, exist_ok=True)
+
+  player: FakePlayer = FakePlayer(args.tracks, args.track_duration, args.art_dir)
+  RootAdaptor(player)
+  PlayerAdaptor(player)
+
+  bus: QDBusConnection = QDBusConnection.sessionBus()
+  if not bus.isConnected():
+    print("No D-Bus session bus (DBUS_SESSION_BUS_ADDRESS)")
+    return 1
+
+  bus.registerObject(OBJECT_PATH, player)
+  if not bus.registerService(f"org.mpris.MediaPlayer2.{args.name}"):
+    print(f"Could not own org.mpris.MediaPlayer2.{args.name}: {bus.lastError().message()}")
+    return 1
+
+  print(f"Fake player running as org.mpris.MediaPlayer2.{args.name}", flush=True)
+  return app.exec_()
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Fills a play history database with years of generated plays and times its queries, to check they stay fast.
+
+  python tools/play_history_bench.py --path /tmp/history.db --years 5 --plays-per-day 60
+
+The plays go through PlayHistory.write in batches, as the app's writer thread does
+"""
+import argparse, os, random, sys, time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.play_history import PlayHistory, MAX_BATCH
+
+
+def fill(history: PlayHistory, years: float, plays_per_day: int, tracks: int) -> int:
+  rng: random.Random = random.Random(1)
+  weights: list[float] = [1 / (rank + 1) for rank in range(tracks)]  # a few favourites, a long tail
+  total: int = int(years * 365 * plays_per_day)
+  played_at: float = time.time() - years * 365 * 86400
+  step: float = 86400 / plays_per_day
+
+  last_play: int | None = None
+  with closing(history.connect()) as connection:
+    for start in range(0, total, MAX_BATCH):
+      batch: list[tuple[str, str, str, str, float, str | None]] = []
+      for index in rng.choices(range(tracks), weights, k=min(MAX_BATCH, total - start)):
+        played_at += step
+        batch.append(("spotify", f"track-{index}", f"Track {index}", f"Artist {index % 500}", played_at, "#1ed760"))
+      last_play = history.write(connection, batch, last_play)
+
+  return total
+
+
+def timed(name: str, fn, runs: int = 20) -> None:
+  durations: list[float] = []
+  for _ in range(runs):
+    started: float = time.perf_counter()
+    rows = fn()
+    durations.append((time.perf_counter() - started) * 1000)
+
+  durations.sort()
+  print(f"{name:<24} rows={len(rows):<4} p50={durations[len(durations) // 2]:.2f}ms max={durations[-1]:.2f}ms")
+
+
+def main() -> None:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Play history benchmark")
+  parser.add_argument("--path", default="play_history_bench.db")
+  parser.add_argument("--years", type=float, default=5)
+  parser.add_argument("--plays-per-day", type=int, default=60)
+  parser.add_argument("--tracks", type=int, default=20000)
+  args: argparse.Namespace = parser.parse_args()
+
+  history: PlayHistory = PlayHistory()
+  if not os.path.exists(args.path):
+    history.start(args.path, 0)
+    history.stop()
+
+    started: float = time.perf_counter()
+    total: int = fill(history, args.years, args.plays_per_day, args.tracks)
+    print(f"{total} plays written in {time.perf_counter() - started:.1f}s ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+  else:
+    history.path = args.path
+
+  now: float = time.time()
+  timed("recent (20)", lambda: history.get_recent(20))
+  timed("top tracks, all time", lambda: history.get_top_tracks(10))
+  timed("top tracks, 7 days", lambda: history.get_top_tracks(10, now - 7 * 86400))
+  timed("top tracks, 30 days", lambda: history.get_top_tracks(10, now - 30 * 86400))
+  timed("top tracks, 365 days", lambda: history.get_top_tracks(10, now - 365 * 86400), runs=5)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,215 @@
+"""
+Soak mode: drives the real card through N track changes with the replay backend and samples the RSS
+and the Python heap along the way. Exits with 1 when the growth after the warm-up goes over the thresholds.
+Runs headless (Qt offscreen platform).
+
+  python tools/soak.py --changes 5000 --max-rss-growth 20 --report soak.json
+  python tools/soak.py --changes 500 --tracemalloc --max-heap-growth 5 --report soak.json
+
+Without --trace a synthetic trace is generated (one track per line, --images distinct artworks).
+Every change is an artwork missing from the image cache, so its color extraction (pure Python) sets the pace:
+about 2000 changes per minute. --tracemalloc adds the traced heap check and the top allocators, but tracing
+every allocation of the color extraction slows it down to 100-200 changes per minute
+"""
+import argparse, gc, json, os, sys, tempfile, time, tracemalloc
+from typing import Any
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # project root
+
+from PIL import Image
+from config.config_main import config
+
+try:
+  import resource  # Unix only
+except ImportError:
+  resource = None
+
+# Fast, hands-off card: every poll is a track change and nothing waits for an animation
+SOAK_PREFS: dict[str, Any] = {
+  "media_player": "replay",
+  "replay_speed": 0,
+  "replay_loop": True,
+  "poll_interval": 0,
+  "always_on_screen": True,
+  "shortcuts": False,
+  "local_server_port": 0,
+  "metrics_dump_path": "",
+  "watchdog": False,
+  "profile_iterations": 0,
+  "card_snapshot_path": "",  # a saved card would be restored into the run
+}
+TRACEMALLOC_FILTERS: list[tracemalloc.Filter] = [
+  tracemalloc.Filter(False, tracemalloc.__file__),
+  tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+  tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+  tracemalloc.Filter(False, "<unknown>"),
+  tracemalloc.Filter(False, __file__),  # the samples themselves
+]
+
+
+def write_trace(directory: str, tracks: int, images: int, image_size: int) -> str:
+  for i in range(images):
+    color: tuple[int, int, int] = ((i * 67) % 256, (i * 131) % 256, (i * 29) % 256)
+    Image.new("RGB", (image_size, image_size), color).save(os.path.join(directory, f"{i}.png"))
+
+  path: str = os.path.join(directory, "soak.jsonl")
+  with open(path, "w", encoding="utf-8") as file:
+    for i in range(tracks):
+      entry: dict[str, Any] = { "id": f"soak{i}", "title": f"Soak Track {i}", "artist": f"Artist {i % 7}", "image": f"{i % images}.png" }
+      file.write(json.dumps(entry) + "\n")
+
+  return path
+
+
+class Sampler:
+  """
+  Samples the process memory at intervals. The first sample after the warm-up is the baseline of the growth checks
+  """
+  def __init__(self, top: int) -> None:
+    self.top: int = top
+    self.samples: list[dict[str, Any]] = []
+    self.baseline: dict[str, Any] | None = None
+    self.baseline_snapshot: tracemalloc.Snapshot | None = None
+    self.started: float = time.monotonic()
+
+  @staticmethod
+  def get_rss_kb() -> int | None:
+    try:
+      with open("/proc/self/status", "r") as file:
+        for line in file:
+          if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    except OSError:
+      pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None  # peak, where /proc is missing
+
+  def sample(self, changes: int) -> dict[str, Any]:
+    gc.collect()
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    sample: dict[str, Any] = {
+      "elapsed_s": round(time.monotonic() - self.started, 2),
+      "changes": changes,
+      "rss_kb": self.get_rss_kb(),
+      "heap_blocks": sys.getallocatedblocks(),
+      "gc_objects": len(gc.get_objects()),
+      "traced_kb": round(traced / 1024, 1),
+      "traced_peak_kb": round(traced_peak / 1024, 1),
+    }
+    self.samples.append(sample)
+    print(" ".join(f"{key}={value}" for key, value in sample.items()), flush=True)
+    return sample
+
+  def set_baseline(self, changes: int) -> None:
+    # The snapshot is kept until the end, so the baseline sample has to count it
+    if tracemalloc.is_tracing():
+      self.baseline_snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+    self.baseline = self.sample(changes)
+
+  def get_top_allocators(self) -> list[dict[str, Any]]:
+    # Where the memory grew since the baseline
+    if self.baseline_snapshot is None:
+      return []
+
+    snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+    stats: list[tracemalloc.StatisticDiff] = snapshot.compare_to(self.baseline_snapshot, "lineno")
+
+    return [
+      { "where": str(stat.traceback), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff }
+      for stat in stats[:self.top]
+    ]
+
+
+def main() -> int:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Memory soak test of the card pipeline")
+  parser.add_argument("--changes", type=int, default=2000, help="track changes to drive the card through")
+  parser.add_argument("--warmup-changes", type=int, default=200, help="changes before the baseline sample (caches filling up)")
+  parser.add_argument("--sample-every", type=float, default=5, help="seconds between samples")
+  parser.add_argument("--trace", help="replay this trace instead of a synthetic one")
+  parser.add_argument("--tracks", type=int, default=500, help="tracks of the synthetic trace")
+  parser.add_argument("--images", type=int, default=80, help="distinct artworks of the synthetic trace (the image cache keeps 64)")
+  parser.add_argument("--image-size", type=int, default=64)
+  parser.add_argument("--tracemalloc", action="store_true", help="trace the Python allocations (much slower)")
+  parser.add_argument("--frames", type=int, default=5, help="traceback depth kept by tracemalloc")
+  parser.add_argument("--top", type=int, default=15, help="allocators listed in the report")
+  parser.add_argument("--max-rss-growth", type=float, default=20, help="MB allowed after the warm-up")
+  parser.add_argument("--max-heap-growth", type=float, default=5, help="MB of traced Python memory allowed after the warm-up (with --tracemalloc)")
+  parser.add_argument("--report", help="write the samples and the top allocators (JSON)")
+  args: argparse.Namespace = parser.parse_args()
+
+  trace_path: str = args.trace or write_trace(tempfile.mkdtemp(prefix="spoticard-soak-"), args.tracks, args.images, args.image_size)
+  config.USER_PREFS.update(SOAK_PREFS, replay_trace_path=os.path.abspath(trace_path))
+
+  if args.tracemalloc:
+    tracemalloc.start(args.frames)
+
+  # After the preferences, the UI modules read some of them at import time
+  from PyQt5.QtCore import QTimer
+  from PyQt5.QtWidgets import QApplication
+  from ui.music_card.window import MusicCardWindow
+  from utils.async_engine import engine
+  from utils.logger import setup_logging
+  from utils.metrics import metrics
+
+  setup_logging()
+
+  app: QApplication = QApplication(sys.argv[:1])
+  card_window: MusicCardWindow = MusicCardWindow(app, config.get_screens()[0])
+  card_window.show()
+  card_window.card.updater.start()
+  app.aboutToQuit.connect(card_window.card.updater.stop)  # as main.py, the polls would go on while the interpreter exits
+  app.aboutToQuit.connect(engine.stop)
+
+  sampler: Sampler = Sampler(args.top)
+
+  def on_sample_timer() -> None:
+    changes: int = metrics.get_counter("card_updates")
+    if sampler.baseline is None and changes >= args.warmup_changes:
+      sampler.set_baseline(changes)
+    elif changes >= args.changes:
+      sampler.sample(changes)
+      app.quit()
+    else:
+      sampler.sample(changes)
+
+  sample_timer: QTimer = QTimer()
+  sample_timer.timeout.connect(on_sample_timer)
+  sample_timer.start(int(args.sample_every * 1000))
+  app.exec_()
+
+  if sampler.baseline is None:
+    print("The soak ended before the warm-up was over")
+    return 1
+
+  final: dict[str, Any] = sampler.samples[-1]
+  rss_growth: float = ((final["rss_kb"] or 0) - (sampler.baseline["rss_kb"] or 0)) / 1024
+  heap_growth: float = (final["traced_kb"] - sampler.baseline["traced_kb"]) / 1024
+  top_allocators: list[dict[str, Any]] = sampler.get_top_allocators()
+
+  block_growth: int = final["heap_blocks"] - sampler.baseline["heap_blocks"]
+  print(
+    f"\n{final['changes']} track changes in {final['elapsed_s']}s, after the warm-up: RSS {rss_growth:+.2f} MB, "
+    f"heap blocks {block_growth:+d}" + (f", traced heap {heap_growth:+.2f} MB" if args.tracemalloc else "")
+  )
+  for allocator in top_allocators:
+    print(f"{allocator['size_diff_kb']:>+10.1f} KB {allocator['count_diff']:>+7} blocks  {allocator['where']}")
+
+  if args.report:
+    with open(args.report, "w", encoding="utf-8") as file:
+      report: dict[str, Any] = { "rss_growth_mb": rss_growth, "heap_growth_mb": heap_growth, "samples": sampler.samples, "top_allocators": top_allocators }
+      json.dump(report, file, indent=2)
+
+  failures: list[str] = []
+  if rss_growth > args.max_rss_growth:
+    failures.append(f"RSS grew {rss_growth:.2f} MB (max {args.max_rss_growth} MB)")
+  if args.tracemalloc and heap_growth > args.max_heap_growth:
+    failures.append(f"traced heap grew {heap_growth:.2f} MB (max {args.max_heap_growth} MB)")
+
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Local stand-in of the Spotify Web API, to benchmark the Spotify workers and the image download path without a network.
+
+  python tools/spotify_stub.py --port 8765 --latency 150 --jitter 50 --rate-limit-every 20 --timeout-rate 0.05
+
+Then set "spotify_api_prefix": "http://127.0.0.1:8765/v1/" in the user preferences (no OAuth is done against the stub).
+GET /stats returns the request counts and the poll intervals (?reset=1 clears them)
+"""
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+from PIL import Image, ImageDraw
+
+MARKETS: tuple[str, ...] = ("AR", "AU", "BR", "CA", "DE", "ES", "FR", "GB", "JP", "MX", "SE", "US")
+REPEAT_MODES: tuple[str, ...] = ("off", "context", "track")
+
+
+class PlayerState:
+  """
+  Fake playback: a playlist of generated tracks that moves on by itself every 'track_duration' seconds
+  """
+  def __init__(self, base_url: str, tracks: int, track_duration: float, payload_kb: int) -> None:
+    self.base_url: str = base_url
+    self.tracks: int = tracks
+    self.track_duration: float = track_duration
+    self.payload_kb: int = payload_kb
+
+    self.lock: threading.Lock = threading.Lock()
+    self.index: int = 0
+    self.track_started: float = time.monotonic()
+    self.is_playing: bool = True
+    self.shuffle_state: bool = False
+    self.repeat_state: str = "off"
+    self.volume_percent: int = 50
+
+  def get_index(self) -> int:
+    if self.is_playing and self.track_duration > 0:
+      elapsed: float = time.monotonic() - self.track_started
+      if elapsed >= self.track_duration:
+        self.index = (self.index + int(elapsed // self.track_duration)) % self.tracks
+        self.track_started = time.monotonic() - elapsed % self.track_duration
+
+    return self.index
+
+  def get_playback(self) -> dict[str, Any]:
+    with self.lock:
+      index: int = self.get_index()
+      progress: int = int((time.monotonic() - self.track_started) * 1000)
+      playback: dict[str, Any] = {
+        "device": { "id": "stub", "name": "Spotify stub", "type": "Computer", "volume_percent": self.volume_percent },
+        "shuffle_state": self.shuffle_state,
+        "repeat_state": self.repeat_state,
+        "timestamp": int(time.time() * 1000),
+        "progress_ms": progress,
+        "is_playing": self.is_playing,
+        "currently_playing_type": "track",
+        "item": self.get_track(index),
+      }
+
+    return playback
+
+  def get_queue(self, size: int = 20) -> dict[str, Any]:
+    # The tracks after the current one, in playlist order
+    with self.lock:
+      index: int = self.get_index()
+
+    return {
+      "currently_playing": self.get_track(index),
+      "queue": [self.get_track((index + step) % self.tracks) for step in range(1, size + 1)],
+    }
+
+  def get_track(self, index: int) -> dict[str, Any]:
+    track_id: str = f"stub{index:06d}"
+    track: dict[str, Any] = {
+      "id": track_id,
+      "name": f"Stub Track {index + 1}",
+      "duration_ms": int(self.track_duration * 1000),
+      "artists": [{ "id": f"artist{index % 10}", "name": f"Stub Artist {index % 10 + 1}" }],
+      "album": {
+        "id": f"album{index}",
+        "name": f"Stub Album {index + 1}",
+        "images": [{ "url": f"{self.base_url}/images/{track_id}.jpg", "height": 640, "width": 640 }],
+      },
+      "available_markets": [],
+    }
+
+    # The real payloads are mostly market codes, so that's what pads them up to the requested size
+    if self.payload_kb > 0:
+      track["available_markets"] = [MARKETS[i % len(MARKETS)] for i in range(self.payload_kb * 1024 // 6)]
+
+    return track
+
+  # Controls
+  def set_playing(self, is_playing: bool) -> None:
+    with self.lock:
+      self.get_index()
+      self.is_playing = is_playing
+
+  def skip(self, step: int) -> None:
+    with self.lock:
+      self.index = (self.get_index() + step) % self.tracks
+      self.track_started = time.monotonic()
+
+  def set_shuffle(self, state: str) -> None:
+    with self.lock:
+      self.shuffle_state = state == "true"
+
+  def set_repeat(self, state: str) -> None:
+    with self.lock:
+      self.repeat_state = state if state in REPEAT_MODES else self.repeat_state
+
+  def set_volume(self, volume_percent: str) -> None:
+    with self.lock:
+      self.volume_percent = min(max(int(volume_percent), 0), 100)
+
+
+class RequestStats:
+  """
+  Request counts per route and status, plus the intervals between the polls of the player endpoint
+  """
+  def __init__(self) -> None:
+    self.lock: threading.Lock = threading.Lock()
+    self.reset()
+
+  def reset(self) -> None:
+    self.started: float = time.monotonic()
+    self.routes: dict[str, int] = { }
+    self.statuses: dict[str, int] = { }
+    self.poll_times: list[float] = []
+    self.delays_ms: list[float] = []
+
+  def record(self, route: str, status: int, delay: float) -> None:
+    with self.lock:
+      self.routes[route] = self.routes.get(route, 0) + 1
+      self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+      self.delays_ms.append(delay * 1000)
+      if route == "GET /v1/me/player":
+        self.poll_times.append(time.monotonic())
+
+  def snapshot(self) -> dict[str, Any]:
+    with self.lock:
+      elapsed: float = time.monotonic() - self.started
+      intervals: list[float] = sorted((b - a) * 1000 for a, b in zip(self.poll_times, self.poll_times[1:]))
+      delays: list[float] = sorted(self.delays_ms)
+
+      return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": sum(self.routes.values()),
+        "routes": dict(self.routes),
+        "statuses": dict(self.statuses),
+        "polls_per_minute": round(len(self.poll_times) / elapsed * 60, 2) if elapsed else 0,
+        "poll_interval_ms": {
+          "p50": round(percentile(intervals, 50), 2),
+          "p99": round(percentile(intervals, 99), 2),
+          "min": round(intervals[0], 2) if intervals else 0,
+        },
+        "injected_delay_ms": { "p50": round(percentile(delays, 50), 2), "p99": round(percentile(delays, 99), 2) },
+      }
+
+
+class Faults:
+  """
+  The bad network: latency (+ jitter), a 429 every N requests and requests that never answer in time
+  """
+  def __init__(self, latency: float, jitter: float, rate_limit_every: int, retry_after: int, timeout_rate: float, timeout_delay: float) -> None:
+    self.latency: float = latency / 1000
+    self.jitter: float = jitter / 1000
+    self.rate_limit_every: int = rate_limit_every
+    self.retry_after: int = retry_after
+    self.timeout_rate: float = timeout_rate
+    self.timeout_delay: float = timeout_delay
+
+    self.lock: threading.Lock = threading.Lock()
+    self.count: int = 0
+
+  def get_delay(self) -> float:
+    if self.timeout_rate and random.random() < self.timeout_rate:
+      return self.timeout_delay
+
+    return max(self.latency + random.uniform(-self.jitter, self.jitter), 0)
+
+  def is_rate_limited(self) -> bool:
+    with self.lock:
+      self.count += 1
+      return self.rate_limit_every > 0 and self.count % self.rate_limit_every == 0
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+  server: "StubServer"
+  protocol_version: str = "HTTP/1.1"  # keep-alive, as api.spotify.com
+
+  def do_GET(self) -> None:
+    self.dispatch("GET")
+
+  def do_PUT(self) -> None:
+    self.dispatch("PUT")
+
+  def do_POST(self) -> None:
+    self.dispatch("POST")
+
+  def dispatch(self, method: str) -> None:
+    url = urlsplit(self.path)
+    query: dict[str, str] = { key: values[0] for key, values in parse_qs(url.query).items() }
+    self.read_body()
+
+    if url.path == "/stats":
+      if query.get("reset") == "1":
+        self.server.stats.reset()
+      self.send_json(200, self.server.stats.snapshot())
+      return
+
+    route: str = f"{method} {'/images/*' if url.path.startswith('/images/') else url.path}"
+    delay: float = self.server.faults.get_delay()
+    time.sleep(delay)
+
+    if self.server.faults.is_rate_limited():
+      self.server.stats.record(route, 429, delay)
+      self.send_json(429, { "error": { "status": 429, "message": "API rate limit exceeded" } }, { "Retry-After": str(self.server.faults.retry_after) })
+      return
+
+    status: int = self.server.handle(method, url.path, query, self)
+    self.server.stats.record(route, status, delay)
+
+  def read_body(self) -> None:
+    length: int = int(self.headers.get("Content-Length") or 0)
+    if length:
+      self.rfile.read(length)
+
+  def send_body(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+    self.send_response(status)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(body)))
+    for name, value in (headers or { }).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def send_json(self, status: int, data: Any, headers: dict[str, str] | None = None) -> None:
+    self.send_body(status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+  def log_message(self, format: str, *args: Any) -> None:
+    pass
+
+
+class StubServer(ThreadingHTTPServer):
+  daemon_threads: bool = True
+
+  def __init__(self, port: int, player: PlayerState, faults: Faults, image_size: int) -> None:
+    super().__init__(("127.0.0.1", port), StubRequestHandler)
+    self.player: PlayerState = player
+    self.faults: Faults = faults
+    self.stats: RequestStats = RequestStats()
+    self.image_size: int = image_size
+    self.images: dict[str, bytes] = { }
+
+    self.controls: dict[tuple[str, str], Callable[[dict[str, str]], None]] = {
+      ("PUT", "/v1/me/player/play"): lambda query: self.player.set_playing(True),
+      ("PUT", "/v1/me/player/pause"): lambda query: self.player.set_playing(False),
+      ("POST", "/v1/me/player/next"): lambda query: self.player.skip(1),
+      ("POST", "/v1/me/player/previous"): lambda query: self.player.skip(-1),
+      ("PUT", "/v1/me/player/shuffle"): lambda query: self.player.set_shuffle(query.get("state", "false")),
+      ("PUT", "/v1/me/player/repeat"): lambda query: self.player.set_repeat(query.get("state", "off")),
+      ("PUT", "/v1/me/player/volume"): lambda query: self.player.set_volume(query.get("volume_percent", "50")),
+    }
+
+  def handle(self, method: str, path: str, query: dict[str, str], handler: StubRequestHandler) -> int:
+    if method == "GET" and path in ("/v1/me/player", "/v1/me/player/currently-playing"):
+      handler.send_json(200, self.player.get_playback())
+      return 200
+
+    if method == "GET" and path == "/v1/me/player/queue":
+      handler.send_json(200, self.player.get_queue())
+      return 200
+
+    if method == "GET" and path.startswith("/images/"):
+      handler.send_body(200, self.get_image(path.rsplit("/", 1)[-1]), "image/jpeg")
+      return 200
+
+    control: Callable[[dict[str, str]], None] | None = self.controls.get((method, path))
+    if not control:
+      handler.send_json(404, { "error": { "status": 404, "message": "Service not found" } })
+      return 404
+
+    control(query)
+    handler.send_body(204, b"", "application/json")
+    return 204
+
+  def get_image(self, name: str) -> bytes:
+    # One artwork per track with its own color, so the accent color changes too
+    if name not in self.images:
+      color: tuple[int, ...] = tuple(random.Random(name).randrange(40, 256) for _ in range(3))
+      image: Image.Image = Image.new("RGB", (self.image_size, self.image_size), color)
+      ImageDraw.Draw(image).ellipse((self.image_size // 4, self.image_size // 4, self.image_size * 3 // 4, self.image_size * 3 // 4), fill=(20, 20, 20))
+
+      output: BytesIO = BytesIO()
+      image.save(output, "JPEG", quality=85)
+      self.images[name] = output.getvalue()
+
+    return self.images[name]
+
+
+def percentile(values: list[float], p: float) -> float:
+  # 'values' must be sorted
+  if not values:
+    return 0.0
+
+  return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main() -> None:
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Local stand-in of the Spotify Web API")
+  parser.add_argument("--port", type=int, default=8765)
+  parser.add_argument("--latency", type=float, default=0, help="added latency per request (ms)")
+  parser.add_argument("--jitter", type=float, default=0, help="random +/- variation of the latency (ms)")
+  parser.add_argument("--rate-limit-every", type=int, default=0, help="answer 429 to every Nth request (0 = never)")
+  parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429 responses (s)")
+  parser.add_argument("--timeout-rate", type=float, default=0, help="fraction of the requests that hang")
+  parser.add_argument("--timeout-delay", type=float, default=10, help="how long the hanging requests take (s)")
+  parser.add_argument("--payload-kb", type=int, default=4, help="approximate size of the track payloads")
+  parser.add_argument("--image-size", type=int, default=640, help="artwork size (px)")
+  parser.add_argument("--tracks", type=int, default=50)
+  parser.add_argument("--track-duration", type=float, default=30, help="seconds until the next track (0 = never)")
+  args: argparse.Namespace = parser.parse_args()
+
+  player: PlayerState = PlayerState(f"http://127.0.0.1:{args.port}", args.tracks, args.track_duration, args.payload_kb)
+  faults: Faults = Faults(args.latency, args.jitter, args.rate_limit_every, args.retry_after, args.timeout_rate, args.timeout_delay)
+  server: StubServer = StubServer(args.port, player, faults, args.image_size)
+
+  print(f"Spotify stub running at http://127.0.0.1:{args.port}/v1/ (stats at /stats)")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+if __name__ == "__main__":
+  main()
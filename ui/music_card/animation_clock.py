@@ -0,0 +1,124 @@
+import time
+from PyQt5.QtCore import Qt, QTimer, QPoint, QEasingCurve
+from typing import Any, Callable, Union
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.metrics import metrics
+
+AnimatedValue = Union[QPoint, float]
+
+
+class Tween:
+  """
+  One animated property, stepped by the shared AnimationClock
+  """
+  def __init__(self, setter: Callable[[AnimatedValue], None], duration: int, easing: QEasingCurve.Type) -> None:
+    self.clock: AnimationClock = AnimationClock()
+    self.setter: Callable[[AnimatedValue], None] = setter
+    self.duration: float = duration / 1000
+    self.easing: QEasingCurve = QEasingCurve(easing)
+    self.finished_callbacks: list[Callable[[], None]] = []
+
+    self.start_value: AnimatedValue = 0.0
+    self.end_value: AnimatedValue = 0.0
+    self.started_at: float = 0.0
+    self.running: bool = False
+
+  def on_finished(self, callback: Callable[[], None]) -> None:
+    self.finished_callbacks.append(callback)
+
+  def is_running(self) -> bool:
+    return self.running
+
+  def start(self, start_value: AnimatedValue, end_value: AnimatedValue) -> None:
+    self.start_value = start_value
+    self.end_value = end_value
+    self.started_at = time.perf_counter()
+    self.running = True
+
+    self.setter(start_value)
+    self.clock.add(self)
+
+  def stop(self) -> None:
+    # Stops without reaching the end value (the finished callbacks are not called)
+    self.running = False
+    self.clock.remove(self)
+
+  def step(self, now: float) -> None:
+    progress: float = 1.0 if self.duration <= 0 else min((now - self.started_at) / self.duration, 1.0)
+    self.setter(self.interpolate(self.easing.valueForProgress(progress)))
+
+    if progress < 1.0:
+      return
+
+    self.stop()
+    for callback in self.finished_callbacks:
+      callback()
+
+  def interpolate(self, progress: float) -> AnimatedValue:
+    if isinstance(self.start_value, QPoint):
+      return QPoint(
+        round(self.start_value.x() + (self.end_value.x() - self.start_value.x()) * progress),
+        round(self.start_value.y() + (self.end_value.y() - self.start_value.y()) * progress),
+      )
+
+    return self.start_value + (self.end_value - self.start_value) * progress
+
+
+class AnimationClock(metaclass=ConfigRelatedMeta):
+  """
+  Single clock that steps every running tween on each tick. It only ticks while
+  something is animating and records the frame intervals and the dropped frames
+  """
+  def __init__(self) -> None:
+    fps_cap: int = max(1, config.get_pr("animation_fps_cap") or 60)
+    self.frame_budget: float = 1000 / fps_cap  # milliseconds
+
+    self.timer: QTimer = QTimer()
+    self.timer.setTimerType(Qt.PreciseTimer)
+    self.timer.setInterval(round(self.frame_budget))
+    self.timer.timeout.connect(self.tick)
+
+    self.tweens: list[Tween] = []
+    self.last_tick: float = 0.0
+
+  def add(self, tween: Tween) -> None:
+    if tween not in self.tweens:
+      self.tweens.append(tween)
+
+    if not self.timer.isActive():
+      self.last_tick = time.perf_counter()
+      self.timer.start()
+
+  def remove(self, tween: Tween) -> None:
+    if tween in self.tweens:
+      self.tweens.remove(tween)
+
+    if not self.tweens:
+      self.timer.stop()
+
+  def tick(self) -> None:
+    now: float = time.perf_counter()
+    self.record_frame((now - self.last_tick) * 1000)
+    self.last_tick = now
+
+    for tween in list(self.tweens):
+      if tween.is_running():
+        tween.step(now)
+
+  def record_frame(self, interval: float) -> None:
+    metrics.increment("animation_frames")
+    metrics.observe("animation_frame_interval", interval)
+
+    # Frames that should have been drawn in the meantime (with some tolerance for timer jitter)
+    if interval > self.frame_budget * 1.5:
+      metrics.increment("animation_dropped_frames", round(interval / self.frame_budget) - 1)
+
+  @staticmethod
+  def get_frame_stats() -> dict[str, Any]:
+    histogram = metrics.get_histogram("animation_frame_interval")
+    return {
+      "frames": metrics.get_counter("animation_frames"),
+      "dropped_frames": metrics.get_counter("animation_dropped_frames"),
+      "frame_interval": histogram.snapshot() if histogram else None,
+    }
@@ -1,104 +1,157 @@
-from PyQt5.QtCore import QEasingCurve, QPoint, QTimeLine, QPropertyAnimation
+from PyQt5.QtCore import QEasingCurve, QPoint
 from typing import TYPE_CHECKING
-from config.config_main import config
 from utils.constants import EASING_FUNCTIONS
+from utils.helpers import set_timer
+from ui.music_card.state import CardState
+from ui.music_card.animation_clock import Tween
+
+FADED_OPACITY: float = 0.01  # Not fully transparent, so the faded out card still receives its leave event
 
 if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
-  from PyQt5.QtCore import QRect
+  from PyQt5.QtCore import QRect, QTimer
+  from config.config_main import ScreenConfig
   from ui.music_card.card import MusicCard
 
 class MusicCardAnimations:
   def __init__(self, card: "MusicCard") -> None:
     self.card: "MusicCard" = card
-    self.last_x: int = config.get_pr("start_x_pos")
+    self.prefs: "ScreenConfig" = card.prefs
+    self.last_x: int = self.prefs.get_pr("start_x_pos")
 
-    # Animations' Properties
-    self.slide_in_animation: QPropertyAnimation = QPropertyAnimation(self.card, b"pos")
-    self.slide_in_animation.setDuration(config.get_pr("open_animation_dur"))
-    self.slide_in_animation.setEasingCurve(self.get_easing_curve("open_animation_easing"))
+    # Animations' Properties (all of them are stepped by the same AnimationClock)
+    self.slide_in_animation: Tween = Tween(self.card.movable.move, self.prefs.get_pr("open_animation_dur"), self.get_easing_curve("open_animation_easing"))
+    self.slide_in_animation.on_finished(self.on_slide_in_finished)
 
-    self.slide_out_animation: QPropertyAnimation = QPropertyAnimation(self.card, b"pos")
-    self.slide_out_animation.setDuration(config.get_pr("close_animation_dur"))
-    self.slide_out_animation.setEasingCurve(self.get_easing_curve("close_animation_easing"))
-    self.slide_out_animation.finished.connect(self.restart_loop)
+    self.slide_out_animation: Tween = Tween(self.card.movable.move, self.prefs.get_pr("close_animation_dur"), self.get_easing_curve("close_animation_easing"))
+    self.slide_out_animation.on_finished(self.restart_loop)
 
-    self.fade_out_animation: QPropertyAnimation = QPropertyAnimation(self.card.opacity_effect, b"opacity")
-    self.fade_out_animation.setDuration(300)
-    self.fade_out_animation.setEasingCurve(QEasingCurve.OutCubic)
+    self.fade_out_animation: Tween = Tween(self.card.opacity_effect.setOpacity, 300, QEasingCurve.OutCubic)
+    self.fade_out_animation.on_finished(self.on_faded_out)
 
-    self.fade_in_animation: QPropertyAnimation = QPropertyAnimation(self.card.opacity_effect, b"opacity")
-    self.fade_in_animation.setDuration(300)
-    self.fade_in_animation.setEasingCurve(QEasingCurve.InCubic)
+    self.fade_in_animation: Tween = Tween(self.card.opacity_effect.setOpacity, 300, QEasingCurve.InCubic)
 
-    self.timeline: QTimeLine = QTimeLine(config.get_pr("total_card_dur"))
-    self.timeline.setFrameRange(0, 100)
-    self.timeline.frameChanged.connect(self.start_hide_card)
+    # Fires once when the card has been on the screen for 'total_card_dur'
+    self.hide_timer: "QTimer" = set_timer(self.hide_card, single_shot=True)
 
-  @staticmethod
-  def get_easing_curve(curve: str, from_pref: bool = True) -> QEasingCurve:
+  def get_easing_curve(self, curve: str, from_pref: bool = True) -> QEasingCurve.Type:
     if from_pref:
-      return EASING_FUNCTIONS.get(config.get_pr(curve), QEasingCurve.Linear)
+      return EASING_FUNCTIONS.get(self.prefs.get_pr(curve), QEasingCurve.Linear)
 
     return EASING_FUNCTIONS.get(curve, QEasingCurve.Linear)
 
   # Main Card Timeline (Animations), in order of appearance
   def show_card(self) -> None:
-    if config.get_pr("always_on_screen"):
+    if self.prefs.get_pr("always_on_screen"):
       return
 
-    if self.slide_in_animation.state() == QPropertyAnimation.Running:
+    if self.slide_in_animation.is_running():
       self.slide_in_animation.stop()
+    if self.slide_out_animation.is_running():
+      self.slide_out_animation.stop()
+
+    if self.card.state.is_(CardState.FADED):
+      self.fade_in()
+
+    self.hide_timer.start(self.prefs.get_pr("total_card_dur"))
+    self.card.state.set_state(CardState.SLIDING_IN)
 
-    self.timeline.start()
-    self.card.is_card_showing = True
+    start_pos: QPoint = self.card.card_window.map_from_prefs(self.last_x, self.prefs.get_pr("start_y_pos"))
+    end_pos: QPoint = self.card.card_window.map_from_prefs(self.prefs.get_pr("end_x_pos"), self.prefs.get_pr("end_y_pos"))
 
-    start_pos: QPoint = QPoint(self.last_x, config.get_pr("start_y_pos"))
-    end_pos: QPoint = QPoint(config.get_pr("end_x_pos"), config.get_pr("end_y_pos"))
+    self.slide_in_animation.start(start_pos, end_pos)
 
-    self.slide_in_animation.setStartValue(start_pos)
-    self.slide_in_animation.setEndValue(end_pos)
-    self.slide_in_animation.start()
+  def show_card_in_place(self) -> None:
+    # The card restored at startup: already at its end position, so the first frame paints it
+    if self.prefs.get_pr("always_on_screen"):
+      return
+
+    self.hide_timer.start(self.prefs.get_pr("total_card_dur"))
+    self.card.state.set_state(CardState.SLIDING_IN)
+    self.card.movable.move(self.card.card_window.map_from_prefs(self.prefs.get_pr("end_x_pos"), self.prefs.get_pr("end_y_pos")))
+    self.on_slide_in_finished()
 
-  def start_hide_card(self) -> None:
-    if self.timeline.state() == QTimeLine.Running and self.timeline.currentFrame() == 100:
-      self.hide_card()
+  def on_slide_in_finished(self) -> None:
+    # A faded out card stays faded out once it is in place
+    if self.card.state.is_(CardState.SLIDING_IN):
+      self.card.state.set_state(CardState.VISIBLE)
 
   def hide_card(self) -> None:
-    if config.get_pr("always_on_screen"):
+    if self.prefs.get_pr("always_on_screen"):
+      return
+
+    if not self.card.state.is_(CardState.SLIDING_IN, CardState.VISIBLE, CardState.FADED):
       return
 
+    if self.slide_in_animation.is_running():
+      self.slide_in_animation.stop()
+
+    self.card.state.set_state(CardState.SLIDING_OUT)
+
     rect: "QRect" = self.card.geometry()
-    start_pos: QPoint = QPoint(config.get_pr("end_x_pos"), config.get_pr("end_y_pos"))
-    end_pos: QPoint = QPoint(-rect.width(), config.get_pr("start_y_pos"))
+    start_pos: QPoint = self.card.card_window.map_from_prefs(self.prefs.get_pr("end_x_pos"), self.prefs.get_pr("end_y_pos"))
+    end_pos: QPoint = self.card.card_window.map_from_prefs(-rect.width(), self.prefs.get_pr("start_y_pos"))
 
-    self.slide_out_animation.setStartValue(start_pos)
-    self.slide_out_animation.setEndValue(end_pos)
-    self.slide_out_animation.start()
+    self.slide_out_animation.start(start_pos, end_pos)
 
   def restart_loop(self) -> None:
-    # Reset some properties and restart the loop
-    if self.timeline.state() == QTimeLine.Running: self.timeline.stop()
-    if self.card.opacity_effect.opacity() == 0: self.fade_in()
+    # Reset some properties, the updater restarts the loop once the card is hidden
+    if self.hide_timer.isActive(): self.hide_timer.stop()
+    if self.card.opacity_effect.opacity() <= FADED_OPACITY: self.fade_in()
 
-    rect: "QRect" = self.card.geometry()
-    self.last_x = rect.x()
+    self.last_x = self.card.card_window.map_to_prefs(self.card.movable.pos()).x()
+    self.card.state.set_state(CardState.HIDDEN)
+
+  # Snooze
+  def snooze(self) -> None:
+    self.hide_timer.stop()
+    if self.slide_in_animation.is_running(): self.slide_in_animation.stop()
+    if self.slide_out_animation.is_running(): self.slide_out_animation.stop()
 
-    self.card.is_card_showing = False
-    self.card.updater.loop_timer.start(1000)
+    was_showing: bool = self.card.is_card_showing
+    self.card.state.set_state(CardState.SNOOZED)
+
+    if was_showing:
+      self.fade_out()
+    else:
+      self.on_faded_out()
+
+  def wake_up(self) -> None:
+    if self.card.opacity_effect.opacity() == 0:
+      self.fade_in()
+
+    if self.prefs.get_pr("always_on_screen"):
+      self.card.state.set_state(CardState.VISIBLE)
+      return
+
+    self.show_card()
+
+  def on_faded_out(self) -> None:
+    # Moves the snoozed card out of the screen, so it can't be hovered or clicked
+    if not self.card.state.is_(CardState.SNOOZED) or self.prefs.get_pr("always_on_screen"):
+      return
+
+    rect: "QRect" = self.card.geometry()
+    self.last_x = -rect.width()
+    self.card.movable.move(self.card.card_window.map_from_prefs(self.last_x, self.prefs.get_pr("start_y_pos")))
 
   # Card Hover Animations
-  def fade_out(self) -> None:
-    if self.fade_in_animation.state() == QPropertyAnimation.Running: self.fade_in_animation.stop()
-    if self.fade_out_animation.state() == QPropertyAnimation.Running: self.fade_out_animation.stop()
+  def fade_card(self) -> None:
+    if self.card.state.set_state(CardState.FADED):
+      self.fade_out(FADED_OPACITY)
+
+  def unfade_card(self) -> None:
+    is_sliding: bool = self.slide_in_animation.is_running()
+    if self.card.state.set_state(CardState.SLIDING_IN if is_sliding else CardState.VISIBLE):
+      self.fade_in()
+
+  def fade_out(self, opacity: float = 0) -> None:
+    if self.fade_in_animation.is_running(): self.fade_in_animation.stop()
+    if self.fade_out_animation.is_running(): self.fade_out_animation.stop()
 
-    self.fade_out_animation.setStartValue(1.0)
-    self.fade_out_animation.setEndValue(0)
-    self.fade_out_animation.start()
+    self.fade_out_animation.start(1.0, opacity)
 
   def fade_in(self) -> None:
-    if self.fade_in_animation.state() == QPropertyAnimation.Running: self.fade_in_animation.stop()
-    if self.fade_out_animation.state() == QPropertyAnimation.Running: self.fade_out_animation.stop()
+    if self.fade_in_animation.is_running(): self.fade_in_animation.stop()
+    if self.fade_out_animation.is_running(): self.fade_out_animation.stop()
 
-    self.fade_in_animation.setStartValue(0)
-    self.fade_in_animation.setEndValue(1.0)
-    self.fade_in_animation.start()
+    self.fade_in_animation.start(0, 1.0)
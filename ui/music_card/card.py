@@ -1,40 +1,45 @@
-import re
+import logging, re
 from PyQt5.QtWidgets import QFrame, QHBoxLayout, QVBoxLayout, QLabel, QLayout, QWidget, QGraphicsOpacityEffect
-from PyQt5.QtCore import QPoint, Qt, QEvent
+from PyQt5.QtCore import QPoint, Qt
 from PyQt5.QtGui import QCursor
 from typing import TYPE_CHECKING
 
 from config.config_main import config
+from media_players.base import PlaybackState
+from utils.logger import get_logger
 from ui.music_card.components.tooltip import Tooltip
 from ui.music_card.animations import MusicCardAnimations
+from ui.music_card.state import CardState, CardStateMachine, SHOWING_STATES
 from ui.music_card.handlers import UpdateHandler, CursorHandler
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
   from PyQt5.QtWidgets import QLayoutItem
-  from PyQt5.QtCore import QRect, QTimer
+  from PyQt5.QtCore import QTimer
   from PyQt5.QtGui import QPixmap
 
-  from media_players.base import PlaybackInfoDict
+  from config.config_main import ScreenConfig
   from ui.music_card.window import MusicCardWindow
 
+logger: logging.Logger = get_logger(__name__)
+
 class MusicCard(QFrame):
   def __init__(self, window: "MusicCardWindow") -> None:
     super().__init__(window)
-    self.coords: dict[str, tuple[int, int]] | None = None
-    self.is_card_showing: bool = True if config.get_pr("always_on_screen") else False
-    self.is_faded_out: bool = False
-    self.is_snoozing: bool = False
+    self.card_window: "MusicCardWindow" = window
+    self.prefs: "ScreenConfig" = window.prefs
+    self.movable: QWidget = window if window.is_compact else self  # Widget moved by the slide animations and dragging
+    self.state: CardStateMachine = CardStateMachine(CardState.VISIBLE if self.prefs.get_pr("always_on_screen") else CardState.HIDDEN)
     self.tooltip_visible: bool = False
 
     # Cursor-related Variables
     self.is_dragging: bool = False
     self.cursor_coords: QPoint | None = None
-    self.drag_start_pos: QPoint = QPoint(abs(config.get_pr("fixed_x_pos")), abs(config.get_pr("fixed_y_pos")))
+    self.drag_start_pos: QPoint = QPoint(abs(self.prefs.get_pr("fixed_x_pos")), abs(self.prefs.get_pr("fixed_y_pos")))
     self.setMouseTracking(True)
 
     # Main Layout
-    self.setStyleSheet(f"background-color: {config.current_theme.get('bg_color', '#202020')}; border-radius: {config.get_pr('card_radius')}px;")
-    self.setFixedSize(config.get_pr("min_card_width"), config.get_pr("min_card_height"))
+    self.setStyleSheet(f"background-color: {config.current_theme.get('bg_color', '#202020')}; border-radius: {self.prefs.get_pr('card_radius')}px;")
+    self.setFixedSize(self.prefs.get_pr("min_card_width"), self.prefs.get_pr("min_card_height"))
     #self.setAutoFillBackground(True)
 
     self.main_layout: QHBoxLayout = QHBoxLayout(self)
@@ -44,15 +49,15 @@ class MusicCard(QFrame):
     # Color Bar
     self.bar: QWidget = QWidget(self)
     self.bar.setFixedSize(60, self.height())
-    self.bar.setStyleSheet(f"background: {config.get_pr('custom_accent')};")
-    self.main_layout.addWidget(self.bar, config.get_pr("color_bar_order"))
-    self.main_layout.addSpacing(config.get_pr("card_spacing"))
+    self.bar.setStyleSheet(f"background: {self.prefs.get_pr('custom_accent')};")
+    self.main_layout.addWidget(self.bar, self.prefs.get_pr("color_bar_order"))
+    self.main_layout.addSpacing(self.prefs.get_pr("card_spacing"))
 
     # Card's Image
     self.img_label: QLabel = QLabel(self)
-    self.img_label.setFixedSize(config.get_pr("image_size"), config.get_pr("image_size"))
-    self.main_layout.addWidget(self.img_label, config.get_pr("image_order"))
-    self.main_layout.addSpacing(config.get_pr("card_spacing"))
+    self.img_label.setFixedSize(self.prefs.get_pr("image_size"), self.prefs.get_pr("image_size"))
+    self.main_layout.addWidget(self.img_label, self.prefs.get_pr("image_order"))
+    self.main_layout.addSpacing(self.prefs.get_pr("card_spacing"))
 
     # Card's Info
     self.info_layout: QVBoxLayout = QVBoxLayout()
@@ -65,7 +70,7 @@ class MusicCard(QFrame):
 
     self.info_layout.addWidget(self.title_label)
     self.info_layout.addWidget(self.artist_label)
-    self.main_layout.addLayout(self.info_layout, config.get_pr("info_order"))
+    self.main_layout.addLayout(self.info_layout, self.prefs.get_pr("info_order"))
 
     # Components
     self.tooltip_class: Tooltip = Tooltip(self)
@@ -80,33 +85,38 @@ class MusicCard(QFrame):
     self.animations: MusicCardAnimations = MusicCardAnimations(self)
 
     # Global Handlers
-    self.playback_info: "PlaybackInfoDict" = {
-      "current_track_id": '',
-      "current_track": { },
-      "is_playing": False,
-      "previous_track_id": '',
-      "previous_state_is_playing": False,
-      "shuffle_state": False,
-      "repeat_state": "off",
-      "volume_percent": 0
-    }
-
-    self.updater: UpdateHandler = UpdateHandler(self)
+    self.playback_state: PlaybackState = PlaybackState()  # replaced, never changed in place
+
     self.cursor_handler: CursorHandler = CursorHandler(self)
 
-    # Initialize
-    self.updater.start_loop()
+    # Initialize: the first card creates the pipeline, the others join it (started once all of them are shown)
+    if window.updater:
+      self.updater: UpdateHandler = window.updater
+      self.updater.add_card(self)
+    else:
+      self.updater: UpdateHandler = UpdateHandler(self)
+
+  # States
+  @property
+  def is_card_showing(self) -> bool:
+    return self.state.is_(*SHOWING_STATES)
+
+  @property
+  def is_faded_out(self) -> bool:
+    return self.state.is_(CardState.FADED)
+
+  @property
+  def is_snoozing(self) -> bool:
+    return self.state.is_(CardState.SNOOZED)
 
   # Build Helpers
-  @staticmethod
-  def get_margins() -> tuple[int, int, int, int]:
-    return config.get_pr("card_l_margin"), config.get_pr("card_t_margin"), config.get_pr("card_r_margin"), config.get_pr("card_b_margin")
+  def get_margins(self) -> tuple[int, int, int, int]:
+    return self.prefs.get_pr("card_l_margin"), self.prefs.get_pr("card_t_margin"), self.prefs.get_pr("card_r_margin"), self.prefs.get_pr("card_b_margin")
 
-  @staticmethod
-  def get_label_style(label: str) -> str:
+  def get_label_style(self, label: str) -> str:
     color: str = f"color: {config.current_theme.get(f'{label}_font_color')}; "
-    font_size: str = f"font-size: {config.get_pr(f'{label}_font_size')}px; "
-    font_family: str = f"font-family: {config.get_pr(f'{label}_font')}; "
+    font_size: str = f"font-size: {self.prefs.get_pr(f'{label}_font_size')}px; "
+    font_family: str = f"font-family: {self.prefs.get_pr(f'{label}_font')}; "
 
     return color + font_size + font_family
 
@@ -142,7 +152,7 @@ class MusicCard(QFrame):
     if total_width < min_width:
       total_width = min_width
 
-    print(f"Total width: {total_width}")
+    logger.debug("Total width: %d", total_width)
     return total_width
 
   @staticmethod
@@ -186,7 +196,7 @@ class MusicCard(QFrame):
       container.img_label.setPixmap(pixmap)
 
     except Exception as e:
-      print(f"Error: Image not found or not supported ({e})")
+      logger.warning("Image not found or not supported (%s)", e)
       container.img_label.clear()
 
   def set_theme(self, theme: dict[str, str] | None = None) -> None:
@@ -198,11 +208,17 @@ class MusicCard(QFrame):
     self.modify_stylesheet(self.artist_label, "color", theme.get("artist_font_color"))
 
   # Events
+  def resizeEvent(self, event) -> None:
+    if self.card_window.is_compact:
+      self.card_window.fit_to_card()
+
+    super().resizeEvent(event)
+
   def enterEvent(self, event) -> None:
     self.setCursor(QCursor(Qt.PointingHandCursor))
     self.tooltip_timer.start(2000)
 
-    if not config.get_pr("hide_on_click"):
+    if not self.prefs.get_pr("hide_on_click"):
       self.cursor_handler.on_click()
       super().enterEvent(event)
 
@@ -211,39 +227,25 @@ class MusicCard(QFrame):
     self.cursor_handler.on_leave()
     super().leaveEvent(event)
 
-  def call_leave_event(self) -> None: # Manual call to leave event
-    q_event: QEvent = QEvent(QEvent.Leave)
-    self.leaveEvent(q_event)
-
   def mousePressEvent(self, event) -> None:
-    if config.get_pr("always_on_screen") and config.get_pr("draggable") and event.button() == Qt.RightButton:
+    if self.prefs.get_pr("always_on_screen") and self.prefs.get_pr("draggable") and event.button() == Qt.RightButton:
       self.setCursor(QCursor(Qt.OpenHandCursor))
       self.is_dragging = True
-      self.drag_start_pos = event.globalPos() - self.frameGeometry().topLeft()
+      self.drag_start_pos = event.globalPos() - self.movable.frameGeometry().topLeft()
       event.accept()
 
-    if config.get_pr("hide_on_click") and not self.is_faded_out and event.button() == Qt.LeftButton:
+    if self.prefs.get_pr("hide_on_click") and not self.is_faded_out and event.button() == Qt.LeftButton:
       self.cursor_handler.on_click()
 
   def mouseMoveEvent(self, event) -> None:
     if self.is_dragging:
       self.setCursor(QCursor(Qt.ClosedHandCursor))
       new_pos: QPoint = event.globalPos() - self.drag_start_pos
-      self.move(new_pos)
+      self.movable.move(new_pos)
       event.accept()
 
   def mouseReleaseEvent(self, event) -> None:
-    if config.get_pr("always_on_screen") and config.get_pr("draggable") and event.button() == Qt.RightButton:
-      rect: "QRect" = self.geometry()
-      pos: QPoint = self.pos()
-      coords: dict[str, tuple[int, int]] = {
-        "upper_left": (pos.x(), pos.y()),
-        "upper_right": (pos.x() + rect.width(), pos.y()),
-        "lower_left": (pos.x(), pos.y() + rect.height()),
-        "lower_right": (pos.x() + rect.width(), pos.y() + rect.height()),
-      }
-      self.coords = coords
-
+    if self.prefs.get_pr("always_on_screen") and self.prefs.get_pr("draggable") and event.button() == Qt.RightButton:
       self.setCursor(QCursor(Qt.PointingHandCursor))
       self.is_dragging = False
       event.accept()
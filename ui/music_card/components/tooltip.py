@@ -1,12 +1,16 @@
+import logging
 from typing import TYPE_CHECKING
 from PyQt5.QtGui import QCursor
 from PyQt5.QtWidgets import QLabel
 from utils.helpers import set_timer
+from utils.logger import get_logger
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
   from PyQt5.QtCore import QPoint, QTimer
   from ui.music_card.card import MusicCard
 
+logger: logging.Logger = get_logger(__name__)
+
 class Tooltip:
   def __init__(self, card: "MusicCard") -> None:
     self.card = card
@@ -24,7 +28,7 @@ class Tooltip:
     self.card.tooltip_timer.stop()
     global_pos: QPoint = QCursor.pos()
     widget_pos: QPoint = self.card.mapFromGlobal(global_pos)
-    print(widget_pos)
+    logger.debug("Tooltip shown", extra={ "x": widget_pos.x(), "y": widget_pos.y() })
     self.card.cursor_coords = widget_pos
 
     # if self.tooltip_visible or self.is_dragging:
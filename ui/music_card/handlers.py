@@ -1,4 +1,5 @@
-from PyQt5.QtCore import QTimer, QThread, QObject, pyqtSignal
+import logging, time
+from PyQt5.QtCore import QTimer, QObject, pyqtSignal
 from PyQt5.QtGui import QCursor
 from PyQt5.QtWidgets import QApplication
 from keyboard import add_hotkey
@@ -6,57 +7,115 @@ from typing import TYPE_CHECKING, Any, Union, Callable
 
 from config.config_main import config
 from utils.helpers import set_timer
-from utils.image_handling import ConvertImageToPixmap, ExtractImageColor
+from utils.file_handling import File
+from utils.image_handling import ConvertImageToPixmap, ExtractImageColor, register_card_image
+from utils.metrics import metrics
+from utils.now_playing import now_playing
+from utils.warmup import Warmup
+from utils.profiler import profiler
+from utils.logger import get_logger
+from utils.constants import WARNING_IMG_PATH
 from media_players.factory import get_factory
+from ui.music_card.state import CardState
+from ui.music_card.snapshot import CardSnapshot
 
 if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
-  from PyQt5.QtCore import QRect, QPoint
+  from PyQt5.QtCore import QRect
   from PyQt5.QtGui import QPixmap, QScreen
   from media_players.factory import IMediaPlayerFactory
-  from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker
+  from media_players.base import IMetadataWorker, IMetadataHandler, IPlaybackWorker, MetadataRecord
   from ui.music_card.window import MusicCardWindow
   from ui.music_card.card import MusicCard
   from ui.music_card.animations import MusicCardAnimations
 
+logger: logging.Logger = get_logger(__name__)
+
 PLAYER = config.get_pr("media_player")
 MEDIA_FACTORY: "IMediaPlayerFactory" = get_factory(PLAYER)
 
 class UpdateHandler:
+  """
+  The metadata pipeline, one for every card: the first card ('card') keeps the playback state,
+  the content and the animations go to all of them
+  """
   def __init__(self, card: "MusicCard"):
     self.card: "MusicCard" = card
-    self.animations: "MusicCardAnimations" = card.animations
+    self.cards: list["MusicCard"] = []
+
+    self.is_polling: bool = False
+    self.trace_started: float | None = None
+    self.accent_color: str | None = None  # of the card's current content
+    self.content: tuple[str, str, dict[tuple[int, int, float], Union["QPixmap", None]]] | None = None  # title, artist and pixmaps shown
 
-    self.loop_timer: QTimer = set_timer(self.start_loop)
+    snapshot_path: str = config.get_pr("card_snapshot_path") or ""
+    self.snapshot: CardSnapshot | None = CardSnapshot(File.get_relative_path(snapshot_path)) if snapshot_path else None
+    self.add_card(card)
     self.metadata_handler: "IMetadataHandler" = MEDIA_FACTORY.create_metadata_handler(self.card, self)
 
+    # Preloads fonts and static assets while the first metadata is being fetched
+    self.warmup: Warmup = Warmup()
+    self.warmup.start()
+
+    # The worker polls in the async engine, its records are queued back to the GUI thread
     self.worker: "IMetadataWorker" = MEDIA_FACTORY.create_metadata_worker()
-    self.thread: QThread = QThread()
-    self.worker.moveToThread(self.thread)
     self.worker.finished.connect(self.update_card)
-    self.thread.start()
 
-  # The loop: start_loop -> MetadataWorker -> update_card -> start again
+  def add_card(self, card: "MusicCard") -> None:
+    self.cards.append(card)
+    card.state.changed.connect(self.on_state_changed)
+    register_card_image(*self.get_image_format(card))  # the artwork is prepared for its screen too
+
+  def start(self) -> None:
+    # Once every card is added: the last card is painted right away, then the first poll reconciles it
+    is_restored: bool = self.restore_snapshot()
+    self.start_loop()
+
+    if is_restored and not self.is_polling:
+      self.worker.poll_now()  # the card is showing, so the loop waits: the snapshot is still checked at once
+
+  # The loop: the MetadataWorker polls by itself while can_poll, and update_card only runs when a record changed
   def start_loop(self) -> None:
-    if self.loop_timer.isActive():
-      self.loop_timer.stop()
+    was_polling: bool = self.is_polling
+    self.update_polling()
+
+    if was_polling and self.can_poll():
+      self.worker.poll_now()  # Starting to poll already fetches right away
+
+  def update_polling(self) -> None:
+    is_polling: bool = self.can_poll()
+    if is_polling != self.is_polling:
+      self.is_polling = is_polling
+      self.worker.set_polling(is_polling)
 
+  def stop(self) -> None:
+    self.worker.stop()
+
+  def can_poll(self) -> bool:
     # Not update the card when it is snoozing or when it is on the screen (excluding when always_on_screen is on)
     if self.card.is_snoozing:
-      return
+      return False
 
-    elif not config.get_pr("always_on_screen") and self.card.is_card_showing:
-      self.loop_timer.start(1000)
-      return
+    if any(card.prefs.get_pr("always_on_screen") for card in self.cards):
+      return True
+
+    return not any(card.is_card_showing for card in self.cards)
 
-    self.worker.getting.emit()
+  def on_state_changed(self, previous: "CardState", state: "CardState") -> None:
+    # e.g. the polling stops while the card is on the screen and starts again once it is hidden
+    self.update_polling()
 
-  def update_card(self, current_playback: dict[str, Any]):
-    self.metadata_handler.show_theme_changed()  # Shows the card if the theme has changed
-    self.metadata_handler.handle_metadata(current_playback)  # Shows the card based on rules set by the current media player
+  @profiler.profile_iteration
+  def update_card(self, record: "MetadataRecord"):
+    metrics.observe("stage.signal_delivery", (time.perf_counter() - self.worker.emitted_at) * 1000)
+    self.trace_started = self.worker.emitted_fetch_started  # time-to-card is measured from the start of this poll
 
-    self.loop_timer.start(1000)  # Loop starts again
+    with metrics.span("handle_metadata"):
+      self.metadata_handler.show_theme_changed(record.is_os_dark)  # Shows the card if the theme has changed
+      self.metadata_handler.handle_metadata(record)  # Shows the card based on rules set by the current media player
+    self.trace_started = None
 
   # Card Content Handling
+  @profiler.profile
   def update_card_content(
     self,
     title: str,
@@ -64,88 +123,129 @@ class UpdateHandler:
     img_src: str | bytes | None = None,
     bar_color: str = config.get_pr("custom_color")
   ) -> None:
-    self.reset_card_content()
-
     image_color: str = bar_color
     i_converter: ConvertImageToPixmap = ConvertImageToPixmap()
     i_extractor: ExtractImageColor = ExtractImageColor()
 
     if not img_src:
-      img_src = r"resources\img\warning.png"  # TODO: Replace with a default image
+      img_src = WARNING_IMG_PATH  # TODO: Replace with a default image
 
-    pixmap: Union["QPixmap", None] = i_converter.convert(img_src, config.get_pr("image_size"), config.get_pr("image_radius"))
     if not config.get_pr("only_custom_color"):
-      image_color = i_extractor.extract(img_src, config.current_theme.get("bg_color"))
+      with metrics.span("color_extraction"):
+        image_color = i_extractor.extract(img_src, config.current_theme.get("bg_color"))
+
+    # The cards with the same image format (screens with the same pixel ratio) share one pixmap
+    pixmaps: dict[tuple[int, int, float], Union["QPixmap", None]] = { }
+    for card in self.cards:
+      image_format: tuple[int, int, float] = self.get_image_format(card)
+      if image_format not in pixmaps:
+        pixmaps[image_format] = i_converter.convert(img_src, *image_format)
+
+      with metrics.span("layout"):
+        self.set_card_content(card, title, artist, pixmaps[image_format], image_color)
+
+      with metrics.span("show_card"):
+        card.animations.show_card()
+
+    self.accent_color = image_color
+    self.content = (title, artist, pixmaps)
+    now_playing.publish_card(title, artist, image_color, pixmaps[self.get_image_format(self.card)])
+    metrics.increment("card_updates")
+    if self.trace_started:
+      metrics.observe("time_to_card", (time.perf_counter() - self.trace_started) * 1000)
+
+  def set_card_content(self, card: "MusicCard", title: str, artist: str, pixmap: Union["QPixmap", None], image_color: str) -> None:
+    self.reset_card_content(card)
 
     # Set properties
-    self.card.title_label.setText(title)
-    self.card.artist_label.setText(artist)
-    self.card.set_pixmap(self.card, pixmap)
-    self.card.bar.setStyleSheet(f"background-color: {image_color};")
+    card.title_label.setText(title)
+    card.artist_label.setText(artist)
+    card.set_pixmap(card, pixmap)
+    card.bar.setStyleSheet(f"background-color: {image_color};")
 
     # Set the card width manually
-    total_width: int = self.card.get_total_width(self.card.main_layout, config.get_pr("card_spacing"), config.get_pr("min_card_width"))
-    self.card.setFixedWidth(total_width)
-
-    # Update valid card's coordinates
-    rect: "QRect" = self.card.geometry()
-    coords: dict[str, tuple[int, int]] = {
-      "upper_left": (config.get_pr("end_x_pos"), config.get_pr("end_y_pos")),
-      "upper_right": (config.get_pr("end_x_pos") + rect.width(), config.get_pr("end_y_pos")),
-      "lower_left": (config.get_pr("end_x_pos"), config.get_pr("end_y_pos") + rect.height()),
-      "lower_right": (config.get_pr("end_x_pos") + rect.width(), config.get_pr("end_y_pos") + rect.height()),
-    }
-    self.card.coords = coords
-    self.animations.show_card()
+    total_width: int = card.get_total_width(card.main_layout, card.prefs.get_pr("card_spacing"), card.prefs.get_pr("min_card_width"))
+    card.setFixedWidth(total_width)
+
+  # Snapshot of the last card, painted on the next startup before any metadata arrives
+  def restore_snapshot(self) -> bool:
+    data: dict[str, Any] | None = self.snapshot.load() if self.snapshot else None
+    if not data:
+      return False
+
+    with metrics.span("snapshot_restore"):
+      title, artist = data.get("title", ''), data.get("artist", '')
+      image_color: str = data.get("accent_color") or config.get_pr("custom_color")
+      pixmaps: dict[tuple[int, int, float], Union["QPixmap", None]] = { }
+      for card in self.cards:
+        image_format: tuple[int, int, float] = self.get_image_format(card)
+        if image_format not in pixmaps:
+          pixmaps[image_format] = self.snapshot.get_pixmap(data, image_format)
+
+        card.opacity_effect.setOpacity(1)  # no fade or slide in, both would hide it for the first frames
+        self.set_card_content(card, title, artist, pixmaps[image_format], image_color)
+        card.animations.show_card_in_place()
+
+    # The fresh metadata is compared to it: the same track isn't shown (or added to the play history) again
+    self.card.playback_state = self.snapshot.get_playback_state(data)
+    self.accent_color = image_color
+    self.content = (title, artist, pixmaps)
+    now_playing.publish_card(title, artist, image_color, pixmaps[self.get_image_format(self.card)])
+
+    metrics.increment("snapshot_restores")
+    logger.info("Last card restored", extra={ "title": title, "artist": artist })
+    return True
+
+  def save_snapshot(self) -> None:
+    if self.snapshot and self.content:
+      title, artist, pixmaps = self.content
+      self.snapshot.save(self.card.playback_state, title, artist, self.accent_color, pixmaps)
+
+  @staticmethod
+  def reset_card_content(card: "MusicCard") -> None:
+    if card.opacity_effect.opacity() == 0:
+      card.animations.fade_in()
+
+    card.bar.setStyleSheet(f"background-color: {card.prefs.get_pr('custom_accent')};")
+    card.title_label.setText("")
+    card.artist_label.setText("")
+    card.img_label.clear()
 
-  def reset_card_content(self):
-    if self.card.opacity_effect.opacity() == 0:
-      self.animations.fade_in()
+  @staticmethod
+  def get_image_format(card: "MusicCard") -> tuple[int, int, float]:
+    return card.prefs.get_pr("image_size"), card.prefs.get_pr("image_radius"), card.card_window.device_pixel_ratio
 
-    self.card.bar.setStyleSheet(f"background-color: {config.get_pr('custom_accent')};")
-    self.card.title_label.setText("")
-    self.card.artist_label.setText("")
-    self.card.img_label.clear()
+  def show_theme(self) -> None:
+    for card in self.cards:
+      card.set_theme()
+      card.animations.show_card()
 
 
 class CursorHandler:
+  """
+  Hover handling is driven by the card's enter/leave events: a faded out card keeps
+  a hit-testable surface, so its leave event arrives as soon as the cursor actually leaves
+  """
   def __init__(self, card: "MusicCard") -> None:
     self.card: "MusicCard" = card
     self.animations: "MusicCardAnimations" = self.card.animations
-    self.hover_timer: QTimer = set_timer(self.card.call_leave_event)
 
   def on_click(self) -> None:
-    if self.card.is_faded_out:
+    if not self.card.state.is_(CardState.SLIDING_IN, CardState.VISIBLE):
       return
 
-    self.card.is_faded_out = True
-    self.animations.fade_out()
+    self.animations.fade_card()
 
   def on_leave(self, force_show: bool = False) -> None:
     if not self.card.is_faded_out:
-      self.hover_timer.stop()
       return
 
-    if force_show:
-      self.card.is_faded_out = False
-      self.animations.fade_in()
-      return
+    if force_show or not self.is_cursor_over_card():
+      self.animations.unfade_card()
 
-    c_pos: "QPoint" = QCursor.pos()  # cursor position
-    u_left: tuple[int, int] = self.card.coords["upper_left"]
-    l_right: tuple[int, int] = self.card.coords["lower_right"]
-
-    # Check if the card left the screen
-    if (
-      c_pos.x() < u_left[0] or
-      c_pos.y() < u_left[1] or
-      c_pos.x() > l_right[0] or
-      c_pos.y() > l_right[1]
-    ):
-      self.card.is_faded_out = False
-      self.animations.fade_in()
-    else:
-      self.hover_timer.start(100)
+  def is_cursor_over_card(self) -> bool:
+    # Guards against leave events sent while the cursor is still over the card (e.g. by the window manager)
+    return self.card.rect().contains(self.card.mapFromGlobal(QCursor.pos()))
 
 
 class ShortcutHandler(QObject):
@@ -155,7 +255,7 @@ class ShortcutHandler(QObject):
     super().__init__()
     self.window: "MusicCardWindow" = window
     self.card: "MusicCard" = self.window.card
-    self.animations: "MusicCardAnimations" = self.card.animations
+    self.cards: list["MusicCard"] = self.card.updater.cards  # the app's shortcuts act on every card
     self.closing_timer: QTimer = set_timer(self.exit_app)
 
     self.shortcut_functions: dict[str, Callable] = {
@@ -168,10 +268,9 @@ class ShortcutHandler(QObject):
     self.on_shortcut.connect(self.execute_shortcut)
     self.register_shortcuts()
 
-    self.thread: QThread = QThread()
+    # Lives in the GUI thread, its commands run in the async engine
     self.worker: "IPlaybackWorker" = MEDIA_FACTORY.create_playback_worker(self.card)
-    self.worker.moveToThread(self.thread)
-    self.thread.start()
+    self.worker.register_shortcuts()
 
   def register_shortcuts(self) -> None:
     for shortcut in self.shortcut_functions.keys():
@@ -186,51 +285,59 @@ class ShortcutHandler(QObject):
   # App related shortcuts
   def toggle_snooze(self) -> None:
     if self.card.is_snoozing:
-      print("Awake...")
-      if self.card.is_card_showing:
-        self.animations.fade_in()
-      else:
-        self.animations.show_card()
-
-      self.card.is_snoozing = False
+      logger.info("Awake")
+      for card in self.cards:
+        card.animations.wake_up()
       self.card.updater.start_loop()
 
     else:
-      print("Snoozing...")
-      if self.card.is_card_showing:
-        self.animations.fade_out()
-
-      self.card.is_snoozing = True
+      logger.info("Snoozing")
+      for card in self.cards:
+        card.animations.snooze()
 
   def exit_app(self) -> None:
-    if self.card.is_card_showing:
-      self.animations.fade_out()
+    for card in self.cards:
+      if card.is_card_showing:
+        card.animations.fade_out()
+
+    logger.info("Exiting", extra={
+      "wakeups_per_minute": round(metrics.rate_per_minute("wakeups"), 2),
+      "idle_wakeups_per_minute": round(metrics.rate_per_minute("idle_wakeups"), 2),
+      "animation_frames": metrics.get_counter("animation_frames"),
+      "animation_dropped_frames": metrics.get_counter("animation_dropped_frames"),
+    })
 
     QTimer.singleShot(500, lambda: QApplication.quit())
 
   # Visual related shortcuts
   def toggle_card_visibility(self) -> None:
-    if not self.card.is_card_showing:
-      self.animations.show_card()
+    for card in self.cards:
+      if not card.is_card_showing:
+        card.animations.show_card()
 
-    elif not self.card.is_faded_out and self.card.is_card_showing:
-      self.card.cursor_handler.on_click()
+      elif not card.is_faded_out and card.is_card_showing:
+        card.cursor_handler.on_click()
 
-    elif self.card.is_faded_out:
-      self.card.cursor_handler.on_leave(True)
+      elif card.is_faded_out:
+        card.cursor_handler.on_leave(True)
 
-  @staticmethod
-  def toggle_theme() -> None:
+  def toggle_theme(self) -> None:
     next_theme_name: str = next(config.themes_cycle)
-    print(f"{next_theme_name=}")
+    logger.info("Theme changed", extra={ "theme": next_theme_name })
     config.set_current_theme(next_theme_name)
 
+    # Applied right away, the worker doesn't report anything unless the playback changes
+    self.card.updater.metadata_handler.show_theme_changed(config.is_os_dark)
+
 
 class ScreenHandler:
   def __init__(self, window: "MusicCardWindow", app: QApplication) -> None:
     self.window: "MusicCardWindow" = window
     self.screens: list["QScreen"] = app.screens()
 
+  def get_device_pixel_ratio(self, screen_index: int = 0) -> float:
+    return self.screens[self.verify_screen_index(screen_index)].devicePixelRatio()
+
   def get_screen_geometry(self, screen_index: int = 0) -> "QRect":
     index: int = self.verify_screen_index(screen_index)
     screen: "QScreen" = self.screens[index]
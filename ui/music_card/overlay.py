@@ -0,0 +1,236 @@
+import logging, os, stat, tempfile, threading, time
+from PyQt5.QtCore import QEvent, QObject, QPoint, QSize, QTimer, Qt
+from PyQt5.QtGui import QImage, QPainter, QPixmap
+from PyQt5.QtWidgets import QWidget
+from typing import TYPE_CHECKING
+
+from config.config_main import config
+from utils.async_engine import engine
+from utils.file_handling import File
+from utils.metrics import metrics
+from utils.logger import get_logger
+from ui.music_card.animation_clock import AnimationClock
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.window import MusicCardWindow
+
+logger: logging.Logger = get_logger(__name__)
+
+WATCHED_EVENTS: tuple[QEvent.Type, ...] = (QEvent.Paint, QEvent.Move, QEvent.Resize, QEvent.Show, QEvent.Hide)
+
+
+class FrameStream:
+  """
+  Raw RGBA frames (canvas width x height x 4 bytes, no header) for streaming tools. A named pipe gets
+  every frame, e.g. for ffmpeg's rawvideo input; a regular file (e.g. in /dev/shm) always holds the latest one.
+  The writes happen in their own thread, frames are dropped while the reader is slow or missing
+  """
+  def __init__(self, path: str) -> None:
+    self.path: str = path
+    self.fd: int | None = None
+    self.is_pipe: bool = False
+
+    self.frame: bytes | None = None  # the next frame to write, a newer one replaces it
+    self.condition: threading.Condition = threading.Condition()
+    self.is_stopped: bool = False
+    self.thread: threading.Thread = threading.Thread(target=self.run, name="overlay-stream", daemon=True)
+
+  def start(self) -> None:
+    self.thread.start()
+
+  def stop(self) -> None:
+    with self.condition:
+      self.is_stopped = True
+      self.condition.notify()
+
+  def push(self, frame: bytes) -> None:
+    with self.condition:
+      if self.frame is not None:
+        metrics.increment("overlay_frames_dropped")
+
+      self.frame = frame
+      self.condition.notify()
+
+  def run(self) -> None:
+    while True:
+      with self.condition:
+        self.condition.wait_for(lambda: self.frame is not None or self.is_stopped)
+        if self.is_stopped:
+          break
+
+        frame, self.frame = self.frame, None
+
+      if not self.write(frame):
+        metrics.increment("overlay_frames_dropped")
+
+    self.close()
+
+  def open(self) -> bool:
+    if self.fd is not None:
+      return True
+
+    try:
+      self.is_pipe = os.path.exists(self.path) and stat.S_ISFIFO(os.stat(self.path).st_mode)
+      # A pipe without a reader can't be opened without blocking (ENXIO), the frame is dropped until there is one
+      self.fd = os.open(self.path, os.O_WRONLY | (os.O_NONBLOCK if self.is_pipe else os.O_CREAT), 0o644)
+      if self.is_pipe:
+        os.set_blocking(self.fd, True)  # a frame is written whole, or the reader loses its alignment
+
+    except OSError:
+      return False
+
+    logger.info("Overlay stream opened", extra={ "path": self.path, "is_pipe": self.is_pipe })
+    return True
+
+  def write(self, frame: bytes) -> bool:
+    if not self.open():
+      return False
+
+    try:
+      if not self.is_pipe:
+        os.pwrite(self.fd, frame, 0)
+        return True
+
+      view: memoryview = memoryview(frame)
+      while view:
+        view = view[os.write(self.fd, view):]
+      return True
+
+    except OSError as e:  # the reader went away
+      logger.info("Overlay stream closed (%s)", e)
+      self.close()
+      return False
+
+  def close(self) -> None:
+    if self.fd is not None:
+      os.close(self.fd)
+      self.fd = None
+
+
+class OverlayRenderer(QObject):
+  """
+  Renders the card and its animations to images, e.g. for a stream overlay instead of capturing the window.
+  It wakes up on the card's paint and move events only: while something changes, or an animation runs,
+  frames are rendered at 'overlay_fps' for the stream; once the card settles, its PNG is written (atomically)
+  if it differs from the last one, and the renderer sleeps until the next change
+  """
+  def __init__(self, window: "MusicCardWindow", png_path: str, stream: FrameStream | None) -> None:
+    super().__init__()
+    self.window: "MusicCardWindow" = window
+    self.card: QWidget = window.card
+    self.png_path: str = png_path
+    self.stream: FrameStream | None = stream
+
+    # The canvas stands for the screen, as the card's positions in the preferences do
+    width, height = config.get_pr("overlay_size") or (0, 0)
+    self.canvas_size: QSize = QSize(width or window.screen_geo.width(), height or window.screen_geo.height())
+
+    self.last_frame: QImage | None = None
+    self.png_frame: QImage | None = None
+    self.is_grabbing: bool = False
+
+    self.frame_timer: QTimer = QTimer(self)
+    self.frame_timer.setTimerType(Qt.PreciseTimer)
+    self.frame_timer.setInterval(round(1000 / max(1, config.get_pr("overlay_fps") or 30)))
+    self.frame_timer.timeout.connect(self.render_frame)
+
+    for widget in (window, self.card, *self.card.findChildren(QWidget)):
+      widget.installEventFilter(self)
+
+  def start(self) -> None:
+    if self.stream:
+      self.stream.start()
+    self.frame_timer.start()  # the first frame
+
+  def stop(self) -> None:
+    self.frame_timer.stop()
+    if self.stream:
+      self.stream.stop()
+
+  def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+    if event.type() in WATCHED_EVENTS and not self.is_grabbing and not self.frame_timer.isActive():
+      self.frame_timer.start()
+
+    return False
+
+  def render(self) -> QImage:
+    # grab() keeps the card's opacity effect (render() on a painter doesn't), and its own paint events are ignored
+    self.is_grabbing = True
+    try:
+      pixmap: QPixmap = self.card.grab()
+    finally:
+      self.is_grabbing = False
+
+    frame: QImage = QImage(self.canvas_size, QImage.Format_RGBA8888)  # straight alpha, what the streaming tools expect
+    frame.fill(Qt.transparent)
+
+    if self.card.isVisible():
+      painter: QPainter = QPainter(frame)
+      painter.drawPixmap(self.get_card_position(), pixmap)
+      painter.end()
+
+    return frame
+
+  def get_card_position(self) -> QPoint:
+    # Compact windows are moved with the card in their corner, otherwise the card moves in a screen-sized window
+    return self.window.map_to_prefs(self.card.movable.pos())
+
+  def render_frame(self) -> None:
+    started: float = time.perf_counter()
+    frame: QImage = self.render()
+    is_animating: bool = AnimationClock().timer.isActive()
+
+    if frame == self.last_frame and not is_animating:
+      self.frame_timer.stop()
+      self.save_png(frame)
+      return
+
+    self.last_frame = frame
+    if self.stream:
+      self.stream.push(frame.constBits().asstring(frame.sizeInBytes()))
+
+    metrics.increment("overlay_frames")
+    metrics.observe("overlay_render", (time.perf_counter() - started) * 1000)
+
+  def save_png(self, frame: QImage) -> None:
+    if not self.png_path or frame == self.png_frame:
+      return
+
+    self.png_frame = frame
+    engine.submit(engine.run_blocking(self.write_png, frame.copy()))
+
+  def write_png(self, frame: QImage) -> None:
+    # Written next to the target and renamed over it, so readers never see half a file
+    directory: str = os.path.dirname(self.png_path) or "."
+    fd, temp_path = tempfile.mkstemp(suffix=".png", dir=directory)
+    os.close(fd)
+
+    try:
+      if not frame.save(temp_path, "PNG"):
+        raise OSError(f"could not write {temp_path}")
+      os.chmod(temp_path, 0o644)  # mkstemp's files are private
+      os.replace(temp_path, self.png_path)
+
+    except OSError:
+      os.remove(temp_path)
+      raise
+
+    metrics.increment("overlay_pngs")
+    logger.debug("Overlay PNG written", extra={ "path": self.png_path })
+
+
+def start_overlay_renderer(window: "MusicCardWindow") -> OverlayRenderer | None:
+  png_path: str = config.get_pr("overlay_png_path") or ""
+  stream_path: str = config.get_pr("overlay_stream_path") or ""
+  if not png_path and not stream_path:
+    return None
+
+  renderer: OverlayRenderer = OverlayRenderer(
+    window,
+    File.get_relative_path(png_path) if png_path else "",
+    FrameStream(stream_path) if stream_path else None,
+  )
+  renderer.start()
+
+  logger.info("Overlay renderer started", extra={ "png_path": png_path, "stream_path": stream_path, "size": [renderer.canvas_size.width(), renderer.canvas_size.height()] })
+  return renderer
@@ -0,0 +1,128 @@
+import base64, json, logging, os, tempfile, time
+from dataclasses import asdict
+from PyQt5.QtCore import QBuffer, QByteArray, QEvent, QIODevice, QObject
+from PyQt5.QtGui import QPixmap
+from typing import Any, TYPE_CHECKING
+
+from media_players.base import PlaybackState
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from ui.music_card.card import MusicCard
+
+logger: logging.Logger = get_logger(__name__)
+
+ImageFormat = tuple[int, int, float]  # logical size, radius, device pixel ratio
+SNAPSHOT_VERSION: int = 1
+
+
+class CardSnapshot:
+  """
+  The last card shown (its text, accent color, playback state and ready-made pixmaps for every card format),
+  saved on exit so the next launch paints it before any metadata, artwork or color extraction is available
+  """
+  def __init__(self, path: str) -> None:
+    self.path: str = path
+
+  @staticmethod
+  def get_format_key(image_format: ImageFormat) -> str:
+    size, radius, device_pixel_ratio = image_format
+    return f"{size}x{radius}@{device_pixel_ratio:g}"
+
+  def save(self, playback_state: PlaybackState, title: str, artist: str, accent_color: str | None, pixmaps: dict[ImageFormat, QPixmap | None]) -> None:
+    data: dict[str, Any] = {
+      "version": SNAPSHOT_VERSION,
+      "playback": { key: value for key, value in asdict(playback_state).items() if key != "version" },
+      "title": title,
+      "artist": artist,
+      "accent_color": accent_color,
+      "images": { self.get_format_key(image_format): self.to_base64(pixmap) for image_format, pixmap in pixmaps.items() if pixmap },
+    }
+
+    # Written next to the target and renamed over it, a crash while saving keeps the previous snapshot
+    directory: str = os.path.dirname(self.path) or "."
+    fd, temp_path = tempfile.mkstemp(suffix=".json", dir=directory)
+    try:
+      with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+      os.replace(temp_path, self.path)
+
+    except OSError as e:
+      logger.warning("Card snapshot not saved (%s)", e)
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+      return
+
+    logger.debug("Card snapshot saved", extra={ "path": self.path, "title": title })
+
+  def load(self) -> dict[str, Any] | None:
+    try:
+      with open(self.path, "r") as f:
+        data: dict[str, Any] = json.load(f)
+
+    except FileNotFoundError:
+      return None
+    except (OSError, ValueError) as e:
+      logger.warning("Card snapshot not readable (%s)", e)
+      return None
+
+    return data if data.get("version") == SNAPSHOT_VERSION else None
+
+  def get_pixmap(self, data: dict[str, Any], image_format: ImageFormat) -> QPixmap | None:
+    # The card's own format, otherwise any other one (scaled by the label) until the fresh data arrives
+    images: dict[str, str] = data.get("images") or { }
+    encoded: str | None = images.get(self.get_format_key(image_format)) or next(iter(images.values()), None)
+    if not encoded:
+      return None
+
+    pixmap: QPixmap = QPixmap()
+    if not pixmap.loadFromData(base64.b64decode(encoded), "PNG"):
+      return None
+
+    pixmap.setDevicePixelRatio(image_format[2])
+    return pixmap
+
+  @staticmethod
+  def get_playback_state(data: dict[str, Any]) -> PlaybackState:
+    fields: set[str] = set(PlaybackState.__dataclass_fields__)
+    return PlaybackState().evolve(**{ key: value for key, value in (data.get("playback") or { }).items() if key in fields })
+
+  @staticmethod
+  def to_base64(pixmap: QPixmap) -> str:
+    data: QByteArray = QByteArray()
+    buffer: QBuffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    pixmap.save(buffer, "PNG")
+    buffer.close()
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+class FirstPaintProbe(QObject):
+  """
+  Measures the time from the launch to the first paint of the card with something on it ('first_paint_ms').
+  'first_paint_budget_ms' is a warning threshold: over it, the time is logged as a warning and counted
+  """
+  def __init__(self, card: "MusicCard", started: float, budget: int) -> None:
+    super().__init__(card)  # lives as long as the card
+    self.card: "MusicCard" = card
+    self.started: float = started
+    self.budget: int = budget
+    card.installEventFilter(self)
+
+  def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+    if event.type() == QEvent.Paint and self.card.title_label.text():
+      self.card.removeEventFilter(self)
+      self.record((time.perf_counter() - self.started) * 1000)
+
+    return False
+
+  def record(self, first_paint: float) -> None:
+    metrics.set_gauge("first_paint_ms", round(first_paint, 2))
+
+    if first_paint > self.budget:
+      metrics.increment("first_paint_over_budget")
+      logger.warning("First paint over budget: %.1fms (%dms)", first_paint, self.budget)
+      return
+
+    logger.info("First paint in %.1fms", first_paint, extra={ "first_paint_ms": round(first_paint, 2) })
@@ -0,0 +1,65 @@
+import logging
+from enum import Enum, auto
+from PyQt5.QtCore import QObject, pyqtSignal
+from config.config_main import config
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
+
+
+class CardState(Enum):
+  HIDDEN = auto()
+  SLIDING_IN = auto()
+  VISIBLE = auto()
+  FADED = auto()
+  SLIDING_OUT = auto()
+  SNOOZED = auto()
+
+
+SHOWING_STATES: tuple[CardState, ...] = (CardState.SLIDING_IN, CardState.VISIBLE, CardState.FADED, CardState.SLIDING_OUT)
+IDLE_STATES: tuple[CardState, ...] = (CardState.VISIBLE, CardState.FADED, CardState.SNOOZED)
+
+TRANSITIONS: dict[CardState, tuple[CardState, ...]] = {
+  CardState.HIDDEN: (CardState.SLIDING_IN, CardState.SNOOZED),
+  CardState.SLIDING_IN: (CardState.SLIDING_IN, CardState.VISIBLE, CardState.FADED, CardState.SLIDING_OUT, CardState.SNOOZED),
+  CardState.VISIBLE: (CardState.SLIDING_IN, CardState.FADED, CardState.SLIDING_OUT, CardState.SNOOZED),
+  CardState.FADED: (CardState.SLIDING_IN, CardState.VISIBLE, CardState.SLIDING_OUT, CardState.SNOOZED),
+  CardState.SLIDING_OUT: (CardState.SLIDING_IN, CardState.HIDDEN, CardState.SNOOZED),
+  CardState.SNOOZED: (CardState.HIDDEN, CardState.SLIDING_IN, CardState.VISIBLE),
+}
+
+
+class CardStateMachine(QObject):
+  """
+  Keeps the card's visual state. Every transition is announced through 'changed',
+  so the loop and the timers only run in the states that need them
+  """
+  changed: pyqtSignal = pyqtSignal(object, object)  # previous state, new state
+
+  def __init__(self, initial: CardState = CardState.HIDDEN) -> None:
+    super().__init__()
+    self.state: CardState = initial
+    self.previous: CardState = initial
+    self.update_idle_gauge()
+
+  def is_(self, *states: CardState) -> bool:
+    return self.state in states
+
+  def set_state(self, state: CardState) -> bool:
+    if state not in TRANSITIONS[self.state]:
+      logger.warning("Invalid card transition", extra={ "previous_state": self.state.name, "state": state.name })
+      return False
+
+    self.previous, self.state = self.state, state
+    metrics.increment("card_transitions")
+    self.update_idle_gauge()
+
+    self.changed.emit(self.previous, self.state)
+    return True
+
+  def update_idle_gauge(self) -> None:
+    # With "always on screen" the loop keeps polling, so the card is never considered idle
+    is_idle: bool = self.state in IDLE_STATES and not config.get_pr("always_on_screen")
+    metrics.set_gauge("card_state", self.state.name)
+    metrics.set_gauge("card_idle", is_idle)
@@ -1,4 +1,4 @@
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QPoint
 from PyQt5.QtWidgets import QMainWindow
 from typing import TYPE_CHECKING
 
@@ -8,35 +8,68 @@ from ui.music_card.handlers import ScreenHandler, ShortcutHandler
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
   from PyQt5.QtWidgets import QApplication
+  from config.config_main import ScreenConfig
+  from ui.music_card.handlers import UpdateHandler
 
 
 class MusicCardWindow(QMainWindow):
-  def __init__(self, app: "QApplication") -> None:
+  """
+  The card of one screen. The first window's card runs the metadata pipeline, the others are
+  given its updater ('updater') and only render what it sends them
+  """
+  def __init__(self, app: "QApplication", prefs: "ScreenConfig", updater: "UpdateHandler | None" = None) -> None:
     super().__init__()
+    self.prefs: "ScreenConfig" = prefs
+    self.updater: "UpdateHandler | None" = updater
     self.set_showing_level()  # Set window flags and mainly "only desktop" or "always on top" mode
     self.setAttribute(Qt.WA_TranslucentBackground)
 
     self.screen: ScreenHandler = ScreenHandler(self, app)
-    self.screen_geo = self.screen.get_screen_geometry(config.get_pr("screen_index"))
-    self.setFixedSize(self.screen_geo.width(), self.screen_geo.height())
-    self.move(self.screen_geo.x(), self.screen_geo.y())
+    self.screen_geo = self.screen.get_screen_geometry(prefs.get_pr("screen_index"))
+    self.device_pixel_ratio: float = self.screen.get_device_pixel_ratio(prefs.get_pr("screen_index"))
+
+    # Compact mode: the window is only as big as the card and the animations move the window itself
+    self.is_compact: bool = prefs.get_pr("compact_window")
+    if not self.is_compact:
+      self.setFixedSize(self.screen_geo.width(), self.screen_geo.height())
+      self.move(self.screen_geo.x(), self.screen_geo.y())
 
     self.card: MusicCard = MusicCard(self)
     self.card.setParent(self)
+    if self.is_compact:
+      self.fit_to_card()
     self.set_showing_mode()  # Set if the card should be "always on screen" or "hide dynamically"
 
-    # Shortcut handler
-    if config.get_pr("shortcuts"):
+    # Shortcut handler (global hotkeys, registered once for every card)
+    if config.get_pr("shortcuts") and not updater:
       self.shortcut = ShortcutHandler(self)
 
   def set_showing_level(self) -> None:
-    if config.get_pr("only_on_desktop"):
+    if self.prefs.get_pr("only_on_desktop"):
       self.setWindowFlags(Qt.FramelessWindowHint | Qt.Tool)
     else:
       self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
 
   def set_showing_mode(self) -> None:
-    if config.get_pr("always_on_screen"):
-      self.card.move(abs(config.get_pr("fixed_x_pos")), abs(config.get_pr("fixed_y_pos")))
+    if self.prefs.get_pr("always_on_screen"):
+      self.card.movable.move(self.map_from_prefs(abs(self.prefs.get_pr("fixed_x_pos")), abs(self.prefs.get_pr("fixed_y_pos"))))
     else:
-      self.card.move(config.get_pr("start_x_pos"), config.get_pr("start_y_pos"))
+      self.card.movable.move(self.map_from_prefs(self.prefs.get_pr("start_x_pos"), self.prefs.get_pr("start_y_pos")))
+
+  def fit_to_card(self) -> None:
+    # Keeps the compact window the same size as the card
+    self.setFixedSize(self.card.size())
+
+  # Positions
+  def map_from_prefs(self, x: int, y: int) -> QPoint:
+    # Preference positions are relative to the screen, the movable widget's are relative to its parent
+    if self.is_compact:
+      return QPoint(self.screen_geo.x() + x, self.screen_geo.y() + y)
+
+    return QPoint(x, y)
+
+  def map_to_prefs(self, pos: QPoint) -> QPoint:
+    if self.is_compact:
+      return QPoint(pos.x() - self.screen_geo.x(), pos.y() - self.screen_geo.y())
+
+    return QPoint(pos)
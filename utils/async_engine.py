@@ -0,0 +1,121 @@
+import asyncio, functools, logging, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
+
+
+class AsyncEngine(metaclass=ConfigRelatedMeta):
+  """
+  One asyncio loop, in its own thread next to the Qt one, for the media player I/O: metadata polls,
+  artwork downloads, playback commands and debounced calls are coroutines with timeouts that can be cancelled.
+  The blocking clients (spotipy, requests, mutagen) run in a small executor, awaited with a timeout.
+  Results go back to the GUI thread through Qt signals, which queue across threads
+  """
+  def __init__(self) -> None:
+    self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    self.executor: ThreadPoolExecutor = ThreadPoolExecutor(config.get_pr("engine_workers") or 4, thread_name_prefix="engine-io")
+    self.loop.set_default_executor(self.executor)
+
+    self.lock: threading.Lock = threading.Lock()
+    self.thread: threading.Thread | None = None
+    self.tasks: dict[str, asyncio.Task] = { }  # keyed tasks, only touched in the loop's thread
+
+  # Lifecycle
+  def start(self) -> None:
+    with self.lock:
+      if self.thread:
+        return
+
+      self.thread = threading.Thread(target=self.run, name="async-engine", daemon=True)
+      self.thread.start()
+
+  def run(self) -> None:
+    asyncio.set_event_loop(self.loop)
+    self.loop.run_forever()
+
+  def stop(self, timeout: float = 1.0) -> None:
+    # Cancels whatever is pending, the calls already running in the executor are left to finish on their own
+    if not self.thread:
+      return
+
+    try:
+      asyncio.run_coroutine_threadsafe(self.cancel_all(), self.loop).result(timeout)
+    except Exception as e:
+      logger.warning("Async engine tasks not cancelled in time (%s)", e)
+
+    self.loop.call_soon_threadsafe(self.loop.stop)
+    self.thread.join(timeout)
+    self.executor.shutdown(wait=False, cancel_futures=True)
+
+  async def cancel_all(self) -> None:
+    tasks: list[asyncio.Task] = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+      task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+  # Scheduling (thread-safe)
+  def submit(self, coro: Coroutine, key: str | None = None) -> Future:
+    # A keyed coroutine cancels the one still running under the same key
+    self.start()
+    future: Future = asyncio.run_coroutine_threadsafe(self.run_keyed(coro, key), self.loop)
+    future.add_done_callback(self.log_failure)
+    return future
+
+  def call_soon(self, fn: Callable, *args: Any) -> None:
+    self.start()
+    self.loop.call_soon_threadsafe(fn, *args)
+
+  def cancel(self, key: str) -> None:
+    self.call_soon(self.cancel_keyed, key)
+
+  def cancel_keyed(self, key: str) -> None:
+    task: asyncio.Task | None = self.tasks.pop(key, None)
+    if task:
+      task.cancel()
+
+  async def run_keyed(self, coro: Coroutine, key: str | None) -> Any:
+    if key is None:
+      return await coro
+
+    self.cancel_keyed(key)
+    task: asyncio.Task = asyncio.current_task()
+    self.tasks[key] = task
+    try:
+      return await coro
+
+    finally:
+      if self.tasks.get(key) is task:
+        del self.tasks[key]
+
+  @staticmethod
+  def log_failure(future: Future) -> None:
+    if future.cancelled() or not future.exception():
+      return
+
+    error: BaseException = future.exception()
+    logger.error("Async engine task failed: %r", error, exc_info=(type(error), error, error.__traceback__))
+
+  # Awaitables (inside the loop)
+  async def run_blocking(self, fn: Callable, *args: Any, timeout: float | None = None, **kwargs: Any) -> Any:
+    # Timeouts are in ms. A timed out call can't be interrupted: its thread finishes it and the result is dropped
+    call: asyncio.Future = self.loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    try:
+      return await asyncio.wait_for(call, timeout / 1000 if timeout else None)
+    except asyncio.TimeoutError:
+      metrics.increment("engine_timeouts")
+      raise
+
+  async def run_later(self, delay: int, fn: Callable, *args: Any, timeout: float | None = None, **kwargs: Any) -> Any:
+    await asyncio.sleep(delay / 1000)
+    return await self.run_blocking(fn, *args, timeout=timeout, **kwargs)
+
+
+# Singleton instance
+engine: AsyncEngine = AsyncEngine()
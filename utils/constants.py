@@ -1,5 +1,7 @@
 from PyQt5.QtCore import QEasingCurve as Ease
 
+WARNING_IMG_PATH: str = r"resources\img\warning.png"
+
 EASING_FUNCTIONS: dict[str, Ease] = {
   "InSine": Ease.InSine,
   "OutSine": Ease.OutSine,
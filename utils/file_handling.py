@@ -16,7 +16,7 @@ class File:
 
   @staticmethod
   def get_relative_path(file_path: str) -> str:
-    # Get the path to the file relative to the project root
+    # Get the path to the file relative to the project root (the paths use Windows separators, "/" works on every OS)
     project_root: str = os.path.dirname(os.path.dirname(__file__))
-    relative_path: str = os.path.join(project_root, file_path)
+    relative_path: str = os.path.join(project_root, file_path.replace("\\", "/"))
     return relative_path
@@ -1,40 +1,49 @@
-import threading
 from PyQt5.QtCore import Qt, QRectF, QTimer
-from PyQt5.QtGui import QPixmap, QPainter, QPainterPath
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QPainterPath
 from typing import TYPE_CHECKING
+from utils.async_engine import engine
+from utils.metrics import metrics
 
 if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
   from PyQt5.QtCore import QSize
 
 # Auxiliary functions
-def set_timer(callback: callable) -> QTimer:
-  # Sets a timer and return it
+def run_wakeup(callback: callable) -> None:
+  # Runs a timer's callback and counts it as a wake-up
+  was_idle: bool = metrics.get_gauge("card_idle", False)
+  transitions: int = metrics.get_counter("card_transitions")
+
+  callback()
+  metrics.record_wakeup(was_idle and transitions == metrics.get_counter("card_transitions"))
+
+
+def set_timer(callback: callable, single_shot: bool = False) -> QTimer:
+  # Sets a timer and return it. Every timeout is counted as a wake-up.
+  # The callback runs in the thread that called this function (use run_wakeup from a worker's slot otherwise)
   timer: QTimer = QTimer()
-  timer.timeout.connect(callback)
+  timer.setSingleShot(single_shot)
+  timer.timeout.connect(lambda: run_wakeup(callback))
   return timer
 
 
 def debounce(wait):
-  # Debounce a function
+  # Debounce a function: every call cancels the pending one, the last one runs in the async engine after 'wait' ms
   def decorator(fn):
-    def debounced(*args, **kwargs):
-      def call_it():
-        fn(*args, **kwargs)
+    key: str = f"debounce:{fn.__module__}.{fn.__qualname__}"
 
-      if hasattr(debounced, '_timer'):
-        debounced._timer.cancel()
-      debounced._timer = threading.Timer(wait / 1000, call_it)
-      debounced._timer.start()
+    def debounced(*args, **kwargs):
+      engine.submit(engine.run_later(wait, fn, *args, **kwargs), key=key)
 
     return debounced
 
   return decorator
 
 
-def apply_rounded_corners(pixmap: QPixmap, radius: int) -> QPixmap:
-  # Apply rounded corners to a pixmap and return it
+def apply_rounded_corners(pixmap: QPixmap | QImage, radius: int) -> QPixmap | QImage:
+  # Apply rounded corners to a pixmap and return it (images can also be rounded outside the GUI thread)
   size: "QSize" = pixmap.size()
-  rounded_pixmap: QPixmap = QPixmap(size)
+  is_image: bool = isinstance(pixmap, QImage)
+  rounded_pixmap: QPixmap | QImage = QImage(size, QImage.Format_ARGB32_Premultiplied) if is_image else QPixmap(size)
   rounded_pixmap.fill(Qt.transparent)
 
   painter: QPainter = QPainter(rounded_pixmap)
@@ -45,6 +54,9 @@ def apply_rounded_corners(pixmap: QPixmap, radius: int) -> QPixmap:
   path.addRoundedRect(QRectF(0, 0, size.width(), size.height()), radius, radius)
   painter.setClipPath(path)
 
-  painter.drawPixmap(0, 0, pixmap)
+  if is_image:
+    painter.drawImage(0, 0, pixmap)
+  else:
+    painter.drawPixmap(0, 0, pixmap)
   painter.end()
   return rounded_pixmap
@@ -0,0 +1,99 @@
+import json, logging, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from config.base import ConfigRelatedMeta
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
+
+RouteHandler = Callable[[BaseHTTPRequestHandler], None]
+
+
+class RouteRequestHandler(BaseHTTPRequestHandler):
+  """
+  Dispatches GET requests to the routes registered in the LocalServer
+  """
+  server: "LocalHTTPServer"
+
+  def do_GET(self) -> None:
+    path: str = self.path.split("?", 1)[0]
+    route: RouteHandler | None = self.server.routes.get(path)
+
+    if not route:
+      send_json(self, { "error": "not found" }, 404)
+      return
+
+    try:
+      route(self)
+    except (BrokenPipeError, ConnectionResetError):
+      pass  # The client went away
+
+  def log_message(self, format: str, *args: Any) -> None:
+    pass  # Keeps every request from printing to stdout
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+  daemon_threads: bool = True
+
+  def __init__(self, port: int, routes: dict[str, RouteHandler]) -> None:
+    super().__init__(("127.0.0.1", port), RouteRequestHandler)
+    self.routes: dict[str, RouteHandler] = routes
+
+
+class LocalServer(metaclass=ConfigRelatedMeta):
+  """
+  Local-only HTTP server shared by the app's endpoints (metrics, diagnostics...).
+  It runs in a daemon thread, so it never blocks the GUI
+  """
+  def __init__(self) -> None:
+    self.routes: dict[str, RouteHandler] = { }
+    self.httpd: LocalHTTPServer | None = None
+    self.thread: threading.Thread | None = None
+
+  def add_route(self, path: str, handler: RouteHandler) -> None:
+    self.routes[path] = handler
+
+  def is_running(self) -> bool:
+    return self.httpd is not None
+
+  def start(self, port: int) -> bool:
+    if self.is_running() or not port or port <= 0:
+      return self.is_running()
+
+    try:
+      self.httpd = LocalHTTPServer(port, self.routes)
+    except OSError as e:
+      logger.error("Local server couldn't start on port %d (%s)", port, e)
+      return False
+
+    self.thread = threading.Thread(target=self.httpd.serve_forever, name="local-server", daemon=True)
+    self.thread.start()
+    logger.info("Local server running at http://127.0.0.1:%d/", port)
+    return True
+
+  def stop(self) -> None:
+    if not self.httpd:
+      return
+
+    self.httpd.shutdown()
+    self.httpd.server_close()
+    self.httpd = None
+
+
+# Response helpers
+def send_bytes(handler: BaseHTTPRequestHandler, body: bytes, content_type: str, status: int = 200, headers: dict[str, str] | None = None) -> None:
+  handler.send_response(status)
+  handler.send_header("Content-Type", content_type)
+  handler.send_header("Content-Length", str(len(body)))
+  for name, value in (headers or { }).items():
+    handler.send_header(name, value)
+  handler.end_headers()
+  handler.wfile.write(body)
+
+
+def send_json(handler: BaseHTTPRequestHandler, data: Any, status: int = 200) -> None:
+  send_bytes(handler, json.dumps(data, default=str).encode("utf-8"), "application/json", status)
+
+
+# Singleton instance
+local_server: LocalServer = LocalServer()
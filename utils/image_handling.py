@@ -1,18 +1,64 @@
-import requests
+import hashlib, logging, threading, requests
+from collections import OrderedDict
 from PyQt5.QtGui import QPixmap, QImage
 from PIL import Image
 from io import BytesIO
 from colorthief import ColorThief
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Union, Hashable, Any
 
+from config.config_main import config
 from utils.helpers import apply_rounded_corners
 from utils.color_handling import Color
 from utils.file_handling import File
+from utils.metrics import metrics
+from utils.logger import get_logger
 
 if TYPE_CHECKING: # Imports only for type annotations purposes (ignored at runtime)
   from requests import Response
   from PIL.Image import ImageFile
 
+logger: logging.Logger = get_logger(__name__)
+
+
+class ImageCache:
+  """
+  Thread-safe LRU cache of the processed card images (QImage, so they can be prepared
+  outside the GUI thread) and the accent colors, keyed by their image source
+  """
+  def __init__(self, max_items: int = 64) -> None:
+    self.max_items: int = max_items
+    self.lock: threading.Lock = threading.Lock()
+    self.items: OrderedDict[Hashable, Any] = OrderedDict()
+
+  @staticmethod
+  def get_source_key(img_src: str | bytes) -> str:
+    # Raw images are keyed by their digest, so the bytes aren't kept alive by the cache
+    if isinstance(img_src, bytes):
+      return hashlib.blake2b(img_src, digest_size=16).hexdigest()
+
+    return img_src
+
+  def get(self, key: Hashable) -> Any:
+    with self.lock:
+      if key not in self.items:
+        return None
+
+      self.items.move_to_end(key)
+      return self.items[key]
+
+  def put(self, key: Hashable, value: Any) -> None:
+    with self.lock:
+      self.items[key] = value
+      self.items.move_to_end(key)
+
+      while len(self.items) > self.max_items:
+        self.items.popitem(last=False)
+
+  def clear(self) -> None:
+    with self.lock:
+      self.items.clear()
+
+
 class ExtractImageColor:
   def __init__(self) -> None:
     self.img_bytes: BytesIO | None = None
@@ -23,6 +69,21 @@ class ExtractImageColor:
     self.accent_saturation: float = 0.0
 
   def extract(self, img_src: str, card_color: str) -> str | None:
+    if not img_src or not isinstance(img_src, (str, bytes)):
+      return None
+
+    cache_key: tuple[str, str, str] = ("color", image_cache.get_source_key(img_src), card_color)
+    cached_color: str | None = image_cache.get(cache_key)
+    if cached_color:
+      return cached_color
+
+    hex_color: str | None = self.get_accent_color(img_src, card_color)
+    if hex_color:
+      image_cache.put(cache_key, hex_color)
+
+    return hex_color
+
+  def get_accent_color(self, img_src: str, card_color: str) -> str | None:
     self.set_img_bytes(img_src)
 
     if not self.img_bytes:
@@ -66,7 +127,8 @@ class ExtractImageColor:
 
     try:
       if img_src.startswith("http"):
-        response: "Response" = requests.get(img_src)
+        with metrics.span("artwork_fetch"):
+          response: "Response" = requests.get(img_src, timeout=config.get_pr("artwork_timeout_ms") / 1000)  # a hung download would hold an engine worker
         if response.status_code != 200:
           return
 
@@ -77,27 +139,52 @@ class ExtractImageColor:
         self.img_bytes = File.get_relative_path(img_src)
 
     except Exception as e:
-      print(f"Error: Image not found or not supported ({e})")
+      logger.warning("Image not found or not supported (%s)", e)
 
 
 class ConvertImageToPixmap:
   def __init__(self) -> None:
     self.img: Union["ImageFile", None] = None
+    self.img_src: str | bytes | None = None  # the source of 'img', opened once for every size asked for
     self.pixmap: QPixmap | None = None
 
-  def convert(self, img_src: str, img_size: str, radius: int = 5) -> QPixmap | None:
-    self.set_img(img_src)
-    self.img = self.img.resize((img_size, img_size), Image.Resampling.LANCZOS)
-    self.img = self.img.convert("RGBA")
+  def convert(self, img_src: str, img_size: int, radius: int = 5, device_pixel_ratio: float = 1.0) -> QPixmap | None:
+    # Decoded at the screen's resolution, the pixmap keeps the logical size
+    q_image: QImage | None = self.to_image(img_src, round(img_size * device_pixel_ratio), round(radius * device_pixel_ratio))
+    if q_image is None:
+      return None
 
-    data: bytes = self.img.tobytes("raw", "RGBA")
-    q_image: QImage = QImage(data, self.img.width, self.img.height, QImage.Format_RGBA8888)
     self.pixmap = QPixmap.fromImage(q_image)
+    self.pixmap.setDevicePixelRatio(device_pixel_ratio)
+    return self.pixmap
 
-    if radius > 0:
-      self.pixmap = apply_rounded_corners(self.pixmap, radius)
+  def to_image(self, img_src: str, img_size: int, radius: int = 5) -> QImage | None:
+    # Everything but the QPixmap conversion, so it can also run outside the GUI thread
+    if not img_src or not isinstance(img_src, (str, bytes)):
+      return None
 
-    return self.pixmap
+    cache_key: tuple[str, str, int, int] = ("image", image_cache.get_source_key(img_src), img_size, radius)
+    cached_image: QImage | None = image_cache.get(cache_key)
+    if cached_image is not None:
+      return cached_image
+
+    if self.img_src != img_src:
+      self.img, self.img_src = None, img_src
+      self.set_img(img_src)
+    if not self.img:
+      return None
+
+    with metrics.span("decode"):
+      img: "Image.Image" = self.img.resize((img_size, img_size), Image.Resampling.LANCZOS).convert("RGBA")
+
+      data: bytes = img.tobytes("raw", "RGBA")
+      q_image: QImage = QImage(data, img.width, img.height, QImage.Format_RGBA8888).copy()  # copy() detaches it from 'data'
+
+      if radius > 0:
+        q_image = apply_rounded_corners(q_image, radius)
+
+    image_cache.put(cache_key, q_image)
+    return q_image
 
   def set_img(self, img_src: str) -> None:
     if not img_src or not isinstance(img_src, (str, bytes)):
@@ -109,7 +196,8 @@ class ConvertImageToPixmap:
 
     try:
       if img_src.startswith("http"):
-        response: "Response" = requests.get(img_src)
+        with metrics.span("artwork_fetch"):
+          response: "Response" = requests.get(img_src, timeout=config.get_pr("artwork_timeout_ms") / 1000)  # a hung download would hold an engine worker
         if response.status_code != 200:
           return
 
@@ -121,4 +209,24 @@ class ConvertImageToPixmap:
         self.img = Image.open(img_path)
 
     except Exception as e:
-      print(f"Error: Image not found or not supported ({e})")
+      logger.warning("Image not found or not supported (%s)", e)
+
+
+def register_card_image(img_size: int, radius: int, device_pixel_ratio: float) -> None:
+  # Called by every card at startup, so the images are prepared in every format they are shown in
+  card_image_formats.add((img_size, radius, device_pixel_ratio))
+
+
+def prepare_card_image(img_src: str | bytes) -> None:
+  # What update_card_content needs from an image, done ahead of it (and outside the GUI thread) into the image cache
+  converter: ConvertImageToPixmap = ConvertImageToPixmap()
+  image_formats: tuple[tuple[int, int, float], ...] = tuple(card_image_formats) or ((config.get_pr("image_size"), config.get_pr("image_radius"), 1.0),)
+  for img_size, radius, device_pixel_ratio in image_formats:
+    converter.to_image(img_src, round(img_size * device_pixel_ratio), round(radius * device_pixel_ratio))
+  if not config.get_pr("only_custom_color"):
+    ExtractImageColor().extract(img_src, config.current_theme.get("bg_color"))
+
+
+# Singleton instance
+image_cache: ImageCache = ImageCache()
+card_image_formats: set[tuple[int, int, float]] = set()  # (logical size, radius, device pixel ratio)
@@ -0,0 +1,65 @@
+import atexit, json, logging, queue, sys
+from logging.handlers import QueueHandler, QueueListener
+from config.config_main import config
+from utils.file_handling import File
+
+ROOT_LOGGER_NAME: str = "spoticard"
+RECORD_ATTRIBUTES: frozenset[str] = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | { "message", "asctime" }
+
+
+class JsonFormatter(logging.Formatter):
+  """
+  One JSON object per line, with the 'extra' fields of the call merged in
+  """
+  def format(self, record: logging.LogRecord) -> str:
+    entry: dict[str, object] = {
+      "ts": round(record.created, 6),
+      "level": record.levelname,
+      "logger": record.name,
+      "thread": record.threadName,
+      "msg": record.getMessage(),
+    }
+    entry.update({ key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES })
+
+    if record.exc_info:
+      entry["exc"] = self.formatException(record.exc_info)
+
+    return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+  """
+  Puts the records in the queue as they are. Unlike QueueHandler it doesn't format them,
+  so the calling thread only pays for the record creation
+  """
+  def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    return record
+
+
+def setup_logging() -> QueueListener:
+  # Called once by the entry point (main.py, tools). The listener thread formats and writes every record,
+  # the callers just enqueue them (SimpleQueue, no locks)
+  log_file: str = config.get_pr("log_file") or ""
+  output: logging.Handler = logging.FileHandler(File.get_relative_path(log_file), encoding="utf-8") if log_file else logging.StreamHandler(sys.stdout)
+
+  if config.get_pr("log_format") == "json":
+    output.setFormatter(JsonFormatter())
+  else:
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"))
+
+  log_queue: queue.SimpleQueue = queue.SimpleQueue()
+  listener: QueueListener = QueueListener(log_queue, output)
+
+  root: logging.Logger = logging.getLogger(ROOT_LOGGER_NAME)
+  root.setLevel(str(config.get_pr("log_level") or "INFO").upper())
+  root.addHandler(DeferredQueueHandler(log_queue))
+  root.propagate = False
+
+  listener.start()
+  atexit.register(listener.stop)  # Flushes what is left in the queue
+  return listener
+
+
+def get_logger(name: str) -> logging.Logger:
+  # Child of the app's logger, e.g. "spoticard.media_players.spotify"
+  return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
@@ -0,0 +1,212 @@
+import json, logging, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, TYPE_CHECKING
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.file_handling import File
+from utils.http_server import local_server, send_json
+from utils.logger import get_logger
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from http.server import BaseHTTPRequestHandler
+
+logger: logging.Logger = get_logger(__name__)
+
+RATE_WINDOW: float = 60.0  # seconds
+DEFAULT_BUCKETS: tuple[float, ...] = (1, 2, 4, 8, 12, 16, 20, 25, 33, 50, 75, 100, 250, 500, 1000, 2500, 5000, 10000)  # milliseconds
+
+
+class Histogram:
+  """
+  Fixed-bucket histogram (values in milliseconds)
+  """
+  def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+    self.buckets: tuple[float, ...] = buckets
+    self.counts: list[int] = [0] * (len(buckets) + 1)  # the last one holds the values above the last bucket
+    self.count: int = 0
+    self.total: float = 0.0
+    self.min: float | None = None
+    self.max: float | None = None
+
+  def observe(self, value: float) -> None:
+    index: int = len(self.buckets)
+    for i, bound in enumerate(self.buckets):
+      if value <= bound:
+        index = i
+        break
+
+    self.counts[index] += 1
+    self.count += 1
+    self.total += value
+    self.min = value if self.min is None else min(self.min, value)
+    self.max = value if self.max is None else max(self.max, value)
+
+  def percentile(self, percent: float) -> float | None:
+    # Upper bound of the bucket that holds the percentile (the max for the overflow bucket)
+    if not self.count:
+      return None
+
+    rank: float = self.count * percent / 100
+    seen: int = 0
+    for i, count in enumerate(self.counts):
+      seen += count
+      if seen >= rank and count:
+        return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+
+    return self.max
+
+  def snapshot(self) -> dict[str, Any]:
+    return {
+      "count": self.count,
+      "mean": round(self.total / self.count, 3) if self.count else None,
+      "min": self.min,
+      "max": self.max,
+      "p50": self.percentile(50),
+      "p90": self.percentile(90),
+      "p99": self.percentile(99),
+      "buckets": { str(bound): count for bound, count in zip(self.buckets + ("inf",), self.counts) if count },
+    }
+
+
+class Metrics(metaclass=ConfigRelatedMeta):
+  """
+  Process-wide counters, gauges and event rates. Safe to use from any thread
+  """
+  def __init__(self) -> None:
+    self.lock: threading.Lock = threading.Lock()
+    self.started_at: float = time.monotonic()
+    self.counters: dict[str, int] = { }
+    self.gauges: dict[str, Any] = { }
+    self.events: dict[str, deque[float]] = { }
+    self.histograms: dict[str, Histogram] = { }
+
+  def increment(self, name: str, amount: int = 1) -> None:
+    with self.lock:
+      self.counters[name] = self.counters.get(name, 0) + amount
+
+  def get_counter(self, name: str) -> int:
+    return self.counters.get(name, 0)
+
+  def set_gauge(self, name: str, value: Any) -> None:
+    self.gauges[name] = value
+
+  def get_gauge(self, name: str, default: Any = None) -> Any:
+    return self.gauges.get(name, default)
+
+  def mark(self, name: str) -> None:
+    # Counts an event and keeps its timestamp to calculate its rate
+    now: float = time.monotonic()
+
+    with self.lock:
+      self.counters[name] = self.counters.get(name, 0) + 1
+      events: deque[float] = self.events.setdefault(name, deque())
+      events.append(now)
+
+      while events and now - events[0] > RATE_WINDOW:
+        events.popleft()
+
+  def rate_per_minute(self, name: str) -> float:
+    now: float = time.monotonic()
+
+    with self.lock:
+      events: deque[float] = self.events.get(name, deque())
+      recent: int = sum(1 for t in events if now - t <= RATE_WINDOW)
+
+    elapsed: float = min(RATE_WINDOW, max(now - self.started_at, 1.0))
+    return recent * 60.0 / elapsed
+
+  def observe(self, name: str, value: float) -> None:
+    with self.lock:
+      histogram: Histogram = self.histograms.setdefault(name, Histogram())
+      histogram.observe(value)
+
+  def get_histogram(self, name: str) -> Histogram | None:
+    return self.histograms.get(name)
+
+  @contextmanager
+  def span(self, name: str) -> Iterator[None]:
+    # Times the block and adds it to the 'stage.<name>' histogram (milliseconds)
+    start: float = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(f"stage.{name}", (time.perf_counter() - start) * 1000)
+
+  def record_wakeup(self, idle: bool = False) -> None:
+    # Timer wake-ups; the idle ones are those that happened while nothing on the card could change
+    self.mark("wakeups")
+    if idle:
+      self.mark("idle_wakeups")
+
+  def snapshot(self) -> dict[str, Any]:
+    with self.lock:
+      counters: dict[str, int] = dict(self.counters)
+      histograms: dict[str, dict[str, Any]] = { name: histogram.snapshot() for name, histogram in self.histograms.items() }
+
+    return {
+      "uptime": round(time.monotonic() - self.started_at, 3),
+      "time_to_card": histograms.get("time_to_card"),
+      "counters": counters,
+      "gauges": dict(self.gauges),
+      "histograms": histograms,
+      "rates_per_minute": { name: round(self.rate_per_minute(name), 2) for name in list(self.events) },
+    }
+
+
+class MetricsExporter:
+  """
+  Publishes the metrics' snapshot on the local server ('/metrics') and/or dumps it
+  to a file every 'metrics_dump_interval' seconds from a background thread
+  """
+  def __init__(self, dump_path: str = "", dump_interval: float = 60) -> None:
+    self.dump_path: str = dump_path
+    self.dump_interval: float = max(1.0, dump_interval)
+    self.stop_event: threading.Event = threading.Event()
+    self.thread: threading.Thread | None = None
+
+  @staticmethod
+  def serve(handler: "BaseHTTPRequestHandler") -> None:
+    send_json(handler, metrics.snapshot())
+
+  def start(self) -> None:
+    if self.dump_path and not self.thread:
+      self.thread = threading.Thread(target=self.dump_loop, name="metrics-dump", daemon=True)
+      self.thread.start()
+
+  def stop(self) -> None:
+    self.stop_event.set()
+    if self.dump_path:
+      self.dump()
+
+  def dump_loop(self) -> None:
+    while not self.stop_event.wait(self.dump_interval):
+      self.dump()
+
+  def dump(self) -> None:
+    # Written to a temporary file first, so readers never see a half-written dump
+    tmp_path: str = f"{self.dump_path}.tmp"
+    try:
+      with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(metrics.snapshot(), file, default=str, indent=2)
+      os.replace(tmp_path, self.dump_path)
+
+    except OSError as e:
+      logger.warning("Metrics couldn't be dumped (%s)", e)
+
+
+def start_metrics_export() -> MetricsExporter:
+  dump_path: str = config.get_pr("metrics_dump_path") or ""
+  exporter: MetricsExporter = MetricsExporter(
+    File.get_relative_path(dump_path) if dump_path else "",
+    config.get_pr("metrics_dump_interval") or 60,
+  )
+
+  local_server.add_route("/metrics", exporter.serve)
+  local_server.start(config.get_pr("local_server_port"))
+  exporter.start()
+  return exporter
+
+
+# Singleton instance
+metrics: Metrics = Metrics()
@@ -0,0 +1,161 @@
+import hashlib, json, logging, threading
+from dataclasses import asdict
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+from typing import Any, TYPE_CHECKING
+from config.base import ConfigRelatedMeta
+from utils.http_server import local_server, send_bytes, send_json
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from http.server import BaseHTTPRequestHandler
+  from PyQt5.QtGui import QPixmap
+  from media_players.base import PlaybackState
+
+logger: logging.Logger = get_logger(__name__)
+
+KEEP_ALIVE: float = 15.0  # seconds between comments on an idle event stream
+HIDDEN_FIELDS: tuple[str, ...] = ("version", "previous_track_id", "previous_state_is_playing")
+CORS_HEADERS: dict[str, str] = { "Access-Control-Allow-Origin": "*" }  # browser overlays are served from elsewhere (or from file://)
+
+
+class NowPlayingPublisher(metaclass=ConfigRelatedMeta):
+  """
+  Publishes what the card shows on the local server, so dashboards and browser overlays share the app's
+  polling instead of asking the players themselves: GET /state (JSON), GET /events (server-sent events,
+  one per change) and GET /artwork (the card-sized artwork as PNG, with an ETag).
+  The GUI thread publishes, the server's threads read
+  """
+  def __init__(self) -> None:
+    self.is_enabled: bool = False
+    self.is_stopped: bool = False
+    self.changed: threading.Condition = threading.Condition()
+
+    self.version: int = 0
+    self.playback: dict[str, Any] = { }
+    self.card: dict[str, Any] = { "title": '', "artist": '', "accent_color": None, "artwork_url": None }
+    self.artwork: bytes = b''
+    self.artwork_etag: str = ''
+    self.body: bytes = self.get_body()
+
+  # Publishing (GUI thread)
+  def publish_playback(self, state: "PlaybackState") -> None:
+    if not self.is_enabled:
+      return
+
+    playback: dict[str, Any] = { key: value for key, value in asdict(state).items() if key not in HIDDEN_FIELDS }
+    self.update(playback=playback)
+
+  def publish_card(self, title: str, artist: str, accent_color: str, pixmap: "QPixmap | None") -> None:
+    if not self.is_enabled:
+      return
+
+    artwork: bytes = self.to_png(pixmap) if pixmap else b''
+    digest: str = hashlib.blake2b(artwork, digest_size=8).hexdigest() if artwork else ''
+    self.update(
+      card={ "title": title, "artist": artist, "accent_color": accent_color, "artwork_url": f"/artwork?v={digest}" if digest else None },
+      artwork=artwork,
+      artwork_etag=f'"{digest}"' if digest else '',
+    )
+
+  @staticmethod
+  def to_png(pixmap: "QPixmap") -> bytes:
+    data: QByteArray = QByteArray()
+    buffer: QBuffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    pixmap.save(buffer, "PNG")
+    buffer.close()
+    return bytes(data)
+
+  def update(self, **changes: Any) -> None:
+    with self.changed:
+      if all(getattr(self, name) == value for name, value in changes.items()):
+        return  # nothing the consumers would see
+
+      for name, value in changes.items():
+        setattr(self, name, value)
+
+      self.version += 1
+      self.body = self.get_body()
+      self.changed.notify_all()
+
+    metrics.increment("now_playing_changes")
+
+  def get_body(self) -> bytes:
+    return json.dumps({ "version": self.version, "playback": self.playback, "card": self.card }).encode("utf-8")
+
+  def stop(self) -> None:
+    with self.changed:
+      self.is_stopped = True
+      self.changed.notify_all()  # the event streams end
+
+  # Routes (server threads)
+  def serve_state(self, handler: "BaseHTTPRequestHandler") -> None:
+    with self.changed:
+      etag, body = f'"{self.version}"', self.body
+
+    if handler.headers.get("If-None-Match") == etag:
+      send_not_modified(handler, etag)
+      return
+
+    send_bytes(handler, body, "application/json", headers={ "ETag": etag, "Cache-Control": "no-cache", **CORS_HEADERS })
+
+  def serve_artwork(self, handler: "BaseHTTPRequestHandler") -> None:
+    with self.changed:
+      etag, artwork = self.artwork_etag, self.artwork
+
+    if not artwork:
+      send_json(handler, { "error": "no artwork" }, 404)
+      return
+
+    if handler.headers.get("If-None-Match") == etag:
+      send_not_modified(handler, etag)
+      return
+
+    send_bytes(handler, artwork, "image/png", headers={ "ETag": etag, "Cache-Control": "no-cache", **CORS_HEADERS })
+
+  def serve_events(self, handler: "BaseHTTPRequestHandler") -> None:
+    # The current state first, then one event per change. Each stream keeps one of the server's threads
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream")
+    handler.send_header("Cache-Control", "no-cache")
+    for name, value in CORS_HEADERS.items():
+      handler.send_header(name, value)
+    handler.end_headers()
+
+    metrics.increment("now_playing_streams")
+    version: int = -1
+    while True:
+      with self.changed:
+        self.changed.wait_for(lambda: self.version != version or self.is_stopped, KEEP_ALIVE)
+        if self.is_stopped:
+          return
+
+        is_changed: bool = self.version != version
+        version, body = self.version, self.body
+
+      handler.wfile.write(b"data: " + body + b"\n\n" if is_changed else b": keep-alive\n\n")
+      handler.wfile.flush()
+
+
+def send_not_modified(handler: "BaseHTTPRequestHandler", etag: str) -> None:
+  handler.send_response(304)
+  handler.send_header("ETag", etag)
+  for name, value in CORS_HEADERS.items():
+    handler.send_header(name, value)
+  handler.end_headers()
+
+
+def start_now_playing_api() -> NowPlayingPublisher:
+  # Only published while the local server runs ('local_server_port')
+  if local_server.is_running():
+    local_server.add_route("/state", now_playing.serve_state)
+    local_server.add_route("/events", now_playing.serve_events)
+    local_server.add_route("/artwork", now_playing.serve_artwork)
+    now_playing.is_enabled = True
+
+  return now_playing
+
+
+# Singleton instance
+now_playing: NowPlayingPublisher = NowPlayingPublisher()
@@ -0,0 +1,211 @@
+import logging, queue, sqlite3, threading, time
+from contextlib import closing
+from typing import Any, TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.file_handling import File
+from utils.http_server import local_server, send_json
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from http.server import BaseHTTPRequestHandler
+
+logger: logging.Logger = get_logger(__name__)
+
+MAX_BATCH: int = 500
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS tracks (
+  id INTEGER PRIMARY KEY,
+  source TEXT NOT NULL,
+  track_id TEXT NOT NULL,
+  title TEXT NOT NULL,
+  artist TEXT NOT NULL,
+  play_count INTEGER NOT NULL DEFAULT 0,
+  last_played REAL,
+  UNIQUE (source, track_id)
+);
+CREATE INDEX IF NOT EXISTS tracks_by_play_count ON tracks (play_count DESC, last_played DESC);
+
+CREATE TABLE IF NOT EXISTS plays (
+  id INTEGER PRIMARY KEY,
+  track INTEGER NOT NULL REFERENCES tracks (id),
+  started_at REAL NOT NULL,
+  ended_at REAL,
+  accent_color TEXT
+);
+CREATE INDEX IF NOT EXISTS plays_by_start ON plays (started_at, track);
+"""
+
+
+class PlayHistory(metaclass=ConfigRelatedMeta):
+  """
+  Every track the card shows, in SQLite (WAL mode, so the queries never wait for the writes).
+  The GUI thread only queues the plays: a writer thread saves them in batches, one transaction
+  every 'play_history_flush_ms'. The tracks keep their play count, so the all-time top tracks
+  and the recent plays are index lookups however long the history is
+  """
+  def __init__(self) -> None:
+    self.path: str = ""
+    self.flush_interval: float = 0.0
+    self.default_source: str = ""  # the records of a single backend don't name it
+    self.plays: queue.Queue[tuple[str, str, str, str, float, str | None] | None] = queue.Queue()
+    self.thread: threading.Thread | None = None
+
+  def is_enabled(self) -> bool:
+    return self.thread is not None
+
+  def start(self, path: str, flush_interval: int) -> None:
+    self.path = path
+    self.flush_interval = flush_interval / 1000
+
+    media_player: str | list[str] = config.get_pr("media_player")
+    self.default_source = media_player if isinstance(media_player, str) else media_player[0]
+
+    with closing(self.connect()) as connection:
+      connection.execute("PRAGMA journal_mode=WAL")
+      connection.executescript(SCHEMA)
+
+    self.thread = threading.Thread(target=self.run, name="play-history", daemon=True)
+    self.thread.start()
+
+  def stop(self) -> None:
+    if self.thread:
+      self.plays.put(None)  # the last batch is written first
+      self.thread.join(5)
+
+  def connect(self) -> sqlite3.Connection:
+    # A connection per thread (and per query), sqlite3's can't be shared
+    connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA synchronous=NORMAL")  # enough with WAL: a crash may lose the last batch, never corrupt
+    return connection
+
+  # Writing
+  def record(self, source: str, track_id: str, title: str, artist: str, accent_color: str | None = None) -> None:
+    if self.is_enabled() and track_id:
+      self.plays.put((source or self.default_source, track_id, title, artist, time.time(), accent_color))
+
+  def run(self) -> None:
+    connection: sqlite3.Connection = self.connect()
+    last_play: int | None = None
+    is_stopping: bool = False
+
+    while not is_stopping:
+      play = self.plays.get()
+      if play is None:
+        break
+
+      # Whatever arrives until the flush interval is over goes into the same transaction
+      batch: list[tuple[str, str, str, str, float, str | None]] = [play]
+      deadline: float = time.monotonic() + self.flush_interval
+      while len(batch) < MAX_BATCH:
+        try:
+          play = self.plays.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+          break
+
+        if play is None:
+          is_stopping = True
+          break
+        batch.append(play)
+
+      try:
+        last_play = self.write(connection, batch, last_play)
+      except sqlite3.Error as e:
+        logger.error("Play history not saved (%s)", e, extra={ "plays": len(batch) })
+        metrics.increment("play_history_errors")
+
+    connection.close()
+
+  def write(self, connection: sqlite3.Connection, batch: list[tuple[str, str, str, str, float, str | None]], last_play: int | None) -> int | None:
+    started: float = time.perf_counter()
+
+    with connection:
+      for source, track_id, title, artist, played_at, accent_color in batch:
+        track: int = connection.execute(
+          "INSERT INTO tracks (source, track_id, title, artist, play_count, last_played) VALUES (?, ?, ?, ?, 1, ?) "
+          "ON CONFLICT (source, track_id) DO UPDATE SET title = excluded.title, artist = excluded.artist, "
+          "play_count = play_count + 1, last_played = excluded.last_played RETURNING id",
+          (source, track_id, title, artist, played_at),
+        ).fetchone()[0]
+
+        if last_play is not None:
+          connection.execute("UPDATE plays SET ended_at = ? WHERE id = ?", (played_at, last_play))  # the previous track ended here
+
+        last_play = connection.execute(
+          "INSERT INTO plays (track, started_at, accent_color) VALUES (?, ?, ?)", (track, played_at, accent_color)
+        ).lastrowid
+
+    metrics.increment("play_history_plays", len(batch))
+    metrics.observe("play_history_write", (time.perf_counter() - started) * 1000)
+    return last_play
+
+  # Queries (any thread)
+  def get_recent(self, limit: int = 20) -> list[dict[str, Any]]:
+    with closing(self.connect()) as connection:
+      rows: list[sqlite3.Row] = connection.execute(
+        "SELECT tracks.source, tracks.track_id, tracks.title, tracks.artist, plays.started_at, plays.ended_at, plays.accent_color "
+        "FROM plays JOIN tracks ON tracks.id = plays.track ORDER BY plays.id DESC LIMIT ?",
+        (limit,),
+      ).fetchall()
+
+    return [dict(row) for row in rows]
+
+  def get_top_tracks(self, limit: int = 10, since: float | None = None) -> list[dict[str, Any]]:
+    # All time: the kept counts. Since a date: the plays of that period, through their index
+    with closing(self.connect()) as connection:
+      if since is None:
+        rows: list[sqlite3.Row] = connection.execute(
+          "SELECT source, track_id, title, artist, play_count, last_played FROM tracks ORDER BY play_count DESC, last_played DESC LIMIT ?",
+          (limit,),
+        ).fetchall()
+      else:
+        rows = connection.execute(
+          "SELECT tracks.source, tracks.track_id, tracks.title, tracks.artist, top.play_count, top.last_played "
+          "FROM (SELECT track, COUNT(*) AS play_count, MAX(started_at) AS last_played FROM plays WHERE started_at >= ? GROUP BY track "
+          "ORDER BY play_count DESC, last_played DESC LIMIT ?) AS top JOIN tracks ON tracks.id = top.track "
+          "ORDER BY top.play_count DESC, top.last_played DESC",
+          (since, limit),
+        ).fetchall()
+
+    return [dict(row) for row in rows]
+
+  # Routes (server threads)
+  def serve_recent(self, handler: "BaseHTTPRequestHandler") -> None:
+    query: dict[str, list[str]] = parse_qs(urlsplit(handler.path).query)
+    send_json(handler, self.get_recent(get_int(query, "limit", 20)))
+
+  def serve_top(self, handler: "BaseHTTPRequestHandler") -> None:
+    # ?days=30 for the last 30 days, all time without it
+    query: dict[str, list[str]] = parse_qs(urlsplit(handler.path).query)
+    days: int = get_int(query, "days", 0)
+    send_json(handler, self.get_top_tracks(get_int(query, "limit", 10), time.time() - days * 86400 if days else None))
+
+
+def get_int(query: dict[str, list[str]], name: str, default: int) -> int:
+  try:
+    return max(int(query[name][0]), 0)
+  except (KeyError, ValueError):
+    return default
+
+
+def start_play_history() -> PlayHistory | None:
+  path: str = config.get_pr("play_history_path") or ""
+  if not path:
+    return None
+
+  try:
+    play_history.start(File.get_relative_path(path), config.get_pr("play_history_flush_ms") or 2000)
+  except sqlite3.Error as e:
+    logger.error("Play history couldn't be opened (%s)", e)
+    return None
+
+  local_server.add_route("/history/recent", play_history.serve_recent)
+  local_server.add_route("/history/top", play_history.serve_top)
+  return play_history
+
+
+# Singleton instance
+play_history: PlayHistory = PlayHistory()
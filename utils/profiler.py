@@ -0,0 +1,133 @@
+import cProfile, functools, logging, os, threading
+from PyQt5.QtCore import QThread
+from typing import Any, Callable
+from config.base import ConfigRelatedMeta
+from config.config_main import config
+from utils.file_handling import File
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
+
+PROFILE_ENV_VAR: str = "SPOTICARD_PROFILE"  # Number of iterations to profile, overrides 'profile_iterations'
+
+
+class Profiler(metaclass=ConfigRelatedMeta):
+  """
+  Opt-in cProfile hook. It keeps one profile per thread for the decorated functions and writes
+  them (pstats files) once 'update_card' ran N times. When disabled the decorators return
+  the functions untouched, so it costs nothing
+  """
+  def __init__(self) -> None:
+    self.iterations: int = int(os.environ.get(PROFILE_ENV_VAR) or config.get_pr("profile_iterations") or 0)
+    self.enabled: bool = self.iterations > 0
+    self.output_dir: str = File.get_relative_path(config.get_pr("profile_output_dir") or "profiles")
+
+    self.lock: threading.Lock = threading.Lock()
+    self.local: threading.local = threading.local()
+    self.profiles: dict[str, cProfile.Profile] = { }
+    self.dumped: set[str] = set()
+    self.count: int = 0
+    self.is_done: bool = False
+
+  # Decorators
+  def profile(self, fn: Callable) -> Callable:
+    if not self.enabled:
+      return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+      return self.run(fn, False, *args, **kwargs)
+
+    return wrapper
+
+  def profile_iteration(self, fn: Callable) -> Callable:
+    # Same as 'profile', but every call counts as one of the N iterations
+    if not self.enabled:
+      return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+      return self.run(fn, True, *args, **kwargs)
+
+    return wrapper
+
+  # Profiling
+  def run(self, fn: Callable, is_iteration: bool, *args: Any, **kwargs: Any) -> Any:
+    if self.is_done:
+      self.dump_current_thread()  # Threads other than the GUI one write their profile on their next call
+      return fn(*args, **kwargs)
+
+    profile: cProfile.Profile = self.get_thread_profile()
+    depth: int = getattr(self.local, "depth", 0)
+    self.local.depth = depth + 1
+
+    if depth == 0:
+      profile.enable()
+    try:
+      return fn(*args, **kwargs)
+
+    finally:
+      self.local.depth = depth
+      if depth == 0:
+        profile.disable()
+
+      if is_iteration and depth == 0:
+        self.count_iteration()
+
+  def get_thread_profile(self) -> cProfile.Profile:
+    name: str = self.get_thread_name()
+
+    with self.lock:
+      if name not in self.profiles:
+        self.profiles[name] = cProfile.Profile()
+
+      return self.profiles[name]
+
+  @staticmethod
+  def get_thread_name() -> str:
+    thread: threading.Thread = threading.current_thread()
+    if thread is threading.main_thread():
+      return "gui"
+
+    return QThread.currentThread().objectName() or f"{thread.name}-{thread.ident}"
+
+  def count_iteration(self) -> None:
+    with self.lock:
+      self.count += 1
+      if self.count < self.iterations:
+        return
+
+      self.is_done = True
+
+    logger.info("Profiled %d iterations, writing the profiles to %s", self.count, self.output_dir)
+    self.dump_current_thread()
+
+  def dump_current_thread(self) -> None:
+    name: str = self.get_thread_name()
+
+    with self.lock:
+      profile: cProfile.Profile | None = self.profiles.get(name)
+      if not profile or name in self.dumped:
+        return
+
+      self.dumped.add(name)
+
+    os.makedirs(self.output_dir, exist_ok=True)
+    profile.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+
+  def dump_all(self) -> None:
+    # At exit, whatever was not written yet (the other threads aren't running profiled code by then)
+    if not self.enabled:
+      return
+
+    with self.lock:
+      pending: dict[str, cProfile.Profile] = { name: p for name, p in self.profiles.items() if name not in self.dumped }
+      self.dumped.update(pending)
+
+    os.makedirs(self.output_dir, exist_ok=True)
+    for name, profile in pending.items():
+      profile.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+
+
+# Singleton instance
+profiler: Profiler = Profiler()
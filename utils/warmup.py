@@ -0,0 +1,73 @@
+import logging, time
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QFont, QFontInfo, QFontMetrics
+from config.config_main import config
+from utils.constants import WARNING_IMG_PATH
+from utils.async_engine import engine
+from utils.image_handling import prepare_card_image
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+logger: logging.Logger = get_logger(__name__)
+
+FONT_PREFERENCES: tuple[str, ...] = ("title", "artist")
+
+
+class WarmupWorker(QObject):
+  """
+  Resolves the configured font families and preloads the static assets (alert card image
+  and its accent color) outside the GUI thread, so the first card doesn't pay for them
+  """
+  finished: pyqtSignal = pyqtSignal(float, dict)  # seconds, resolved font families
+
+  def run(self) -> None:
+    start: float = time.perf_counter()
+
+    resolved_fonts: dict[str, str] = self.preload_fonts()
+    self.preload_assets()
+
+    self.finished.emit(time.perf_counter() - start, resolved_fonts)
+
+  @staticmethod
+  def get_font_families(font: str) -> list[str]:
+    # "'Tsunagi Gothic Black', 'Filson Pro', Helvetica" -> ["Tsunagi Gothic Black", "Filson Pro", "Helvetica"]
+    return [family.strip().strip("'\"") for family in (font or "").split(",") if family.strip()]
+
+  def preload_fonts(self) -> dict[str, str]:
+    # Every family of the fallback chains goes through the font database (fontconfig on Linux) once,
+    # which is what stalls the first stylesheet and the first fontMetrics() call
+    resolved_fonts: dict[str, str] = { }
+
+    for label in FONT_PREFERENCES:
+      for family in self.get_font_families(config.get_pr(f"{label}_font")):
+        font: QFont = QFont(family)
+        font.setPixelSize(config.get_pr(f"{label}_font_size"))
+
+        resolved_family: str = QFontInfo(font).family()
+        QFontMetrics(font).boundingRect("Ag")
+
+        if label not in resolved_fonts and resolved_family.lower() == family.lower():
+          resolved_fonts[label] = resolved_family  # first family of the chain that is installed
+
+    return resolved_fonts
+
+  @staticmethod
+  def preload_assets() -> None:
+    # The alert cards always use the same image, so its processed image and accent color end up in the image cache
+    prepare_card_image(WARNING_IMG_PATH)
+
+
+class Warmup:
+  """
+  Runs the WarmupWorker once in the async engine's executor
+  """
+  def __init__(self) -> None:
+    self.worker: WarmupWorker = WarmupWorker()
+    self.worker.finished.connect(self.on_finished)
+
+  def start(self) -> None:
+    engine.submit(engine.run_blocking(self.worker.run))
+
+  def on_finished(self, seconds: float, resolved_fonts: dict[str, str]) -> None:
+    metrics.set_gauge("warmup_ms", round(seconds * 1000, 2))
+    logger.info("Warmup done in %.1fms", seconds * 1000, extra={ "warmup_ms": round(seconds * 1000, 2), "fonts": resolved_fonts })
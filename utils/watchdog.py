@@ -0,0 +1,120 @@
+import json, logging, os, sys, threading, time, traceback
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+from typing import Any, TYPE_CHECKING
+from config.config_main import config
+from utils.file_handling import File
+from utils.http_server import local_server, send_json
+from utils.metrics import metrics
+from utils.logger import get_logger
+
+if TYPE_CHECKING:  # Imports only for type annotations purposes (ignored at runtime)
+  from http.server import BaseHTTPRequestHandler
+
+logger: logging.Logger = get_logger(__name__)
+
+
+class StallWatchdog(QObject):
+  """
+  Heartbeats the Qt event loop from a background thread. When the GUI thread takes longer
+  than the threshold to answer, its Python stack is captured and the stall is kept in a ring buffer,
+  served at '/stalls' (with 'local_server_port') and written to 'dump_path' on exit
+  """
+  heartbeat: pyqtSignal = pyqtSignal()
+
+  def __init__(self, threshold: int = 50, interval: int = 250, capacity: int = 50, dump_path: str = "") -> None:
+    super().__init__()  # Lives in the GUI thread, so the heartbeat is answered by its event loop
+    self.dump_path: str = dump_path
+    self.threshold: float = threshold / 1000
+    self.interval: float = interval / 1000
+    self.stalls: deque[dict[str, Any]] = deque(maxlen=capacity)
+
+    self.gui_thread_id: int = threading.get_ident()
+    self.answered: threading.Event = threading.Event()
+    self.stop_event: threading.Event = threading.Event()
+    self.thread: threading.Thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+
+    self.heartbeat.connect(self.answer)
+
+  def start(self) -> None:
+    self.thread.start()
+
+  def stop(self) -> None:
+    self.stop_event.set()
+    self.answered.set()
+    if self.dump_path:
+      self.dump()
+
+  def answer(self) -> None:
+    self.answered.set()
+
+  def watch(self) -> None:
+    while not self.stop_event.wait(self.interval):
+      self.answered.clear()
+      sent_at: float = time.perf_counter()
+      self.heartbeat.emit()  # Queued to the GUI thread
+
+      if self.answered.wait(self.threshold):
+        continue
+
+      # The GUI thread is stuck right now: take its stack before it moves on
+      stack: list[str] = self.capture_gui_stack()
+      self.answered.wait()
+
+      if self.stop_event.is_set():
+        return
+
+      self.record_stall((time.perf_counter() - sent_at) * 1000, stack)
+
+  def capture_gui_stack(self) -> list[str]:
+    frame = sys._current_frames().get(self.gui_thread_id)
+    return traceback.format_stack(frame) if frame else []
+
+  def record_stall(self, duration: float, stack: list[str]) -> None:
+    stall: dict[str, Any] = {
+      "time": time.time(),
+      "duration_ms": round(duration, 2),
+      "stack": [line.rstrip() for line in stack],
+    }
+    self.stalls.append(stall)
+
+    metrics.increment("gui_stalls")
+    metrics.observe("gui_stall", duration)
+    logger.warning("GUI stalled for %.1fms", duration, extra={ "where": stack[-1].strip().splitlines()[0] if stack else None })
+
+  def get_stalls(self) -> list[dict[str, Any]]:
+    return list(self.stalls)
+
+  def serve(self, handler: "BaseHTTPRequestHandler") -> None:
+    send_json(handler, self.get_stalls())
+
+  def dump(self) -> None:
+    # Written to a temporary file first, so readers never see a half-written dump
+    tmp_path: str = f"{self.dump_path}.tmp"
+    try:
+      with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(self.get_stalls(), file, indent=2)
+      os.replace(tmp_path, self.dump_path)
+
+    except OSError as e:
+      logger.warning("Stalls couldn't be dumped (%s)", e)
+
+
+def start_watchdog() -> StallWatchdog | None:
+  if not config.get_pr("watchdog"):
+    return None
+
+  dump_path: str = config.get_pr("watchdog_dump_path") or ""
+  watchdog: StallWatchdog = StallWatchdog(
+    config.get_pr("watchdog_threshold_ms"),
+    config.get_pr("watchdog_interval_ms"),
+    config.get_pr("watchdog_capacity"),
+    File.get_relative_path(dump_path) if dump_path else "",
+  )
+  # Dumps the ring buffer on demand, only while the local server runs ('local_server_port')
+  local_server.add_route("/stalls", watchdog.serve)
+  if not local_server.is_running() and not dump_path:
+    logger.warning("Stalls only go to the log: set 'local_server_port' for /stalls or 'watchdog_dump_path'")
+
+  watchdog.start()
+  return watchdog